@@ -0,0 +1,346 @@
+"""Mesure des chemins critiques de l'interface sur des flux synthétiques
+
+Étapes mesurées pour chaque taille de flux (généré par simulator.py) :
+
+- parse : décodage StreamDecoder du flux texte puis binaire (mesures/s, Mo/s) ;
+- map : RadarEngine.drain_samples (filtrage, pose, add_map_point, grille), par lot d'une frame ;
+- render : image des points (PointRaster) et de la grille (OccupancyGrid.to_ppm) ;
+- index : requêtes PointIndex d'une frame (vue, obstacle devant, profil polaire),
+  et reprojection des points visibles quand la vue bouge (pan) ;
+- plan : cap du planificateur (planner.py) depuis la pose du robot, à chaque frame
+  (en session, une fois par scan) ;
+- frame : frame Tk complète (drain_samples + update_radar + update_map), seulement
+  si un affichage est disponible (sinon : xvfb-run python benchmark.py) ;
+- startup : démarrage dans un interpréteur neuf, STARTUP_RUNS fois : import de
+  NumPy, moteur importé et construit, fenêtre affichée (avec un affichage), et
+  énumération des ports série (faite en arrière-plan par l'interface).
+
+Exemples :
+    python benchmark.py --sizes 1000,10000,100000,1000000
+    python benchmark.py --json base.json              # référence
+    python benchmark.py --compare base.json           # code de sortie 1 si régression
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from engine import RadarEngine
+from map_buffer import PointRaster, view_bounds
+from protocol import CMD_BINARY, Sample, StreamDecoder
+from simulator import BufferEndpoint, SimulatedRobot
+
+
+DEFAULT_SIZES = "1000,10000,100000,1000000"
+SAMPLES_PER_FRAME = 500  # Mesures traitées par frame (débit élevé : 30 000 mesures/s à 60 FPS)
+CHUNK_SIZE = 4096  # Taille d'une lecture série
+VIEW = (700, 700, 350, 350, 700 / 800 * 0.85)  # Vue carte par défaut (≈ canvas de 700 px)
+REGRESSION_THRESHOLD = 0.2  # 20 % plus lent que la référence → régression
+
+# Démarrage mesuré dans un interpréteur neuf (les modules sont déjà chargés ici)
+STARTUP_RUNS = 5
+STARTUP_SCRIPT = r"""
+import json, sys, time
+start = time.perf_counter()
+import numpy
+timings = {"import_numpy": time.perf_counter() - start}
+import engine
+engine.RadarEngine().close()
+timings["engine"] = time.perf_counter() - start
+if "--tk" in sys.argv:
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        root = None
+    if root is not None:
+        from interface import RadarInterface
+        app = RadarInterface(root)
+        root.update()
+        timings["window"] = time.perf_counter() - start
+        app.on_close()
+ports_start = time.perf_counter()
+import serial.tools.list_ports
+serial.tools.list_ports.comports()
+timings["ports"] = time.perf_counter() - ports_start
+print(json.dumps(timings))
+"""
+
+# Grandeurs comparées avec --compare : plus grand = mieux (débits), ou plus petit = mieux (temps)
+HIGHER_IS_BETTER = ("samples_per_s",)
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "p99_ms")
+
+
+def generate_stream(samples, binary=False, rate=2000.0, seed=0):
+    """Flux brut du robot simulé : liste de (temps, octets) d'au plus CHUNK_SIZE"""
+    endpoint = BufferEndpoint()
+    robot = SimulatedRobot(endpoint, sample_rate=rate, noise=1.0, dropout=0.02, seed=seed)
+    if binary:
+        endpoint.commands += CMD_BINARY
+        robot._read_commands()
+    chunks = []
+    while robot.samples_sent < samples:
+        robot.step(0.05)
+        robot.flush()
+        data = endpoint.take()
+        for start in range(0, len(data), CHUNK_SIZE):
+            chunks.append((robot.time, data[start:start + CHUNK_SIZE]))
+    return chunks
+
+
+def percentiles(times):
+    """p50 / p95 / p99 / max en ms d'une liste de durées (s)"""
+    if not times:
+        return {}
+    values = np.percentile(np.asarray(times) * 1000, (50, 95, 99, 100))
+    return dict(zip(("p50_ms", "p95_ms", "p99_ms", "max_ms"), np.round(values, 3).tolist()))
+
+
+def bench_parse(chunks):
+    """Décodage du flux (équivalent de la boucle de read_serial, sans le port)"""
+    decoder = StreamDecoder()
+    items = []
+    size = sum(len(data) for _, data in chunks)
+    start = time.perf_counter()
+    for timestamp, data in chunks:
+        items += decoder.feed(data, timestamp)
+    elapsed = time.perf_counter() - start
+    samples = sum(1 for item in items if isinstance(item, Sample))
+    return items, {
+        "samples": samples,
+        "seconds": round(elapsed, 4),
+        "samples_per_s": round(samples / max(elapsed, 1e-9)),
+        "mb_per_s": round(size / 1e6 / max(elapsed, 1e-9), 2),
+        "errors": decoder.parse_errors + decoder.crc_errors,
+    }
+
+
+class QuietEngine(RadarEngine):
+    """Moteur de l'interface sans journal (les messages ne coûtent pas d'affichage)"""
+
+    def log_event(self, message, level=None):
+        pass
+
+
+def bench_map(items, batch=SAMPLES_PER_FRAME):
+    """Traitement de RadarEngine.drain_samples (filtrage, pose, carte, grille), puis rendu
+
+    Renvoie les résultats des étapes map et render.
+    """
+    engine = QuietEngine()
+    points = engine.map_points
+    grid = engine.occupancy
+    index = engine.point_index
+    raster = PointRaster(points.capacity)
+    planner, pose = engine.planner, engine.robots[0].pose
+    map_times, raster_times, grid_times, index_times, plan_times = [], [], [], [], []
+
+    for start in range(0, len(items), batch):
+        engine.sample_queue.extend(items[start:start + batch])
+        frame_start = time.perf_counter()
+        engine.drain_samples()
+        map_times.append(time.perf_counter() - frame_start)
+
+        render_start = time.perf_counter()
+        if raster.update(points, VIEW):
+            raster.to_ppm()
+        raster_times.append(time.perf_counter() - render_start)
+
+        render_start = time.perf_counter()
+        grid.to_ppm(*VIEW)
+        grid_times.append(time.perf_counter() - render_start)
+
+        index_start = time.perf_counter()
+        index.query_rect(*view_bounds(VIEW))
+        index.nearest(0.0, 0.0, 0.0, engine.max_distance, 10.0)
+        index.polar_profile(0.0, 0.0, engine.max_distance)
+        index_times.append(time.perf_counter() - index_start)
+
+        plan_start = time.perf_counter()
+        planner.plan(pose.x, pose.y, pose.heading)
+        plan_times.append(time.perf_counter() - plan_start)
+
+    # Vue déplacée à chaque frame : reprojection des seuls points visibles
+    pan_times = []
+    width, height, center_x, center_y, scale = VIEW
+    for step in range(20):
+        view = (width, height, center_x + 10 * (step + 1), center_y, scale)
+        render_start = time.perf_counter()
+        raster.update(points, view, index)
+        raster.to_ppm()
+        pan_times.append(time.perf_counter() - render_start)
+
+    engine.close()
+    samples = engine.samples_received
+    elapsed = sum(map_times)
+    memory = points.data.nbytes + sum(tile.nbytes for tile in grid.tiles.values()) + (
+        raster.screen_x.nbytes + raster.screen_y.nbytes + raster.levels.nbytes + raster.image.nbytes)
+    return {
+        "map": dict(samples=samples, seconds=round(elapsed, 4),
+                    samples_per_s=round(samples / max(elapsed, 1e-9)),
+                    frames=len(map_times), **percentiles(map_times)),
+        "render_points": dict(frames=len(raster_times), **percentiles(raster_times)),
+        "render_grid": dict(frames=len(grid_times), tiles=len(grid.tiles),
+                            **percentiles(grid_times)),
+        "index": dict(frames=len(index_times), rebuilds=index.rebuilds,
+                      **percentiles(index_times)),
+        "render_pan": dict(frames=len(pan_times), **percentiles(pan_times)),
+        "plan": dict(frames=len(plan_times), **percentiles(plan_times)),
+        "structures_mb": round(memory / 1e6, 2),
+    }
+
+
+def bench_tk_frames(items, batch=SAMPLES_PER_FRAME):
+    """Frames complètes de RadarInterface dans une vraie fenêtre Tk (None sans affichage)"""
+    import tkinter as tk
+    try:
+        root = tk.Tk()
+    except tk.TclError:
+        return None
+    from interface import RadarInterface
+
+    app = RadarInterface(root)
+    root.update()  # Affiche la fenêtre : <Configure> fixe la géométrie des canvas
+    frame_times = {"grid": [], "points": []}
+    try:
+        for mode in ("grid", "points"):
+            app.reset_map()
+            app.map_mode = mode
+            for start in range(0, len(items), batch):
+                app.sample_queue.extend(items[start:start + batch])
+                frame_start = time.perf_counter()
+                app.drain_samples()
+                if app._radar_geom is not None:
+                    app.update_radar()
+                app.update_map()
+                root.update_idletasks()  # Rendu des canvas (les timers after ne tournent pas)
+                frame_times[mode].append(time.perf_counter() - frame_start)
+    finally:
+        app.on_close()
+    return {f"frame_{mode}": dict(frames=len(times), **percentiles(times))
+            for mode, times in frame_times.items()}
+
+
+def bench_startup(tk_frames, runs=STARTUP_RUNS):
+    """Temps de démarrage par étape (interpréteurs neufs), None si le script échoue"""
+    times = {}
+    for _ in range(runs):
+        result = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT] + (["--tk"] if tk_frames else []),
+                                cwd=os.path.dirname(os.path.abspath(__file__)),
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            print(f"⚠️ Démarrage non mesuré: {result.stderr.strip().splitlines()[-1:]}")
+            return None
+        for stage, seconds in json.loads(result.stdout.splitlines()[-1]).items():
+            times.setdefault(stage, []).append(seconds)
+    return {stage: dict(runs=len(values), **percentiles(values)) for stage, values in times.items()}
+
+
+def run(sizes, batch, tk_frames, memory):
+    results = {}
+    for size in sizes:
+        entry = {}
+        for fmt in ("text", "binary"):
+            chunks = generate_stream(size, binary=fmt == "binary")
+            items, entry[f"parse_{fmt}"] = bench_parse(chunks)
+
+        if memory:
+            tracemalloc.start()
+        entry.update(bench_map(items, batch))
+        if memory:
+            entry["peak_traced_mb"] = round(tracemalloc.get_traced_memory()[1] / 1e6, 2)
+            tracemalloc.stop()
+
+        if tk_frames:
+            frames = bench_tk_frames(items, batch)
+            if frames is None:
+                print("⚠️ Pas d'affichage : frames Tk non mesurées (essayer xvfb-run)")
+                tk_frames = False
+            else:
+                entry.update(frames)
+        results[str(size)] = entry
+        report(size, entry)
+
+    startup = bench_startup(tk_frames)
+    if startup is not None:
+        results["startup"] = startup
+        print("\n=== Démarrage ===")
+        report_stages(startup)
+    return results
+
+
+def report(size, entry):
+    print(f"\n=== {size} mesures ===")
+    report_stages(entry)
+
+
+def report_stages(entry):
+    for stage, values in entry.items():
+        if isinstance(values, dict):
+            text = "  ".join(f"{key}={value}" for key, value in values.items())
+            print(f"  {stage:<14} {text}")
+        else:
+            print(f"  {stage:<14} {values}")
+
+
+def compare(results, baseline, threshold=REGRESSION_THRESHOLD):
+    """Lister les régressions par rapport à un fichier de référence"""
+    regressions = []
+    for size, entry in results.items():
+        for stage, values in entry.items():
+            reference = baseline.get(size, {}).get(stage)
+            if not isinstance(values, dict) or not isinstance(reference, dict):
+                continue
+            for key in HIGHER_IS_BETTER + LOWER_IS_BETTER:
+                if key not in values or not reference.get(key):
+                    continue
+                ratio = values[key] / reference[key]
+                if key in HIGHER_IS_BETTER:
+                    ratio = 1 / max(ratio, 1e-9)
+                if ratio > 1 + threshold:
+                    regressions.append(f"{size} {stage}.{key}: {reference[key]} → {values[key]}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de l'interface radar")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="tailles de flux (mesures)")
+    parser.add_argument("--batch", type=int, default=SAMPLES_PER_FRAME,
+                        help="mesures traitées par frame")
+    parser.add_argument("--no-tk", action="store_true", help="ne pas mesurer les frames Tk")
+    parser.add_argument("--memory", action="store_true",
+                        help="pic mémoire Python (tracemalloc, ralentit l'étape map)")
+    parser.add_argument("--json", help="écrire les résultats dans ce fichier")
+    parser.add_argument("--compare", help="fichier de référence (code de sortie 1 si régression)")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    results = run(sizes, args.batch, not args.no_tk, args.memory)
+
+    try:
+        import resource
+        print(f"\nMémoire max du processus: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f} Mo")
+    except ImportError:
+        pass  # Windows
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f))
+        for line in regressions:
+            print(f"❌ Régression {line}")
+        if regressions:
+            sys.exit(1)
+        print("✅ Aucune régression")
+
+
+if __name__ == "__main__":
+    main()
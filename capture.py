@@ -0,0 +1,145 @@
+"""Capture sans interface graphique (aucun import de Tk), pour les longues sessions
+
+Se connecte au port (ou rejoue un journal), construit la carte avec le même
+moteur que l'interface, et écrit enregistrement brut, images de la carte,
+carte complète (.npz, voir map_file.py) et statistiques.
+
+Exemples :
+    python capture.py --port /dev/ttyUSB0 --baud 115200 --binary --record --snapshot-every 60
+    python capture.py --port socket://localhost:7777 --metrics run.csv --duration 3600 \
+        --log run.log --log-level WARNING
+    python capture.py --replay session.rlog.gz --speed 0 --out cartes/ --save-map session.npz
+    python capture.py --port /dev/ttyUSB0 --load-map session.npz --image-format png
+    python capture.py --port socket://localhost:7777 --port socket://localhost:7778   # 2 robots
+    python capture.py --port socket://localhost:7777 --navigate   # cap planifié (planner.py)
+"""
+import argparse
+import os
+import signal
+import time
+
+from engine import RadarEngine
+from event_log import LEVELS
+from metrics import MetricsExporter
+
+
+POLL_INTERVAL = 0.02  # s entre deux traitements de la file
+
+
+class Capture(RadarEngine):
+    """Moteur piloté par une boucle simple au lieu de la boucle Tk"""
+
+    def __init__(self, out_dir=".", snapshot_every=0.0, metrics_path=None, image_format="ppm"):
+        super().__init__()
+        self.out_dir = out_dir
+        self.image_format = image_format
+        self.snapshot_every = snapshot_every
+        self.metrics_exporter = MetricsExporter(metrics_path) if metrics_path else None
+        self.snapshots = 0
+
+    def save_map(self, name=None):
+        """Écrire l'image de la carte courante (numérotée par défaut)"""
+        name = name or f"map_{self.snapshots:04d}"
+        path = os.path.join(self.out_dir, f"{name}.{self.image_format}")
+        if self.save_snapshot(path):
+            self.snapshots += 1
+            self.log_event(f"🗺️  Carte: {path}")
+
+    def run(self, duration=None):
+        """Traiter le flux jusqu'à la fin du rejeu, la durée écoulée ou Ctrl+C"""
+        start = last_snapshot = time.monotonic()
+        stop = []
+        signal.signal(signal.SIGTERM, lambda *_: stop.append(True))
+        try:
+            while self.is_running and not stop:
+                self.drain_samples()
+                now = time.monotonic()
+                if self.metrics.due():
+                    row = self.metrics_snapshot()
+                    if self.metrics_exporter is not None:
+                        self.metrics_exporter.write(row)
+                    self.report_parse_errors(row)
+                if self.snapshot_every > 0 and now - last_snapshot >= self.snapshot_every:
+                    last_snapshot = now
+                    self.save_map()
+                if duration is not None and now - start >= duration:
+                    break
+                if not self.sample_queue:
+                    time.sleep(POLL_INTERVAL)
+        except KeyboardInterrupt:
+            pass
+
+        # Arrêter les lecteurs puis vider la file avant la carte finale (sinon un flux
+        # plus rapide que le traitement ne laisse jamais la file vide)
+        self.disconnect()
+        while self.drain_samples():
+            pass
+        self.log_event(f"📊 {self.samples_received} mesures, {self.scan_count} scans, "
+                       f"{len(self.map_points)} points")
+
+    def close(self):
+        self.stop_recording()
+        super().close()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Capture radar sans interface graphique")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--port", action="append",
+                        help="port série ou URL pyserial (socket://hôte:port), répétable : un robot par port")
+    source.add_argument("--replay", action="append",
+                        help="journal à rejouer (.rlog / .rlog.gz), répétable")
+    parser.add_argument("--baud", type=int, default=9600)
+    parser.add_argument("--binary", action="store_true", help="demander le protocole binaire")
+    parser.add_argument("--speed", type=float, default=1.0, help="vitesse de rejeu (0 = au plus vite)")
+    parser.add_argument("--icp", action="store_true", help="recalage des scans")
+    parser.add_argument("--no-filter", action="store_true",
+                        help="mesures brutes sur la carte (sans médiane ni fusion)")
+    parser.add_argument("--navigate", action="store_true",
+                        help="envoyer au robot le cap planifié sur la carte en fin de scan")
+    parser.add_argument("--record", nargs="?", const="", metavar="FICHIER",
+                        help="enregistrer le flux brut (nom horodaté par défaut)")
+    parser.add_argument("--out", default=".", help="dossier des images de carte")
+    parser.add_argument("--snapshot-every", type=float, default=0.0, metavar="S",
+                        help="image de la carte toutes les S secondes (sinon à la fin)")
+    parser.add_argument("--image-format", choices=("ppm", "png", "pgm"), default="ppm",
+                        help="format des images (pgm : + .yaml map_server)")
+    parser.add_argument("--load-map", metavar="FICHIER", help="reprendre une carte sauvegardée (.npz)")
+    parser.add_argument("--save-map", metavar="FICHIER", help="sauvegarder la carte à la fin (.npz)")
+    parser.add_argument("--metrics", help="statistiques chaque seconde (.csv ou .jsonl)")
+    parser.add_argument("--log", metavar="FICHIER",
+                        help="journal des événements, tous niveaux (rotation à 1 Mo)")
+    parser.add_argument("--log-level", choices=list(LEVELS), default="INFO",
+                        help="niveau minimal affiché en console")
+    parser.add_argument("--duration", type=float, help="durée maximale (s)")
+    args = parser.parse_args()
+
+    os.makedirs(args.out, exist_ok=True)
+    capture = Capture(args.out, args.snapshot_every, args.metrics, args.image_format)
+    capture.scan_matching = args.icp
+    capture.sample_filtering = not args.no_filter
+    capture.navigation = args.navigate
+    capture.log_level = LEVELS[args.log_level]
+    if args.log:
+        capture.event_log.open_file(args.log)
+    try:
+        if args.load_map:
+            capture.import_map(args.load_map)
+        if args.record is not None:
+            capture.start_recording(args.record or None)
+        for path in args.replay or ():
+            capture.start_replay(path, args.speed or None)
+        for port in args.port or ():
+            capture.connect(port, args.baud, binary=args.binary)
+        capture.run(args.duration)
+        capture.save_map("map_final")
+        if args.save_map:
+            capture.export_map(args.save_map)
+    finally:
+        capture.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,10 @@ const int MOTOR_KICK = 200;
 const unsigned long DUREE_SCAN_360 = 2600;
 const unsigned long DUREE_TURN_90 = 550;
 const unsigned long DELAI_SCAN_AUTO = 10000;
+const unsigned long DELAI_CAP_HOTE = 1000;  // Attente max du cap de l'interface après le scan
+
+// Liaison série (l'interface doit utiliser la même vitesse)
+const long SERIAL_BAUD = 9600;  // 115200 conseillé avec le protocole binaire
 
 // Distances (cm)
 const int SEUIL_OBSTACLE = 45;
@@ -48,8 +52,19 @@ unsigned long lastScanTime = 0;
 int bestSector = 0;  // ✅ Secteur avec la plus grande distance
 float maxDistance = 0;  // ✅ Distance maximale trouvée
 
+// --- PROTOCOLE ---
+// Texte par défaut ("A:54:D:12.76"). Sur "CMD:BINARY" les mesures partent en
+// trames de 11 octets : AA 55 | angle u16 | distance u16 (mm) | millis u32 | CRC-8
+bool binaryMode = false;
+char cmdBuffer[24];
+int cmdLength = 0;
+
+// Cap planifié par l'interface ("CMD:HEADING:135") : virage du prochain évitement
+bool planHote = false;  // ✅ L'interface planifie : attendre son cap en fin de scan
+int capHote = -1;       // Virage reçu pour ce scan (0-359°, sens horaire), -1 si aucun
+
 void setup() {
-  Serial.begin(9600);
+  Serial.begin(SERIAL_BAUD);
   rgb.setNumber(16);
   
   // Séquence de démarrage
@@ -64,6 +79,8 @@ void setup() {
 }
 
 void loop() {
+  checkCommands();
+
   switch (currentState) {
     case MOVING:
       manageMoving();
@@ -110,6 +127,11 @@ void manageScanning() {
   if (timeInScan >= DUREE_SCAN_360) {
     Stop();
     Serial.println("EVENT:SCAN_COMPLETE");
+
+    int totalMesures = 0;
+    for (int i = 0; i < NB_SECTEURS; i++) totalMesures += secteurCounts[i];
+    Serial.print("STATUS:SCAN_END:");
+    Serial.println(totalMesures);
     
     // ✅ ANALYSE: Trouver le secteur avec la plus grande distance moyenne
     findBestDirection();
@@ -139,10 +161,7 @@ void manageScanning() {
   if (dist == 0 || dist > DIST_MAX) dist = DIST_MAX;
 
   // Envoi données
-  Serial.print("A:");
-  Serial.print(currentAngle);
-  Serial.print(":D:");
-  Serial.println(dist);
+  sendSample(currentAngle, dist);
 
   // ✅ ACCUMULATION PAR SECTEUR
   // Chaque secteur = 45° (360/8)
@@ -206,7 +225,7 @@ void performAvoidance(int sector) {
   Stop();
   delay(200);
 
-  // 2. ✅ Calculer l'angle à tourner
+  // 2. ✅ Calculer l'angle à tourner (cap de l'interface s'il arrive à temps)
   // Secteur 0 = 0-45° (devant droite)
   // Secteur 1 = 45-90° (droite)
   // Secteur 2 = 90-135° (arrière droite)
@@ -217,6 +236,12 @@ void performAvoidance(int sector) {
   // Secteur 7 = 315-360° (devant gauche)
   
   int angleCible = sector * 45 + 22;  // Milieu du secteur
+  attendreCapHote();
+  if (capHote >= 0) {
+    angleCible = capHote;
+    Serial.print("MSG:HOST_HEADING:");
+    Serial.println(capHote);
+  }
   int angleTourner = angleCible;
   
   // Si l'angle est > 180°, tourner dans l'autre sens
@@ -247,6 +272,18 @@ void performAvoidance(int sector) {
   rgb.show();
 }
 
+// --- ✅ CAP PLANIFIE PAR L'INTERFACE ---
+void attendreCapHote() {
+  checkCommands();  // Cap déjà reçu pendant le recul
+  if (!planHote) return;
+
+  // stateStartTime : début du scan (l'état ne change qu'après l'évitement)
+  unsigned long limite = stateStartTime + DUREE_SCAN_360 + DELAI_CAP_HOTE;
+  while (capHote < 0 && (long)(limite - millis()) > 0) {
+    checkCommands();
+  }
+}
+
 void changeState(RobotState newState) {
   Stop();
   currentState = newState;
@@ -255,6 +292,7 @@ void changeState(RobotState newState) {
   if (newState == SCANNING) {
     rgb.setColor(50, 0, 50);
     rgb.show();
+    Serial.println("STATUS:SCAN_START");  // ✅ Début du tour (recalage côté PC)
     
     // ✅ Reset des données de scan
     for (int i = 0; i < NB_SECTEURS; i++) {
@@ -263,6 +301,7 @@ void changeState(RobotState newState) {
     }
     maxDistance = 0;
     bestSector = 0;
+    capHote = -1;
     
     // Impulsion de démarrage
     MotorL.run(-MOTOR_KICK);
@@ -274,9 +313,74 @@ void changeState(RobotState newState) {
   else if (newState == MOVING) {
     rgb.setColor(0, 50, 0);
     rgb.show();
+    Serial.println("STATUS:MOVING");  // ✅ Début de l'avance (suivi de pose côté PC)
   }
 }
 
+// --- ✅ COMMANDES DE L'INTERFACE ---
+void checkCommands() {
+  while (Serial.available() > 0) {
+    char c = Serial.read();
+    if (c == '\r') continue;
+    if (c != '\n') {
+      if (cmdLength < (int)sizeof(cmdBuffer) - 1) cmdBuffer[cmdLength++] = c;
+      continue;
+    }
+    cmdBuffer[cmdLength] = '\0';
+    cmdLength = 0;
+
+    if (strcmp(cmdBuffer, "CMD:BINARY") == 0) {
+      binaryMode = true;
+      Serial.println("STATUS:BINARY");
+    } else if (strcmp(cmdBuffer, "CMD:TEXT") == 0) {
+      binaryMode = false;
+      Serial.println("STATUS:TEXT");
+    } else if (strncmp(cmdBuffer, "CMD:HEADING:", 12) == 0) {
+      capHote = atoi(cmdBuffer + 12) % 360;
+      if (capHote < 0) capHote += 360;
+      planHote = true;
+    } else if (strcmp(cmdBuffer, "CMD:AUTO") == 0) {
+      planHote = false;
+      capHote = -1;
+      Serial.println("STATUS:AUTO");
+    }
+  }
+}
+
+// --- ✅ ENVOI D'UNE MESURE ---
+uint8_t crc8(const uint8_t *data, int len) {
+  uint8_t crc = 0;
+  for (int i = 0; i < len; i++) {
+    crc ^= data[i];
+    for (int b = 0; b < 8; b++) {
+      crc = (crc & 0x80) ? (uint8_t)((crc << 1) ^ 0x07) : (uint8_t)(crc << 1);
+    }
+  }
+  return crc;
+}
+
+void sendSample(int angle, float dist) {
+  if (!binaryMode) {
+    Serial.print("A:");
+    Serial.print(angle);
+    Serial.print(":D:");
+    Serial.println(dist);
+    return;
+  }
+
+  uint8_t frame[11];
+  uint16_t a = (uint16_t)angle;
+  uint16_t d = (uint16_t)(dist * 10);  // mm
+  uint32_t t = millis();
+  frame[0] = 0xAA;
+  frame[1] = 0x55;
+  memcpy(frame + 2, &a, 2);  // AVR = little-endian
+  memcpy(frame + 4, &d, 2);
+  memcpy(frame + 6, &t, 4);
+  frame[10] = crc8(frame + 2, 8);
+  Serial.write(frame, sizeof(frame));
+}
+
 // --- FILTRE MEDIAN ---
 float getFilteredDistance() {
   float d1 = ultr.distanceCm();
@@ -0,0 +1,780 @@
+"""Cœur de l'interface radar, sans Tk : port série, décodage, pose et carte
+
+RadarEngine lit chaque port (ou enregistrement) dans un thread, et applique les
+mesures à la pose, aux points et à la grille d'occupation quand on appelle
+drain_samples() (à chaque frame pour l'interface, en boucle pour capture.py).
+Plusieurs robots peuvent être connectés à la fois : chacun a sa pose, tous
+alimentent la même carte.
+Les méthodes on_* et log_event sont les points d'accroche des interfaces.
+Les sous-systèmes optionnels (recalage, planification, enregistrement, fichiers
+de carte) ne sont importés qu'à leur première utilisation : démarrage rapide.
+"""
+import math
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+import serial
+
+from event_log import DEBUG, ERROR, INFO, EventLog, format_record, level_of
+from map_buffer import PointBuffer
+from metrics import Metrics
+from occupancy import OccupancyGrid
+from pose import PoseEstimator, to_world
+from protocol import CMD_AUTO, CMD_BINARY, Message, Sample, StreamDecoder, heading_command
+from sample_filter import SampleFilter
+from spatial_index import PointIndex
+
+
+MAX_MAP_POINTS = 200000
+MAP_CELL_SIZE = 5.0  # Taille d'une cellule de la grille d'occupation (cm)
+ROBOT_HALF_WIDTH = 10.0  # Demi-largeur du couloir de l'obstacle le plus proche (cm)
+
+# Recalage ICP en fin de scan
+ICP_MIN_POINTS = 20  # Échos minimum dans le scan pour tenter un recalage
+ICP_REFERENCE_RADIUS = 500.0  # Points de carte utilisés autour du robot (cm)
+ICP_MAX_SHIFT = 50.0  # Corrections plus grandes rejetées (cm)
+ICP_MAX_ANGLE = math.radians(30)
+ICP_MAX_RMS = 10.0  # cm
+
+# File threads de lecture → thread consommateur
+SAMPLE_QUEUE_SIZE = 50000
+MAX_DRAIN_PER_FRAME = 5000  # Au-delà, le reste est traité à l'appel suivant
+
+# Transport série (thread d'entrée/sortie par robot)
+READ_CHUNK = 4096  # Octets demandés par lecture (plus si le port en annonce davantage)
+SERIAL_TIMEOUT = 0.02  # s, attente max d'une lecture : bloc partiel rendu au-delà
+SETTLE_DELAY = 2.0  # s, redémarrage de l'Arduino à l'ouverture du port
+RECONNECT_MIN_DELAY = 0.5  # s, première attente avant de rouvrir un port perdu
+RECONNECT_MAX_DELAY = 10.0  # s, attente doublée à chaque échec jusqu'à ce plafond
+
+
+class RobotLink:
+    """Un robot : son port, son décodeur, sa pose et son scan en cours"""
+
+    def __init__(self, robot_id, max_distance=400):
+        self.id = robot_id
+        self.label = f"R{robot_id + 1}"
+        self.port = None  # Nom du port (ou journal rejoué) auquel le robot est associé
+        self.serial_port = None
+        self.baudrate = None  # None : rejeu (pas de reconnexion)
+        self.is_running = False  # Session ouverte (connexion en cours ou établie)
+        self.link_up = False  # Port ouvert et lu
+        self.reconnects = 0
+        self.stop_event = threading.Event()  # Fin de la session du thread de lecture
+        self.use_binary = False
+        self.clock = time.monotonic  # Horloge du flux (celle de l'enregistrement au rejeu)
+        self.decoder = StreamDecoder(robot_id)
+        # Médiane, portée et fusion par case angulaire ; absence d'écho = distance max capteur
+        self.sample_filter = SampleFilter(no_echo=max_distance)
+        self.pose = PoseEstimator()  # Position du robot dans le repère de la carte
+        self.recorder = None
+        self.read_thread = None
+        self.bytes_received = 0
+        self.samples_received = 0
+        self.current_angle = 0
+        self.current_distance = 0
+        self.current_point = (0.0, 0.0)  # Dernier écho en coordonnées monde
+        self.is_scanning = False
+        self.scan_id = 0  # Numéro (commun à tous les robots) du scan en cours
+        self.scan_rays = []  # Mesures du scan en cours (pour le recalage)
+        self.replay_start = None
+        self.last_error = 0.0
+
+
+class RadarEngine:
+    """État des robots et de la carte commune alimentés par les flux série
+
+    Chaque port a son thread de lecture ; tous remplissent la même file, vidée
+    par drain_samples(). Les éléments portent le numéro de leur robot.
+    """
+
+    def __init__(self):
+        self.max_distance = 400  # Distance max capteur (cm)
+        self.robots = [RobotLink(0, self.max_distance)]  # Le robot 0 existe toujours
+        self.metrics = Metrics()  # Débits et temps de frame, résumés chaque seconde
+        self.map_points = PointBuffer(MAX_MAP_POINTS)  # Carte commune à tous les robots
+        self.point_index = PointIndex(self.map_points)  # Requêtes par zone, obstacle le plus proche
+        self.occupancy = OccupancyGrid(MAP_CELL_SIZE)  # Carte cumulée sur tous les scans
+        self._pending_rays = []  # (x, y, cap, distance) à intégrer à la grille en fin de lot
+        self._match_rays = {}  # Scan envoyé au thread ICP → (robot, mesures)
+        self._scan_matcher = None  # Créé au premier recalage (scan_matcher)
+        self.scan_matching = False  # Recalage ICP en fin de scan
+        self.sample_filtering = True  # Filtrage des mesures avant la carte (sample_filter.py)
+        self._planner = None  # Créé au premier plan (planner)
+        self.navigation = False  # Cap planifié envoyé au robot en fin de scan (set_navigation)
+        self.scan_count = 0  # Scans de tous les robots
+        self.samples_received = 0
+        self.recording = None  # Nom de base des enregistrements en cours
+        self.sample_queue = deque()  # Remplie par read_serial, vidée par drain_samples
+        self.event_log = EventLog()  # Derniers événements (et fichier journal si ouvert)
+        self.log_level = INFO  # Niveau minimal affiché
+        self._closed = False
+
+    @property
+    def scan_matcher(self):
+        """Thread de recalage ICP, démarré à la première utilisation"""
+        if self._scan_matcher is None:
+            from scan_matching import ScanMatcher
+            self._scan_matcher = ScanMatcher()
+        return self._scan_matcher
+
+    @property
+    def planner(self):
+        """Planificateur de cap (planner.py), créé à la première utilisation"""
+        if self._planner is None:
+            from planner import NavigationPlanner
+            self._planner = NavigationPlanner(self.occupancy, self.point_index, self.max_distance,
+                                              ROBOT_HALF_WIDTH)
+        return self._planner
+
+    @property
+    def is_running(self):
+        return any(robot.is_running for robot in self.robots)
+
+    def running_robots(self):
+        return [robot for robot in self.robots if robot.is_running]
+
+    # --- Points d'accroche (redéfinis par l'interface graphique) ---
+
+    def log_event(self, message, level=None):
+        """Journal des événements (level : déduit de l'emoji si None) ; affiché en console"""
+        record = self.event_log.log(message, level)
+        if record.level >= self.log_level:
+            print(format_record(record), flush=True)
+
+    def log_robot(self, robot, message, level=None):
+        """Journal préfixé par le robot dès qu'il y en a plusieurs"""
+        level = level_of(message) if level is None else level
+        self.log_event(f"{robot.label} {message}" if len(self.robots) > 1 else message, level)
+
+    def on_connected(self, robot):
+        pass
+
+    def on_disconnected(self, robot):
+        pass
+
+    def on_link_changed(self, robot):
+        """Port ouvert, perdu ou rouvert (robot.link_up)"""
+
+    def on_scan_start(self, robot):
+        pass
+
+    def on_scan_end(self, robot):
+        pass
+
+    def on_map_changed(self):
+        """La carte a changé autrement que par ajout de mesures (reset, recalage)"""
+
+    # --- Connexion ---
+
+    def robot_for(self, port):
+        """Robot associé à `port` : le même qu'avant s'il a déjà été connecté, sinon un nouveau"""
+        for robot in self.robots:
+            if robot.port == port:
+                return robot
+        for robot in self.robots:
+            if robot.port is None:
+                robot.port = port
+                return robot
+        robot = RobotLink(len(self.robots), self.max_distance)
+        robot.port = port
+        self.robots.append(robot)
+        return robot
+
+    def connect(self, port, baudrate, binary=False):
+        """Connecter un robot à un port (nom ou URL pyserial) sans bloquer
+
+        Le port est ouvert par le thread de lecture : le résultat arrive dans la
+        file (STATUS LINK_UP, ou ERROR puis LINK_FAILED). Lève si déjà connecté.
+        """
+        robot = self.robot_for(port)
+        if robot.is_running:
+            raise ValueError(f"{port} déjà connecté")
+        robot.serial_port = None
+        robot.baudrate = baudrate
+        robot.reconnects = 0
+        robot.use_binary = binary
+        robot.clock = time.monotonic
+        self.log_robot(robot, f"🔌 Connexion au port {port}…")
+        self._start_reader(robot)
+        return robot
+
+    def start_replay(self, path, speed=1.0):
+        """Rejouer un enregistrement comme un robot de plus ; lève OSError / ValueError"""
+        from recording import ReplaySource
+        source = ReplaySource(path, speed)
+        robot = self.robot_for(path)
+        if robot.is_running:
+            source.close()
+            raise ValueError(f"{path} déjà en cours de rejeu")
+        robot.serial_port = source
+        robot.baudrate = None
+        robot.clock = source.clock
+        robot.use_binary = False
+        robot.replay_start = (time.perf_counter(), robot.samples_received)
+        self.log_robot(robot, f"▶️  Rejeu de {path} ({'max' if speed is None else f'x{speed:g}'})")
+        self._start_reader(robot)
+        return robot
+
+    def _start_reader(self, robot):
+        robot.is_running = True
+        robot.stop_event = threading.Event()  # Propre à la session : l'ancien thread peut finir seul
+        if self.recording is not None:
+            self._open_recorder(robot)
+        self.on_connected(robot)
+        # Démarrer le thread de lecture du robot
+        robot.read_thread = threading.Thread(target=self.read_serial, args=(robot,),
+                                             daemon=True)
+        robot.read_thread.start()
+
+    def disconnect(self, robot=None):
+        """Arrêter la lecture d'un robot (de tous par défaut) et fermer son port"""
+        for robot in [robot] if robot is not None else self.running_robots():
+            robot.is_running = False
+            robot.link_up = False
+            robot.stop_event.set()
+            if robot.serial_port:
+                robot.serial_port.close()
+            robot.pose.stop(robot.clock())
+            robot.clock = time.monotonic
+            robot.replay_start = None
+            self._close_recorder(robot)
+            self.log_robot(robot, "⏸️ Déconnecté")
+            self.on_disconnected(robot)
+
+    # --- Enregistrement (un journal par robot) ---
+
+    def start_recording(self, path=None):
+        """Enregistrer le flux brut de chaque robot connecté (nom horodaté par défaut)"""
+        self.recording = path or time.strftime("session_%Y%m%d_%H%M%S.rlog.gz")
+        for robot in self.running_robots():
+            self._open_recorder(robot)
+        self.log_event(f"⏺️  Enregistrement: {self.recording}")
+
+    def _open_recorder(self, robot):
+        path = self.recording
+        if robot.id:
+            directory, name = os.path.split(path)
+            base, dot, ext = name.partition(".")
+            # session.rlog.gz → session_R2.rlog.gz
+            path = os.path.join(directory, f"{base}_{robot.label}{dot}{ext}")
+        from recording import Recorder
+        robot.recorder = Recorder(path)
+
+    def _close_recorder(self, robot):
+        recorder, robot.recorder = robot.recorder, None
+        if recorder is not None:
+            recorder.close()
+            self.log_event(f"⏹️  Enregistré: {recorder.path} ({recorder.bytes_written} octets)")
+
+    def stop_recording(self):
+        self.recording = None
+        for robot in self.robots:
+            self._close_recorder(robot)
+
+    def close(self):
+        """Fermeture : refermer proprement les enregistrements et les ports"""
+        self._closed = True
+        for robot in self.robots:
+            robot.is_running = False
+            robot.stop_event.set()
+            if robot.recorder is not None:
+                robot.recorder.close()
+            if robot.serial_port:
+                robot.serial_port.close()
+        if self._scan_matcher is not None:
+            self._scan_matcher.shutdown()
+        self.event_log.close_file()
+
+    # --- Threads de lecture ---
+
+    def read_serial(self, robot):
+        """Thread d'entrée/sortie d'un robot : ouvre le port, décode, pousse dans la file
+
+        Aucun appel Tk. Un port perdu (câble USB, socket fermée) est rouvert avec
+        une attente croissante ; la carte et la pose sont conservées.
+        """
+        stop = robot.stop_event
+        port = robot.serial_port  # Déjà ouvert au rejeu
+        delay = RECONNECT_MIN_DELAY
+        try:
+            while not stop.is_set():
+                if port is None:
+                    try:
+                        port = self._open_port(robot, stop)
+                    except (serial.SerialException, OSError, ValueError) as e:
+                        if stop.is_set():
+                            break
+                        if robot.reconnects == 0:
+                            # Première ouverture : pas de reconnexion sur un port invalide
+                            self._push_link_error(robot, e, "LINK_FAILED")
+                            break
+                        stop.wait(delay)
+                        delay = min(delay * 2, RECONNECT_MAX_DELAY)
+                        continue
+                    if port is None:  # Déconnecté pendant l'ouverture
+                        break
+                    delay = RECONNECT_MIN_DELAY
+
+                try:
+                    self._read_port(robot, port, stop)
+                    break  # Fin de session ou du rejeu
+                except (serial.SerialException, OSError) as e:
+                    if stop.is_set():
+                        break
+                    port.close()
+                    port = None
+                    if robot.baudrate is None:  # Rejeu : rien à rouvrir
+                        self._push_link_error(robot, e, "REPLAY_END")
+                        break
+                    robot.reconnects += 1
+                    self._push_link_error(robot, e, "LINK_DOWN")
+        finally:
+            if port is not None:
+                port.close()  # Sans effet si disconnect() l'a déjà fermé (rejeu : referme le journal)
+
+    def _open_port(self, robot, stop):
+        """Ouvrir le port du robot (thread de lecture) ; None si la session s'arrête entre-temps"""
+        port = serial.serial_for_url(robot.port, baudrate=robot.baudrate, timeout=SERIAL_TIMEOUT)
+        # Attendre le redémarrage de l'Arduino (port réel uniquement, pas en socket://)
+        if isinstance(port, serial.Serial):
+            stop.wait(SETTLE_DELAY)
+        if stop.is_set():
+            port.close()
+            return None
+        port.reset_input_buffer()
+        # Demander le protocole binaire : un ancien firmware ignore la commande
+        # et continue en texte, que le décodeur accepte aussi
+        if robot.use_binary:
+            port.write(CMD_BINARY)
+        robot.serial_port = port  # Pour disconnect()
+        robot.decoder = StreamDecoder(robot.id)  # Pas de reste de trame de l'ancienne liaison
+        self.push_items([Message("STATUS", "LINK_UP", robot.clock(), robot.id)])
+        return port
+
+    def _read_port(self, robot, port, stop):
+        """Lire jusqu'à la fin de la session ; lève SerialException / OSError si le port est perdu"""
+        if robot.baudrate is None:
+            port.reset_input_buffer()
+        decoder = robot.decoder
+        while not stop.is_set():
+            try:
+                # Bloc fixe : en socket://, in_waiting ne vaut que 0 ou 1 (select)
+                raw_data = port.read(max(port.in_waiting, READ_CHUNK))
+                now = robot.clock()
+                if not raw_data:
+                    if getattr(port, 'finished', False) and not stop.is_set():
+                        self.push_items([Message("STATUS", "REPLAY_END", now, robot.id)])
+                        break
+                    continue
+
+                robot.bytes_received += len(raw_data)
+                recorder = robot.recorder
+                if recorder is not None:
+                    recorder.write(now, raw_data)
+
+                # Erreurs de parsing comptées par le décodeur, signalées par les instantanés
+                self.push_items(decoder.feed(raw_data, now))
+
+            except (serial.SerialException, OSError):
+                raise
+            except Exception as e:
+                if stop.is_set():
+                    break
+                if time.time() - robot.last_error > 5:
+                    self.push_items([Message("ERROR", str(e)[:40], robot.clock(), robot.id)])
+                    robot.last_error = time.time()
+                time.sleep(0.1)
+
+    def _push_link_error(self, robot, error, status):
+        now = robot.clock()
+        self.push_items([Message("ERROR", str(error)[:60], now, robot.id),
+                         Message("STATUS", status, now, robot.id)])
+
+    def push_items(self, items):
+        """Ajouter les éléments d'une lecture à la file (côté threads de lecture)"""
+        # File pleine : on ralentit le lecteur plutôt que de perdre des lignes,
+        # le buffer du port série absorbe l'attente
+        while len(self.sample_queue) >= SAMPLE_QUEUE_SIZE and not self._closed:
+            time.sleep(0.005)
+        self.sample_queue.extend(items)  # deque.extend d'une liste est atomique : pas de verrou
+
+    # --- Application des données (thread consommateur) ---
+
+    def drain_samples(self):
+        """Traiter par lot les éléments reçus depuis le dernier appel ; renvoie leur nombre"""
+        queue = self.sample_queue
+        count = min(len(queue), MAX_DRAIN_PER_FRAME)
+        for _ in range(count):
+            item = queue.popleft()
+            robot = self.robots[item.robot]
+            if isinstance(item, Sample):
+                self.samples_received += 1
+                robot.samples_received += 1
+                if self.sample_filtering:
+                    sample_filter = robot.sample_filter
+                    for sample in sample_filter.feed(item):
+                        self.handle_sample(sample, map_point=False)
+                    if sample_filter.points:
+                        for point in sample_filter.take_points():
+                            self.handle_point(point)
+                else:
+                    self.handle_sample(item)
+            else:
+                # Un message termine le balayage en cours (fin de scan, mouvement…)
+                sample_filter = robot.sample_filter
+                for sample in sample_filter.flush():
+                    self.handle_sample(sample, map_point=False)
+                for point in sample_filter.take_points():
+                    self.handle_point(point)
+                self.handle_message(item)
+
+        self.integrate_pending()
+
+        # Recalages terminés par le thread ICP
+        if self._scan_matcher is not None:
+            for result in self._scan_matcher.results():
+                self.apply_scan_match(result)
+            for failure in self._scan_matcher.take_failures():
+                self.report_scan_match_failure(failure)
+        return count
+
+    def integrate_pending(self):
+        """Une seule mise à jour vectorisée de la grille pour toutes les mesures en attente"""
+        if self._pending_rays:
+            xs, ys, bearings, distances = zip(*self._pending_rays)
+            self._pending_rays = []
+            self.occupancy.integrate(xs, ys, bearings, distances, self.max_distance)
+
+    def handle_sample(self, sample, map_point=True):
+        """Appliquer une mesure sonar (map_point=False : le point vient de handle_point)"""
+        robot = self.robots[sample.robot]
+        robot.current_angle = sample.angle
+        robot.current_distance = sample.distance
+
+        # ✅ Mesure replacée dans le repère monde selon la pose estimée du robot
+        x, y, bearing = robot.pose.sample_pose(sample.angle, sample.timestamp)
+
+        # La carte s'accumule : rien n'est effacé entre les tours
+        if sample.distance > 0:
+            self._pending_rays.append((x, y, bearing, sample.distance))
+            if robot.is_scanning:
+                robot.scan_rays.append((x, y, bearing, sample.distance))
+
+        if 0 < sample.distance < self.max_distance:
+            robot.current_point = to_world(x, y, bearing, sample.distance)
+            if map_point:
+                self.add_map_point(sample.angle, sample.distance, *robot.current_point,
+                                   timestamp=sample.timestamp, scan=robot.scan_id)
+
+    def handle_point(self, point):
+        """Ajouter à la carte le point fusionné d'une case angulaire (sample_filter.py)"""
+        robot = self.robots[point.robot]
+        x, y, bearing = robot.pose.sample_pose(point.angle, point.timestamp)
+        self.add_map_point(point.angle, point.distance, *to_world(x, y, bearing, point.distance),
+                           timestamp=point.timestamp, scan=robot.scan_id)
+
+    def handle_message(self, message):
+        """Appliquer un message EVENT / STATUS / INFO / MSG / ERROR"""
+        kind, value = message.kind, message.value
+        robot = self.robots[message.robot]
+        robot.pose.handle_message(kind, value, message.timestamp)
+
+        # Événements
+        if kind == "EVENT":
+            if value.startswith("OBSTACLE"):
+                self.log_robot(robot, "⚠️  Obstacle détecté", INFO)  # Routine, pas une alerte
+            elif value == "METRE":
+                self.log_robot(robot, "📏 1 mètre parcouru")
+            elif value == "AUTO_SCAN":
+                self.log_robot(robot, "📏 1 mètre parcouru")
+
+        # Statuts
+        elif kind == "STATUS":
+            if value == "SCAN_START":
+                self.scan_count += 1
+                robot.is_scanning = True
+                robot.scan_id = self.scan_count
+                robot.scan_rays = []
+                self.on_scan_start(robot)
+                self.log_robot(robot, "🔄 Début du scan 360°")
+
+            elif value.startswith("SCAN_END"):
+                robot.is_scanning = False
+                if self.navigation:
+                    self.send_heading(robot, message.timestamp)  # Le robot attend pendant son recul
+                if self.scan_matching:
+                    self.submit_scan_match(robot)
+                self.on_scan_end(robot)
+                if ':' in value:
+                    measures = value.split(':')[1]
+                    self.log_robot(robot, f"✓ Scan terminé: {measures} mesures")
+                else:
+                    self.log_robot(robot, "✓ Scan terminé")
+
+            elif value == "REPLAY_END":
+                if robot.replay_start is not None:
+                    start, samples = robot.replay_start
+                    elapsed = time.perf_counter() - start
+                    count = robot.samples_received - samples
+                    self.log_robot(robot, f"⏹️  Rejeu terminé: {count} mesures en {elapsed:.1f} s "
+                                          f"({count / max(elapsed, 1e-6):.0f} mesures/s)")
+                if robot.is_running:
+                    self.disconnect(robot)
+            elif value == "LINK_UP":
+                robot.link_up = True
+                if robot.reconnects:
+                    self.log_robot(robot, f"🔁 Reconnecté au port {robot.port}")
+                else:
+                    self.log_robot(robot, f"✅ Connecté au port {robot.port}")
+                self.on_link_changed(robot)
+            elif value == "LINK_DOWN":
+                robot.link_up = False
+                robot.is_scanning = False  # Scan interrompu : pas de recalage
+                self.log_robot(robot, "⚠️  Liaison perdue, reconnexion…")
+                self.on_link_changed(robot)
+            elif value == "LINK_FAILED":
+                if robot.is_running:
+                    self.disconnect(robot)
+            elif value == "AUTO":
+                self.log_robot(robot, "✓ Cap choisi par le robot")
+            elif value == "BINARY":
+                self.log_robot(robot, "✓ Protocole binaire actif")
+            elif value == "READY":
+                self.log_robot(robot, "✓ Robot prêt")
+            elif value == "STARTED":
+                self.log_robot(robot, "▶️  Robot démarré")
+            elif value == "STOPPED":
+                self.log_robot(robot, "⏸️  Robot arrêté")
+
+        # Messages INFO
+        elif kind == "INFO":
+            self.log_robot(robot, f"📥 INFO:{value}")
+
+        # Virages (la pose est déjà mise à jour)
+        elif kind == "MSG" and value.startswith(("TURN_LEFT:", "TURN_RIGHT:")):
+            self.log_robot(robot, f"↪️  {value}")
+
+        # Autres messages du firmware (analyse des secteurs…) : détail
+        elif kind == "MSG":
+            self.log_robot(robot, f"💬 {value}", DEBUG)
+
+        elif kind == "ERROR":
+            self.log_robot(robot, f"⚠️  {value}", ERROR)
+
+    # --- Navigation ---
+
+    def set_navigation(self, enabled):
+        """Activer le cap planifié ; à l'arrêt, les robots reprennent leur propre choix"""
+        self.navigation = enabled
+        if not enabled:
+            for robot in self.running_robots():
+                self.send_command(robot, CMD_AUTO)
+
+    def send_command(self, robot, command):
+        """Écrire une commande sur le port du robot ; False si le port n'est pas ouvert"""
+        port = robot.serial_port
+        if not robot.link_up or robot.baudrate is None or port is None:
+            return False  # Rejeu ou liaison coupée
+        try:
+            port.write(command)  # pyserial : écriture possible pendant la lecture du thread du robot
+        except (serial.SerialException, OSError) as e:
+            self.log_robot(robot, f"⚠️  Commande non envoyée: {e}")
+            return False
+        return True
+
+    def send_heading(self, robot, timestamp):
+        """Planifier le cap depuis la pose de fin de scan et l'envoyer au robot"""
+        self.integrate_pending()  # Les dernières mesures du scan comptent
+        x, y, heading = robot.pose.pose_at(timestamp)
+        plan = self.planner.plan(x, y, heading)
+        if not self.send_command(robot, heading_command(plan.turn)):
+            return None
+        if plan.goal is not None:
+            goal = f"frontière à {plan.path:.0f} cm"
+        else:
+            goal = "pas de frontière"
+        self.log_robot(robot, f"🧭 Cap planifié: {plan.turn}° ({goal}, dégagé sur "
+                              f"{plan.clearance:.0f} cm) en {plan.elapsed * 1000:.1f} ms")
+        return plan
+
+    # --- Recalage ---
+
+    def submit_scan_match(self, robot):
+        """Envoyer le scan terminé d'un robot au thread ICP, aligné sur le reste de la carte"""
+        rays = np.array(robot.scan_rays, dtype=np.float64).reshape(-1, 4)
+        rays = rays[rays[:, 3] < self.max_distance]  # Échos uniquement
+        if len(rays) < ICP_MIN_POINTS:
+            return
+
+        rad = np.radians(rays[:, 2])
+        source = np.column_stack((rays[:, 0] + rays[:, 3] * np.sin(rad),
+                                  rays[:, 1] + rays[:, 3] * np.cos(rad)))
+
+        # Référence : points des autres scans (de tous les robots) autour du robot
+        points = self.map_points.points()
+        x, y, _ = robot.pose.pose_at(robot.clock())
+        near = ((points["scan"] != robot.scan_id)
+                & ((points["x"] - x) ** 2 + (points["y"] - y) ** 2 < ICP_REFERENCE_RADIUS ** 2))
+        reference = np.column_stack((points["x"][near], points["y"][near])).astype(np.float64)
+        if len(reference) < ICP_MIN_POINTS:
+            return
+
+        self._match_rays[robot.scan_id] = (robot, rays)
+        self.scan_matcher.submit(robot.scan_id, source, reference)
+
+    def apply_scan_match(self, result):
+        """Corriger pose, points et grille avec le résultat d'un recalage"""
+        match = self._match_rays.pop(result.scan, None)
+        if match is None or not result.converged:
+            return
+        robot, rays = match
+        if (result.rms > ICP_MAX_RMS or abs(result.angle) > ICP_MAX_ANGLE
+                or math.hypot(result.tx, result.ty) > ICP_MAX_SHIFT):
+            self.log_robot(robot, f"⚠️  Recalage rejeté (rms {result.rms:.1f} cm)")
+            return
+
+        robot.pose.apply_correction(result.angle, result.tx, result.ty)
+        self.map_points.transform_scan(result.scan, result.angle, result.tx, result.ty)
+
+        # Grille : retirer les mesures du scan puis les remettre recalées
+        x, y, bearing, distance = rays.T
+        self.occupancy.integrate(x, y, bearing, distance, self.max_distance, weight=-1.0)
+        c, s = math.cos(result.angle), math.sin(result.angle)
+        self.occupancy.integrate(c * x - s * y + result.tx, s * x + c * y + result.ty,
+                                 bearing - math.degrees(result.angle), distance,
+                                 self.max_distance)
+        self.on_map_changed()
+        self.log_robot(robot, f"🎯 Recalage: {result.tx:+.1f}, {result.ty:+.1f} cm, "
+                       f"{math.degrees(result.angle):+.1f}° (rms {result.rms:.1f})")
+
+    def report_scan_match_failure(self, failure):
+        """Journaliser un recalage en erreur ; le scan reste tel quel sur la carte"""
+        match = self._match_rays.pop(failure.scan, None)
+        message = f"❌ ICP scan {failure.scan}: {type(failure.error).__name__}: {failure.error}"
+        if match is None:
+            self.log_event(message)
+        else:
+            self.log_robot(match[0], message)
+
+    # --- Carte ---
+
+    def reset_map(self):
+        """Réinitialiser la cartographie"""
+        self.map_points.clear()
+        self.occupancy.clear()
+        for robot in self.robots:
+            robot.pose.reset(robot.clock())
+            robot.scan_rays = []
+            robot.sample_filter = SampleFilter(no_echo=self.max_distance)
+        self._pending_rays = []
+        self._match_rays = {}
+        self.scan_count = 0
+        self.on_map_changed()
+        self.log_event("🗑️  Carte réinitialisée")
+
+    def add_map_point(self, angle, distance, x, y, timestamp=0.0, scan=0):
+        """Ajouter un point à la carte (le plus ancien est écrasé au-delà de MAX_MAP_POINTS)"""
+        self.map_points.append(angle, distance, x, y, timestamp, scan)
+
+    def nearest_obstacle(self, robot, bearing=0.0, max_range=None):
+        """Distance (cm) du premier point de la carte devant le robot, dans la direction
+        `bearing` relative à son cap ; None si rien avant max_range"""
+        x, y, heading = robot.pose.pose_at(robot.clock())
+        return self.point_index.nearest(x, y, heading + bearing, max_range or self.max_distance,
+                                        ROBOT_HALF_WIDTH)
+
+    def save_snapshot(self, path, pixels_per_cell=1):
+        """Écrire la grille d'occupation entière en image (.ppm, .png ou .pgm + .yaml)
+
+        Renvoie False si la carte est vide.
+        """
+        import map_file
+        if path.lower().endswith(".pgm"):
+            return map_file.write_pgm(path, self.occupancy)
+        rgb = map_file.grid_rgb(self.occupancy, pixels_per_cell)
+        if rgb is None:
+            return False
+        if path.lower().endswith(".png"):
+            map_file.write_png(path, rgb)
+        else:
+            with open(path, 'wb') as f:
+                f.write(b"P6 %d %d 255\n" % (rgb.shape[1], rgb.shape[0]) + rgb.tobytes())
+        return True
+
+    def export_map(self, path=None):
+        """Sauvegarder points, grille et trajectoires (.npz, nom horodaté par défaut)"""
+        import map_file
+        path = path or time.strftime("carte_%Y%m%d_%H%M%S.npz")
+        poses, trajectories = [], []
+        for robot in self.robots:
+            x, y, heading = robot.pose.pose_at(robot.clock())
+            poses.append((robot.id, x, y, heading))
+            trajectories.append((robot.id, robot.pose.trajectory + [(x, y)]))
+        map_file.save(path, self.map_points.points(), self.occupancy, poses, trajectories,
+                      scans=self.scan_count, max_distance=self.max_distance)
+        self.log_event(f"💾 Carte sauvegardée: {path} ({len(self.map_points)} points)")
+        return path
+
+    def import_map(self, path):
+        """Remplacer la carte par une carte sauvegardée ; lève OSError / ValueError
+
+        Les tuiles restent projetées depuis le fichier (copie à l'écriture) et
+        seuls les MAX_MAP_POINTS derniers points sont copiés : l'ouverture est
+        immédiate quelle que soit la taille de la carte.
+        """
+        import map_file
+        saved = map_file.load(path)
+        grid = saved.grid()
+        self.occupancy.clear()
+        self.occupancy.cell_size = grid.cell_size
+        self.occupancy.tile_size = grid.tile_size
+        self.occupancy.tiles.update(grid.tiles)
+        self.map_points.clear()
+        self.map_points.extend(saved.points)
+        self._pending_rays = []
+        self._match_rays = {}
+        self.scan_count = saved.meta.get("scans", 0)
+
+        # Les robots reprennent leur dernière pose : une nouvelle connexion prolonge la session
+        trajectories = saved.trajectories()
+        for robot_id, x, y, heading in saved.poses.tolist():
+            while len(self.robots) <= robot_id:
+                self.robots.append(RobotLink(len(self.robots), self.max_distance))
+            robot = self.robots[robot_id]
+            robot.pose.restore(x, y, heading, trajectories.get(robot_id, ()))
+            robot.scan_rays = []
+        self.on_map_changed()
+        self.log_event(f"📂 Carte chargée: {path} ({len(saved.points)} points, "
+                       f"{len(grid.tiles)} tuiles)")
+
+    # --- Instrumentation ---
+
+    def metrics_snapshot(self, totals=None, **gauges):
+        """Instantané des compteurs du moteur (plus les compteurs et jauges de l'appelant)"""
+        self.metrics.bytes = sum(robot.bytes_received for robot in self.robots)
+        return self.metrics.snapshot(
+            {"samples": self.samples_received,
+             "parse_errors": sum(robot.decoder.parse_errors + robot.decoder.crc_errors
+                                 for robot in self.robots),
+             **(totals or {})},
+            robots=len(self.running_robots()),
+            queue_depth=len(self.sample_queue),
+            map_points=len(self.map_points),
+            scans=self.scan_count,
+            reconnects=sum(robot.reconnects for robot in self.robots),
+            **gauges,
+        )
+
+    def report_parse_errors(self, row):
+        """Signaler les erreurs de parsing d'un instantané, avec la dernière ligne fautive de
+        chaque robot"""
+        if row["parse_errors_per_s"] <= 0:
+            return
+        lines = ", ".join(f"{robot.label}: {robot.decoder.last_error_line[:30]}"
+                          for robot in self.robots if robot.decoder.parse_errors)
+        self.log_event(f"⚠️  Erreurs de parsing: {row['parse_errors_per_s']:.0f}/s"
+                       + (f" (dernière: {lines})" if lines else ""))
@@ -0,0 +1,119 @@
+"""Journal des événements : tampon circulaire, niveaux, fichier tournant
+
+log() ne fait qu'ajouter un enregistrement à un tampon borné (coût constant,
+utilisable depuis n'importe quel thread) ; l'affichage relit les nouveaux
+enregistrements à son rythme avec since() (une fois par frame pour
+l'interface), en ne gardant que les derniers si une rafale dépasse l'écran.
+Les enregistrements peuvent aussi être écrits au fil de l'eau dans un fichier,
+remplacé par un nouveau au-delà de max_bytes (journal.log → journal.log.1 …).
+
+Le niveau d'un message sans niveau explicite se déduit de son emoji :
+❌ erreur, ⚠️ avertissement, sinon information.
+"""
+import os
+import threading
+import time
+from collections import deque, namedtuple
+
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+LEVELS = {name: level for level, name in LEVEL_NAMES.items()}
+
+LOG_CAPACITY = 2000  # Enregistrements gardés en mémoire
+LOG_FILE_MAX_BYTES = 1_000_000  # Taille d'un fichier avant rotation
+LOG_FILE_BACKUPS = 3  # Anciens fichiers gardés (.1, .2, .3)
+
+# seq : numéro croissant (since), time : time.time(), level : DEBUG…ERROR
+LogRecord = namedtuple("LogRecord", "seq time level message")
+
+
+def level_of(message):
+    """Niveau déduit du préfixe du message"""
+    if message.startswith("❌"):
+        return ERROR
+    if message.startswith("⚠️"):
+        return WARNING
+    return INFO
+
+
+def format_record(record):
+    """Ligne affichée : "[HH:MM:SS] message\""""
+    return f"[{time.strftime('%H:%M:%S', time.localtime(record.time))}] {record.message}"
+
+
+class EventLog:
+    """Tampon circulaire des derniers événements, avec copie optionnelle dans un fichier"""
+
+    def __init__(self, capacity=LOG_CAPACITY):
+        self.records = deque(maxlen=capacity)
+        self.total = 0  # Numéro du dernier enregistrement
+        self.path = None
+        self.file_level = DEBUG
+        self.max_bytes = LOG_FILE_MAX_BYTES
+        self.backups = LOG_FILE_BACKUPS
+        self._file = None
+        self._lock = threading.Lock()  # Numérotation, tampon et fichier dans le même ordre
+
+    def log(self, message, level=None):
+        """Ajouter un événement ; renvoie son enregistrement"""
+        if level is None:
+            level = level_of(message)
+        with self._lock:
+            self.total += 1
+            record = LogRecord(self.total, time.time(), level, message)
+            self.records.append(record)
+            if self._file is not None and level >= self.file_level:
+                self._write(record)
+        return record
+
+    def since(self, seq, level=DEBUG, limit=None):
+        """Enregistrements postérieurs à `seq` encore en mémoire, de niveau >= `level`
+
+        Renvoie (numéro du dernier enregistrement lu, enregistrements) ; ordre
+        chronologique, seulement les `limit` derniers si limit est donné.
+        """
+        with self._lock:
+            last = self.total
+            count = min(last - seq, len(self.records))
+            records = [self.records[-i] for i in range(count, 0, -1)] if count > 0 else []
+        records = [record for record in records if record.level >= level]
+        if limit is not None and len(records) > limit:
+            records = records[-limit:]
+        return last, records
+
+    # --- Fichier ---
+
+    def open_file(self, path, level=DEBUG, max_bytes=LOG_FILE_MAX_BYTES,
+                  backups=LOG_FILE_BACKUPS):
+        """Écrire désormais chaque événement de niveau >= `level` dans `path` (ajout)"""
+        self.close_file()
+        with self._lock:
+            self.path = path
+            self.file_level = level
+            self.max_bytes = max_bytes
+            self.backups = backups
+            # Tampon ligne : une ligne est sur le disque dès qu'elle est journalisée
+            self._file = open(path, "a", encoding="utf-8", buffering=1)
+
+    def close_file(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def _write(self, record):
+        """Écrire une ligne (verrou tenu), puis changer de fichier si la taille est atteinte"""
+        self._file.write(f"{time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record.time))} "
+                         f"{LEVEL_NAMES.get(record.level, record.level):<7} {record.message}\n")
+        if self.max_bytes and self._file.tell() >= self.max_bytes:
+            self._file.close()
+            for index in range(self.backups - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+            if self.backups > 0:
+                os.replace(self.path, f"{self.path}.1")
+            else:
+                os.remove(self.path)
+            self._file = open(self.path, "a", encoding="utf-8", buffering=1)
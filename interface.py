@@ -1,33 +1,83 @@
 import tkinter as tk
-from tkinter import ttk
+from tkinter import filedialog, ttk
 import math
-import serial
-import serial.tools.list_ports
 import threading
 import time
+from collections import deque
 
+from engine import MAX_MAP_POINTS, RadarEngine
+from event_log import LEVEL_NAMES, LEVELS, format_record
+from map_buffer import PointRaster
+from metrics import MetricsExporter, format_overlay
+from scheduler import TRAIL_LENGTHS, FrameScheduler
 
-class RadarInterface:
-    def __init__(self, root):
+
+# Taille des pools d'items réutilisés par le radar
+TRAIL_POOL_SIZE = max(TRAIL_LENGTHS)  # Traînée la plus longue du planificateur de frames
+SWEEP_POOL_SIZE = 25
+
+# Vitesses de rejeu d'un enregistrement (None = au plus vite)
+REPLAY_SPEEDS = {"x1": 1.0, "x4": 4.0, "x16": 16.0, "max": None}
+
+# Couleurs des robots sur la carte : (robot, trajectoire)
+ROBOT_COLORS = (('#0000ff', '#0088ff'), ('#ff00ff', '#ff88ff'), ('#ff8800', '#ffbb66'),
+                ('#ffff00', '#ffff88'), ('#00ffff', '#88ffff'), ('#ffffff', '#aaaaaa'),
+                ('#8800ff', '#bb88ff'), ('#ff0088', '#ff88bb'))
+
+# Vitesses proposées (SERIAL_BAUD du firmware doit correspondre)
+BAUD_RATES = ("9600", "57600", "115200", "250000")
+
+# Scrutation du résultat de l'énumération des ports (thread)
+PORTS_POLL_INTERVAL = 50  # ms
+
+# Lignes gardées dans le widget du journal (le tampon de event_log en garde plus)
+LOG_WIDGET_LINES = 50
+
+# Zoom de la carte (1 = portée du capteur sur le canvas) ; borné en bas : la grille
+# rendue couvre toute la zone visible
+MIN_MAP_ZOOM = 0.25
+MAX_MAP_ZOOM = 16.0
+
+
+class RadarInterface(RadarEngine):
+    def __init__(self, root, metrics_path=None):
+        self._startup = time.perf_counter()  # Temps de démarrage affiché à la première frame
+        super().__init__()
         self.root = root
         self.root.title("mBot Radar & Cartographie")
         self.root.geometry("1400x800")
         self.root.configure(bg='#000000')
         
-        # Variables
-        self.serial_port = None
-        self.is_running = False
-        self.current_angle = 0
-        self.current_distance = 0
-        self.radar_points = []  # Pour l'effet de traînée
-        self.map_points = []  # Pour la cartographie persistante
-        self.max_distance = 400  # Distance max capteur (cm)
-        self.is_scanning = False
-        self.scan_count = 0
+        # Variables (l'état du robot et de la carte est dans RadarEngine)
+        self.radar_points = deque(maxlen=TRAIL_POOL_SIZE)  # Pour l'effet de traînée
+        self._trail_samples = 0  # samples_received lors de la dernière frame radar
+        self.radar_robot = 0  # Robot affiché sur le radar
+        self.scheduler = FrameScheduler()  # Frames sautées au repos, allégées sous charge
+        self.metrics_exporter = MetricsExporter(metrics_path) if metrics_path else None
+        self.show_overlay = False
+        self.point_raster = PointRaster(MAX_MAP_POINTS)
+        self.map_mode = "grid"  # "grid" = grille d'occupation, "points" = points bruts
+        self._radar_geom = None  # (centre x, centre y, rayon) connus après <Configure>
+        self._map_geom = None  # (centre x, centre y, échelle)
+        self._map_view = None  # (largeur, hauteur, centre x, centre y, échelle)
+        self.map_zoom = 1.0  # Molette : zoom autour du pointeur
+        self.map_pan = (0.0, 0.0)  # Glisser : point du monde (cm) au centre du canvas
+        self._drag_start = None
+        self._radar_info_text = None
+        self._log_seq = 0  # Dernier enregistrement du journal recopié dans le widget
+        self._log_lines = 0  # Lignes dans le widget
+        self._ports_thread = None
+        self._ports_found = None  # Résultat du thread d'énumération (liste ou exception)
         
         # Configuration interface
         self.setup_ui()
         
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        
+        # Ports énumérés en arrière-plan : la fenêtre s'affiche sans les attendre
+        self.refresh_ports()
+        self.root.after_idle(self.report_startup)
+        
         # Démarrage animation
         self.animate_radar()
         
@@ -45,12 +95,48 @@ class RadarInterface:
                 font=('Courier', 10)).pack(side=tk.LEFT, padx=5)
         
         self.port_var = tk.StringVar()
-        ports = [port.device for port in serial.tools.list_ports.comports()]
+        # Éditable : on peut aussi saisir une URL pyserial (socket://localhost:7777 du simulateur)
+        # Liste remplie par refresh_ports
         self.port_combo = ttk.Combobox(control_frame, textvariable=self.port_var, 
-                                       values=ports, width=15, state='readonly')
-        if ports:
-            self.port_combo.current(0)
+                                       values=[], width=22)
         self.port_combo.pack(side=tk.LEFT, padx=5)
+        self.port_var.trace_add("write", self.update_connection_status)
+        
+        # Vitesse et protocole
+        self.baud_var = tk.StringVar(value=BAUD_RATES[0])
+        self.baud_combo = ttk.Combobox(control_frame, textvariable=self.baud_var,
+                                       values=BAUD_RATES, width=7, state='readonly')
+        self.baud_combo.pack(side=tk.LEFT, padx=5)
+        
+        self.binary_var = tk.BooleanVar(value=False)
+        self.binary_check = tk.Checkbutton(control_frame, text="Binaire", variable=self.binary_var,
+                                           bg='#000000', fg='#00ff00', selectcolor='#001a00',
+                                           activebackground='#000000', font=('Courier', 10))
+        self.binary_check.pack(side=tk.LEFT, padx=5)
+        
+        # Recalage des scans (ICP)
+        self.icp_var = tk.BooleanVar(value=False)
+        self.icp_check = tk.Checkbutton(control_frame, text="Recalage", variable=self.icp_var,
+                                        command=self.toggle_scan_matching,
+                                        bg='#000000', fg='#00ff00', selectcolor='#001a00',
+                                        activebackground='#000000', font=('Courier', 10))
+        self.icp_check.pack(side=tk.LEFT, padx=5)
+        
+        # Filtrage des mesures (médiane, portée, fusion par case angulaire)
+        self.filter_var = tk.BooleanVar(value=self.sample_filtering)
+        self.filter_check = tk.Checkbutton(control_frame, text="Filtre", variable=self.filter_var,
+                                           command=self.toggle_sample_filtering,
+                                           bg='#000000', fg='#00ff00', selectcolor='#001a00',
+                                           activebackground='#000000', font=('Courier', 10))
+        self.filter_check.pack(side=tk.LEFT, padx=5)
+        
+        # Cap planifié sur la carte et envoyé au robot en fin de scan (planner.py)
+        self.nav_var = tk.BooleanVar(value=self.navigation)
+        self.nav_check = tk.Checkbutton(control_frame, text="Navigation", variable=self.nav_var,
+                                        command=self.toggle_navigation,
+                                        bg='#000000', fg='#00ff00', selectcolor='#001a00',
+                                        activebackground='#000000', font=('Courier', 10))
+        self.nav_check.pack(side=tk.LEFT, padx=5)
         
         # Bouton refresh ports
         self.refresh_btn = tk.Button(control_frame, text="🔄", command=self.refresh_ports,
@@ -87,6 +173,54 @@ class RadarInterface:
                                    relief=tk.FLAT, padx=10)
         self.reset_btn.pack(side=tk.RIGHT, padx=5)
         
+        # Sauvegarde / chargement / export de la carte
+        self.map_btn = tk.Menubutton(control_frame, text="Carte", bg='#001a00', fg='#00ff00',
+                                     font=('Courier', 10), relief=tk.FLAT, padx=10)
+        map_menu = tk.Menu(self.map_btn, tearoff=0, bg='#001a00', fg='#00ff00')
+        map_menu.add_command(label="Sauvegarder…", command=self.choose_map_export)
+        map_menu.add_command(label="Ouvrir…", command=self.choose_map_import)
+        map_menu.add_command(label="Exporter image…", command=self.choose_image_export)
+        self.map_btn.config(menu=map_menu)
+        self.map_btn.pack(side=tk.RIGHT, padx=5)
+        
+        # Enregistrement et rejeu
+        self.rec_btn = tk.Button(control_frame, text="⏺ REC", command=self.toggle_recording,
+                                 bg='#001a00', fg='#ff0000', font=('Courier', 10),
+                                 relief=tk.FLAT, padx=10)
+        self.rec_btn.pack(side=tk.RIGHT, padx=5)
+        
+        self.replay_speed_var = tk.StringVar(value="x1")
+        self.replay_speed_combo = ttk.Combobox(control_frame, textvariable=self.replay_speed_var,
+                                               values=list(REPLAY_SPEEDS), width=4,
+                                               state='readonly')
+        self.replay_speed_combo.pack(side=tk.RIGHT, padx=5)
+        
+        self.replay_btn = tk.Button(control_frame, text="Rejouer", command=self.choose_replay,
+                                    bg='#001a00', fg='#00ff00', font=('Courier', 10),
+                                    relief=tk.FLAT, padx=10)
+        self.replay_btn.pack(side=tk.RIGHT, padx=5)
+        
+        # Robot affiché sur le radar (plusieurs robots connectés)
+        self.radar_robot_btn = tk.Button(control_frame, text="Radar: R1",
+                                         command=self.next_radar_robot,
+                                         bg='#001a00', fg='#00ff00', font=('Courier', 10),
+                                         relief=tk.FLAT, padx=10)
+        self.radar_robot_btn.pack(side=tk.RIGHT, padx=5)
+        
+        # Statistiques de performance (aussi avec F3)
+        self.stats_btn = tk.Button(control_frame, text="Stats", command=self.toggle_overlay,
+                                   bg='#001a00', fg='#00ffff', font=('Courier', 10),
+                                   relief=tk.FLAT, padx=10)
+        self.stats_btn.pack(side=tk.RIGHT, padx=5)
+        self.root.bind("<F3>", self.toggle_overlay)
+        
+        # Bouton vue grille / points
+        self.view_btn = tk.Button(control_frame, text="Vue: Grille",
+                                  command=self.toggle_map_mode,
+                                  bg='#001a00', fg='#00ff00', font=('Courier', 10),
+                                  relief=tk.FLAT, padx=10)
+        self.view_btn.pack(side=tk.RIGHT, padx=5)
+        
         # Frame pour les canvas
         canvas_frame = tk.Frame(main_frame, bg='#000000')
         canvas_frame.pack(fill=tk.BOTH, expand=True)
@@ -127,418 +261,699 @@ class RadarInterface:
         log_frame = tk.Frame(main_frame, bg='#000000')
         log_frame.pack(side=tk.BOTTOM, fill=tk.X, pady=(10, 0))
         
-        tk.Label(log_frame, text="LOG ÉVÉNEMENTS:", bg='#000000', fg='#00ff00',
-                font=('Courier', 10, 'bold')).pack(anchor=tk.W)
+        log_header = tk.Frame(log_frame, bg='#000000')
+        log_header.pack(fill=tk.X)
+        tk.Label(log_header, text="LOG ÉVÉNEMENTS:", bg='#000000', fg='#00ff00',
+                font=('Courier', 10, 'bold')).pack(side=tk.LEFT)
+        
+        # Niveau minimal affiché (le fichier journal garde tout)
+        self.log_level_var = tk.StringVar(value=LEVEL_NAMES[self.log_level])
+        self.log_level_combo = ttk.Combobox(log_header, textvariable=self.log_level_var,
+                                            values=list(LEVELS), width=8, state="readonly")
+        self.log_level_combo.pack(side=tk.RIGHT, padx=5)
+        self.log_level_combo.bind("<<ComboboxSelected>>", self.set_log_level)
         
         self.log_text = tk.Text(log_frame, height=4, bg='#001a00', fg='#00ff00',
                                font=('Courier', 8), relief=tk.FLAT)
         self.log_text.pack(fill=tk.X, padx=5, pady=5)
         
-        # Dessiner les grilles initiales
-        self.root.after(100, self.draw_radar_grid)
-        self.root.after(100, self.draw_map_grid)
+        # Items dynamiques créés une seule fois, grilles redessinées au redimensionnement
+        self.setup_radar_items()
+        self.setup_map_items()
+        self.radar_canvas.bind("<Configure>", self.draw_radar_grid)
+        self.map_canvas.bind("<Configure>", self.draw_map_grid)
+        # Déplacement et zoom de la carte (double-clic : vue initiale)
+        self.map_canvas.bind("<ButtonPress-1>", self.start_map_drag)
+        self.map_canvas.bind("<B1-Motion>", self.drag_map)
+        self.map_canvas.bind("<Double-Button-1>", self.reset_map_view)
+        self.map_canvas.bind("<MouseWheel>", self.zoom_map)
+        self.map_canvas.bind("<Button-4>", self.zoom_map)
+        self.map_canvas.bind("<Button-5>", self.zoom_map)
     
-    def log_event(self, message):
-        """Ajouter un message au log"""
-        timestamp = time.strftime("%H:%M:%S")
-        self.log_text.insert(tk.END, f"[{timestamp}] {message}\n")
+    def log_event(self, message, level=None):
+        """Ajouter un message au log (affiché à la frame suivante par flush_log)"""
+        self.event_log.log(message, level)
+
+    def flush_log(self):
+        """Recopier dans le widget, en une insertion, les messages arrivés depuis la frame précédente"""
+        if self.event_log.total == self._log_seq:
+            return
+        self._log_seq, records = self.event_log.since(self._log_seq, self.log_level,
+                                                      LOG_WIDGET_LINES)
+        if not records:
+            return
+        self.log_text.insert(tk.END, "".join(format_record(record) + "\n" for record in records))
+        self._log_lines += len(records)
+        if self._log_lines > LOG_WIDGET_LINES:
+            # Retirer d'un coup les lignes en trop (compteur tenu à jour : pas de relecture du texte)
+            self.log_text.delete("1.0", f"{self._log_lines - LOG_WIDGET_LINES + 1}.0")
+            self._log_lines = LOG_WIDGET_LINES
         self.log_text.see(tk.END)
-        lines = self.log_text.get("1.0", tk.END).split("\n")
-        if len(lines) > 50:
-            self.log_text.delete("1.0", "2.0")
+
+    def set_log_level(self, event=None):
+        """Changer le niveau affiché : le widget est reconstruit depuis le tampon du journal"""
+        self.log_level = LEVELS[self.log_level_var.get()]
+        self.log_text.delete("1.0", tk.END)
+        self._log_seq = self._log_lines = 0
+        self.flush_log()
     
+    def report_startup(self):
+        """Première frame affichée : journaliser le temps de démarrage"""
+        self.root.update_idletasks()
+        self.log_event(f"🚀 Fenêtre prête en {(time.perf_counter() - self._startup) * 1000:.0f} ms")
+
     def refresh_ports(self):
-        """Rafraîchir la liste des ports série"""
-        ports = [port.device for port in serial.tools.list_ports.comports()]
+        """Rafraîchir la liste des ports série (énumération dans un thread : peut prendre
+        plusieurs secondes avec beaucoup de ports virtuels)"""
+        if self._ports_thread is not None and self._ports_thread.is_alive():
+            return
+        self._ports_found = None
+        self._ports_thread = threading.Thread(target=self.enumerate_ports, daemon=True)
+        self._ports_thread.start()
+        self.root.after(PORTS_POLL_INTERVAL, self.poll_ports)
+
+    def enumerate_ports(self):
+        """Thread d'énumération : aucun appel Tk, le résultat est relevé par poll_ports"""
+        import serial.tools.list_ports
+        try:
+            self._ports_found = [port.device for port in serial.tools.list_ports.comports()]
+        except Exception as e:
+            self._ports_found = e
+
+    def poll_ports(self):
+        """Remplir la liste des ports dès que le thread d'énumération a terminé"""
+        ports = self._ports_found
+        if ports is None:
+            self.root.after(PORTS_POLL_INTERVAL, self.poll_ports)
+            return
+        if isinstance(ports, Exception):
+            # Le port reste saisissable à la main
+            self.log_event(f"⚠️  Ports non listés: {ports}")
+            return
         self.port_combo['values'] = ports
         if ports and not self.port_var.get():
             self.port_combo.current(0)
         self.log_event(f"Ports trouvés: {len(ports)}")
     
     def toggle_connection(self):
-        """Connecter/déconnecter au port série"""
-        if not self.is_running:
-            try:
-                port = self.port_var.get()
-                if not port:
-                    self.log_event("❌ Aucun port sélectionné")
-                    return
-                
-                # ✅ Connexion robuste
-                self.serial_port = serial.Serial(
-                    port=port,
-                    baudrate=9600,
-                    timeout=0.5
-                )
-                time.sleep(2)  # Attendre stabilisation
-                self.serial_port.reset_input_buffer()
-                
-                self.is_running = True
-                self.connect_btn.config(text="Déconnecter", bg='#330000', fg='#ff0000')
-                self.status_label.config(text="● Connecté", fg='#00ff00')
-                self.log_event(f"✅ Connecté au port {port}")
-                
-                # Démarrer le thread de lecture
-                self.read_thread = threading.Thread(target=self.read_serial, daemon=True)
-                self.read_thread.start()
-            except Exception as e:
-                self.status_label.config(text=f"● Erreur", fg='#ff0000')
-                self.log_event(f"❌ Erreur: {str(e)}")
+        """Connecter/déconnecter le robot du port sélectionné (les autres restent connectés)"""
+        port = self.port_var.get()
+        if not port:
+            self.log_event("❌ Aucun port sélectionné")
+            return
+        robot = self.robot_for(port)
+        if robot.is_running:
+            self.disconnect(robot)
+            return
+        try:
+            # Ouverture dans le thread du robot : la fenêtre reste réactive
+            self.connect(port, int(self.baud_var.get()), binary=self.binary_var.get())
+        except Exception as e:
+            self.status_label.config(text=f"● Erreur", fg='#ff0000')
+            self.log_event(f"❌ Erreur: {str(e)}")
+
+    def update_connection_status(self, *args):
+        """Bouton selon le port sélectionné, état selon l'ensemble des robots"""
+        port = self.port_var.get()
+        selected = any(robot.port == port and robot.is_running for robot in self.robots)
+        if selected:
+            self.connect_btn.config(text="Déconnecter", bg='#330000', fg='#ff0000')
         else:
-            self.is_running = False
-            if self.serial_port:
-                self.serial_port.close()
             self.connect_btn.config(text="Connecter", bg='#003300', fg='#00ff00')
+
+        running = self.running_robots()
+        replays = [robot for robot in running if robot.replay_start is not None]
+        waiting = [robot for robot in running if robot.replay_start is None and not robot.link_up]
+        self.replay_btn.config(text="Arrêter rejeu" if replays else "Rejouer")
+        if not running:
             self.status_label.config(text="● Déconnecté", fg='#ff0000')
-            self.log_event("⏸️ Déconnecté")
-    
-    def read_serial(self):
-    
-    # Attendre stabilisation
-        time.sleep(2)
-        
-        if self.serial_port:
-            self.serial_port.reset_input_buffer()
-        
-        while self.is_running:
+        elif len(running) > 1:
+            text = f"● {len(running)} robots" + (f" ({len(waiting)} en attente)" if waiting else "")
+            self.status_label.config(text=text, fg='#ffff00' if waiting else '#00ff00')
+        elif replays:
+            self.status_label.config(text="● Rejeu", fg='#ffff00')
+        elif waiting:
+            text = "● Reconnexion…" if waiting[0].reconnects else "● Connexion…"
+            self.status_label.config(text=text, fg='#ffff00')
+        else:
+            self.status_label.config(text="● Connecté", fg='#00ff00')
+
+    def on_connected(self, robot):
+        self.update_connection_status()
+
+    def on_disconnected(self, robot):
+        self.update_connection_status()
+
+    def on_link_changed(self, robot):
+        self.update_connection_status()
+
+    def choose_replay(self):
+        """Rejouer un enregistrement comme un robot de plus (ou arrêter les rejeux)"""
+        replays = [robot for robot in self.running_robots() if robot.replay_start is not None]
+        if replays:
+            for robot in replays:
+                self.disconnect(robot)
+            return
+        path = filedialog.askopenfilename(filetypes=[("Journaux radar", "*.rlog *.rlog.gz"),
+                                                     ("Tous", "*")])
+        if not path:
+            return
+        try:
+            self.start_replay(path, REPLAY_SPEEDS[self.replay_speed_var.get()])
+        except (OSError, ValueError) as e:
+            self.log_event(f"❌ Erreur: {str(e)}")
+
+    def choose_map_export(self):
+        """Sauvegarder la carte complète (points, grille, trajectoires)"""
+        path = filedialog.asksaveasfilename(defaultextension=".npz",
+                                            initialfile=time.strftime("carte_%Y%m%d_%H%M%S.npz"),
+                                            filetypes=[("Cartes radar", "*.npz")])
+        if not path:
+            return
+        try:
+            self.export_map(path)
+        except OSError as e:
+            self.log_event(f"❌ Erreur: {str(e)}")
+
+    def choose_map_import(self):
+        """Remplacer la carte par une carte sauvegardée"""
+        path = filedialog.askopenfilename(filetypes=[("Cartes radar", "*.npz"), ("Tous", "*")])
+        if not path:
+            return
+        try:
+            self.import_map(path)
+        except (OSError, ValueError) as e:
+            self.log_event(f"❌ Erreur: {str(e)}")
+
+    def choose_image_export(self):
+        """Grille d'occupation en PNG, ou PGM + YAML pour les outils ROS"""
+        path = filedialog.asksaveasfilename(defaultextension=".png",
+                                            filetypes=[("PNG", "*.png"), ("PGM (map_server)", "*.pgm"),
+                                                       ("PPM", "*.ppm")])
+        if not path:
+            return
+        try:
+            if self.save_snapshot(path):
+                self.log_event(f"🗺️  Image: {path}")
+            else:
+                self.log_event("⚠️  Carte vide")
+        except OSError as e:
+            self.log_event(f"❌ Erreur: {str(e)}")
+
+    def next_radar_robot(self):
+        """Afficher le robot suivant sur le radar"""
+        self.radar_robot = (self.radar_robot + 1) % len(self.robots)
+        self.radar_robot_btn.config(text=f"Radar: {self.robots[self.radar_robot].label}")
+        self.radar_points.clear()
+        self.scheduler.mark_dirty()
+
+    def toggle_recording(self):
+        """Démarrer/arrêter l'enregistrement du flux série brut"""
+        if self.recording is None:
             try:
-                if self.serial_port and self.serial_port.in_waiting > 0:
-                    raw_data = self.serial_port.readline()
-                    line = raw_data.decode('utf-8', errors='ignore').strip()
-                    
-                    if not line or len(line) < 3:
-                        continue
-                    
-                    # ✅ FORMAT CORRIGÉ: "A:54:D:12.76"
-                    if line.startswith("A:") and ":D:" in line:
-                        try:
-                            # Séparer A:angle:D:distance
-                            parts = line.split(':')
-                            if len(parts) >= 4:
-                                angle = int(float(parts[1]))  # Après A:
-                                distance = float(parts[3])     # Après D:
-                                
-                                # Mise à jour
-                                self.current_angle = angle
-                                self.current_distance = distance
-                                
-                                # Ajouter point
-                                if angle <=7 :
-                                    self.map_points = []
-                                    
-                                if 0 < distance < self.max_distance:
-                                    
-                                    self.add_map_point(angle, distance)
-                                    
-                                
-                                print(f"Angle: {angle}° Distance: {distance}cm")  # Debug
-                            
-                                    
-                        except (ValueError, IndexError) as e:
-                            print(f"Erreur parsing: {e} - Ligne: {line}")
-                    
-                    # Événements
-                    elif line.startswith("EVENT:"):
-                        event = line.split(':', 1)[1]
-                        if event == "OBSTACLE":
-                            self.map_points = []
-                            self.reset_map(self)
-                            self.log_event("⚠️  Obstacle détecté")
-                        elif event == "METRE":
-                            self.map_points = []
-                            self.reset_map(self)
-                            self.log_event("📏 1 mètre parcouru")
-                        elif event == "AUTO_SCAN":
-                            self.map_points = []
-                            self.reset_map(self)
-                            self.log_event("📏 1 mètre parcouru")
-                    
-                    # Statuts
-                    elif line.startswith("STATUS:"):
-                        status_parts = line.split(':', 1)
-                        if len(status_parts) > 1:
-                            status = status_parts[1]
-                            
-                            if status == "SCAN_START":
-                                self.reset_map(self)
-                                self.map_points = []
-                                self.is_scanning = True
-                                self.scan_count += 1
-                                self.scan_label.config(text="🔄 SCAN EN COURS")
-                                self.scan_counter.config(text=f"Scans: {self.scan_count}")
-                                self.log_event("🔄 Début du scan 360°")
-                                
-                            elif status.startswith("SCAN_END"):
-                                self.is_scanning = False
-                                self.scan_label.config(text="")
-                                if ':' in status:
-                                    measures = status.split(':')[1]
-                                    self.log_event(f"✓ Scan terminé: {measures} mesures")
-                                else:
-                                    self.log_event("✓ Scan terminé")
-                                    
-                            elif status == "READY":
-                                self.log_event("✓ Robot prêt")
-                            elif status == "STARTED":
-                                self.log_event("▶️  Robot démarré")
-                            elif status == "STOPPED":
-                                self.log_event("⏸️  Robot arrêté")
-                    
-                    # Messages INFO
-                    elif line.startswith("INFO:"):
-                        self.log_event(f"📥 {line}")
-                        
-            except Exception as e:
-                if not hasattr(self, '_last_error') or time.time() - self._last_error > 5:
-                    self.log_event(f"⚠️  {str(e)[:40]}")
-                    print(f"ERREUR: {e}")
-                    self._last_error = time.time()
-            
-            time.sleep(0.02)
+                self.start_recording()
+            except OSError as e:
+                self.log_event(f"❌ Erreur: {str(e)}")
+                return
+            self.rec_btn.config(text="⏹ REC", bg='#330000')
+        else:
+            self.stop_recording()
+            self.rec_btn.config(text="⏺ REC", bg='#001a00')
 
+    def toggle_scan_matching(self):
+        self.scan_matching = self.icp_var.get()
+
+    def toggle_sample_filtering(self):
+        self.sample_filtering = self.filter_var.get()
+
+    def toggle_navigation(self):
+        self.set_navigation(self.nav_var.get())
+
+    def on_close(self):
+        """Fermeture de la fenêtre : refermer proprement l'enregistrement et le port"""
+        self.close()
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.close()
+        self.root.destroy()
+
+    def on_scan_start(self, robot):
+        self.update_scan_label()
+        self.scan_counter.config(text=f"Scans: {self.scan_count}")
+
+    def on_scan_end(self, robot):
+        self.update_scan_label()
+
+    def update_scan_label(self):
+        scanning = [robot.label for robot in self.robots if robot.is_scanning]
+        if not scanning:
+            self.scan_label.config(text="")
+        elif len(self.robots) > 1:
+            self.scan_label.config(text=f"🔄 SCAN EN COURS ({', '.join(scanning)})")
+        else:
+            self.scan_label.config(text="🔄 SCAN EN COURS")
+
+    def on_map_changed(self):
+        self.scan_counter.config(text=f"Scans: {self.scan_count}")
+        self.scheduler.mark_dirty()
+
+    def toggle_map_mode(self):
+        """Basculer entre grille d'occupation et points bruts"""
+        self.map_mode = "points" if self.map_mode == "grid" else "grid"
+        self.view_btn.config(text="Vue: Grille" if self.map_mode == "grid" else "Vue: Points")
+        self.scheduler.mark_dirty()
     
-    def reset_map(self):
-        """Réinitialiser la cartographie"""
-        self.map_points = []
-        self.scan_count = 0
-        self.scan_counter.config(text="Scans: 0")
-        self.draw_map_grid()
-        self.map_info.config(text="Points détectés: 0")
-        self.log_event("🗑️  Carte réinitialisée")
-    
-    def add_map_point(self, angle, distance):
-        """Ajouter un point à la carte"""
-        self.map_points.append((angle, distance))
-        if len(self.map_points) > 2000:  # Limiter à 2000 points
-            self.map_points.pop(0)
-    
-    def draw_radar_grid(self):
-        """Dessiner la grille du radar"""
-        self.radar_canvas.delete("all")
-        
+    def setup_radar_items(self):
+        """Créer une fois pour toutes les items dynamiques du radar (pool réutilisé)"""
+        # Traînée : ovales repositionnés à chaque frame
+        self._trail_items = [
+            self.radar_canvas.create_oval(0, 0, 0, 0, state='hidden', tags="trail")
+            for _ in range(TRAIL_POOL_SIZE)
+        ]
+        self._trail_visible = 0
+
+        # Faisceau de balayage
+        self._sweep_items = [
+            self.radar_canvas.create_line(0, 0, 0, 0, state='hidden', tags="sweep",
+                                          width=4 if i < 3 else (3 if i < 8 else 2))
+            for i in range(SWEEP_POOL_SIZE)
+        ]
+        self._sweep_length_drawn = 0
+
+        # Ligne principale, extrémité et obstacle
+        self._main_line = self.radar_canvas.create_line(0, 0, 0, 0, width=5,
+                                                        state='hidden', tags="sweep")
+        self._main_tip = self.radar_canvas.create_oval(0, 0, 0, 0, outline='#ffffff', width=2,
+                                                       state='hidden', tags="sweep")
+        self._obstacle_item = self.radar_canvas.create_oval(0, 0, 0, 0, fill='#ff0000',
+                                                            outline='#ffffff', width=2,
+                                                            state='hidden', tags="sweep")
+        self._main_color_drawn = None
+
+        # Statistiques en surimpression (au-dessus de tout le reste)
+        self._overlay_item = self.radar_canvas.create_text(8, 8, anchor=tk.NW, text="",
+                                                           fill='#00ffff', font=('Courier', 8),
+                                                           state='hidden', tags="overlay")
+
+    def setup_map_items(self):
+        """Créer le robot, sa trajectoire et le curseur de la carte (point actuel + distance)"""
+        # Trajectoire et marqueur de chaque robot (déplacés selon sa pose estimée)
+        self._robot_items = [self.create_robot_items(0)]
+
+        self._map_cursor = self.map_canvas.create_oval(0, 0, 0, 0, fill='#00ffff',
+                                                       outline='#ffffff', width=2,
+                                                       state='hidden', tags="cursor")
+        self._map_cursor_text = self.map_canvas.create_text(0, 0, text="", fill='#ffffff',
+                                                            font=('Courier', 8, 'bold'),
+                                                            state='hidden', tags="cursor")
+        # Tous les points sont rendus dans une seule image, sous la grille
+        self._map_photo = tk.PhotoImage()
+        self._map_image_item = self.map_canvas.create_image(0, 0, anchor=tk.NW,
+                                                            image=self._map_photo,
+                                                            tags="points")
+        self._map_drawn = None  # Ce que contient l'image (mode, version, vue)
+        self._map_info_state = None
+
+    def create_robot_items(self, robot_id):
+        """Items d'un robot : [trajectoire, corps, cap, nom, état dessiné]"""
+        color, trail_color = ROBOT_COLORS[robot_id % len(ROBOT_COLORS)]
+        canvas = self.map_canvas
+        items = [
+            canvas.create_line(0, 0, 0, 0, fill=trail_color, width=2, tags="robot"),
+            canvas.create_oval(0, 0, 0, 0, fill=color, outline=color, tags="robot"),
+            canvas.create_line(0, 0, 0, 0, fill=color, width=2, arrow=tk.LAST, tags="robot"),
+            canvas.create_text(0, 0, text="ROBOT", fill=color, font=('Courier', 9, 'bold'),
+                               tags="robot"),
+            None,
+        ]
+        canvas.tag_raise("cursor")  # Le curseur reste au-dessus des robots ajoutés
+        return items
+
+    def draw_radar_grid(self, event=None):
+        """Dessiner la grille du radar (couche statique, refaite au redimensionnement)"""
+        self.radar_canvas.delete("grid")
+
         width = self.radar_canvas.winfo_width()
         height = self.radar_canvas.winfo_height()
-        
+
         if width <= 1 or height <= 1:
-            self.root.after(100, self.draw_radar_grid)
+            self._radar_geom = None
             return
-        
+
         center_x = width // 2
         center_y = height // 2
         radius = min(center_x, center_y) - 30
-        
+
         # Cercles concentriques (4 cercles)
         for i in range(1, 5):
             r = radius * i / 4
             self.radar_canvas.create_oval(center_x - r, center_y - r,
                                          center_x + r, center_y + r,
-                                         outline='#004400', width=1)
+                                         outline='#004400', width=1, tags="grid")
             # Labels de distance
             distance_label = int(self.max_distance * i / 4)
             self.radar_canvas.create_text(center_x + r - 25, center_y - 5,
                                          text=f"{distance_label}cm",
-                                         fill='#006600', font=('Courier', 8))
-        
+                                         fill='#006600', font=('Courier', 8), tags="grid")
+
         # Lignes radiales (tous les 30°)
         for angle in range(0, 360, 30):
             rad = math.radians(angle)
             x = center_x + radius * math.cos(rad - math.pi/2)
             y = center_y + radius * math.sin(rad - math.pi/2)
             self.radar_canvas.create_line(center_x, center_y, x, y,
-                                         fill='#004400', width=1)
+                                         fill='#004400', width=1, tags="grid")
             # Labels d'angle
             label_x = center_x + (radius + 15) * math.cos(rad - math.pi/2)
             label_y = center_y + (radius + 15) * math.sin(rad - math.pi/2)
             self.radar_canvas.create_text(label_x, label_y, text=f"{angle}°",
-                                         fill='#006600', font=('Courier', 9))
-        
+                                         fill='#006600', font=('Courier', 9), tags="grid")
+
         # Point central (robot)
         self.radar_canvas.create_oval(center_x - 5, center_y - 5,
                                      center_x + 5, center_y + 5,
-                                     fill='#00ff00', outline='#00ff00')
-    
-    def draw_map_grid(self):
-        """Dessiner la grille de cartographie"""
-        self.map_canvas.delete("all")
-        
+                                     fill='#00ff00', outline='#00ff00', tags="grid")
+
+        # La grille reste sous le faisceau et la traînée
+        self.radar_canvas.tag_lower("grid")
+        self._radar_geom = (center_x, center_y, radius)
+        self.scheduler.mark_dirty()
+
+    def draw_map_grid(self, event=None):
+        """Dessiner la grille de cartographie (couche statique, refaite au redimensionnement)"""
+        self.map_canvas.delete("grid")
+
         width = self.map_canvas.winfo_width()
         height = self.map_canvas.winfo_height()
-        
+
         if width <= 1 or height <= 1:
-            self.root.after(100, self.draw_map_grid)
+            self._map_geom = None
             return
-        
-        center_x = width // 2
-        center_y = height // 2
-        
-        # Grille cartésienne
+
+        # Origine du monde à l'écran selon le déplacement et le zoom
+        scale = min(width, height) / (2 * self.max_distance) * 0.85 * self.map_zoom
+        center_x = round(width / 2 - self.map_pan[0] * scale)
+        center_y = round(height / 2 + self.map_pan[1] * scale)
+
+        # Grille cartésienne (accrochée à l'origine : elle suit le déplacement)
         grid_spacing = 50
-        
+
         # Lignes verticales
-        for x in range(0, width, grid_spacing):
+        for x in range(center_x % grid_spacing, width, grid_spacing):
             color = '#004400' if x == center_x else '#002200'
             line_width = 2 if x == center_x else 1
-            self.map_canvas.create_line(x, 0, x, height, fill=color, width=line_width)
-        
+            self.map_canvas.create_line(x, 0, x, height, fill=color, width=line_width,
+                                        tags="grid")
+
         # Lignes horizontales
-        for y in range(0, height, grid_spacing):
+        for y in range(center_y % grid_spacing, height, grid_spacing):
             color = '#004400' if y == center_y else '#002200'
             line_width = 2 if y == center_y else 1
-            self.map_canvas.create_line(0, y, width, y, fill=color, width=line_width)
-        
+            self.map_canvas.create_line(0, y, width, y, fill=color, width=line_width,
+                                        tags="grid")
+
         # Labels des axes
-        self.map_canvas.create_text(center_x + 10, 15, text="Y", 
-                                   fill='#00ff00', font=('Courier', 12, 'bold'))
+        self.map_canvas.create_text(center_x + 10, 15, text="Y",
+                                   fill='#00ff00', font=('Courier', 12, 'bold'), tags="grid")
         self.map_canvas.create_text(width - 15, center_y - 10, text="X",
-                                   fill='#00ff00', font=('Courier', 12, 'bold'))
-        
-        # Point central (robot)
-        self.map_canvas.create_oval(center_x - 6, center_y - 6,
-                                   center_x + 6, center_y + 6,
-                                   fill='#0000ff', outline='#0000ff')
-        self.map_canvas.create_text(center_x, center_y - 15, text="ROBOT",
-                                   fill='#0000ff', font=('Courier', 9, 'bold'))
-    
+                                   fill='#00ff00', font=('Courier', 12, 'bold'), tags="grid")
+
+        self.map_canvas.tag_lower("grid")
+        self.map_canvas.tag_lower("points")
+        self._map_geom = (center_x, center_y, scale)
+
+        # La vue a changé : les points seront reprojetés à la prochaine frame
+        self._map_view = (width, height, center_x, center_y, scale)
+        self.scheduler.mark_dirty()
+
+    def start_map_drag(self, event):
+        self._drag_start = (event.x, event.y, self.map_pan)
+
+    def drag_map(self, event):
+        """Déplacer la carte avec la souris"""
+        if self._drag_start is None or self._map_geom is None:
+            return
+        x, y, (pan_x, pan_y) = self._drag_start
+        scale = self._map_geom[2]
+        self.map_pan = (pan_x - (event.x - x) / scale, pan_y + (event.y - y) / scale)
+        self.draw_map_grid()
+
+    def zoom_map(self, event):
+        """Zoomer autour du pointeur (molette)"""
+        if self._map_geom is None:
+            return
+        zoom_in = event.num == 4 or getattr(event, 'delta', 0) > 0
+        zoom = min(max(self.map_zoom * (1.25 if zoom_in else 0.8), MIN_MAP_ZOOM), MAX_MAP_ZOOM)
+        if zoom == self.map_zoom:
+            return
+        # Le point du monde sous le pointeur reste sous le pointeur
+        center_x, center_y, scale = self._map_geom
+        world_x = (event.x - center_x) / scale
+        world_y = (center_y - event.y) / scale
+        new_scale = scale * zoom / self.map_zoom
+        width, height = self._map_view[:2]
+        self.map_zoom = zoom
+        self.map_pan = ((width / 2 - event.x) / new_scale + world_x,
+                        (event.y - height / 2) / new_scale + world_y)
+        self.draw_map_grid()
+
+    def reset_map_view(self, event=None):
+        self.map_zoom = 1.0
+        self.map_pan = (0.0, 0.0)
+        self.draw_map_grid()
+
     def animate_radar(self):
         """Animation du radar et mise à jour de la cartographie"""
-        # Redessiner la grille radar
-        self.draw_radar_grid()
-        
-        width = self.radar_canvas.winfo_width()
-        height = self.radar_canvas.winfo_height()
-        
-        if width > 1 and height > 1:
-            center_x = width // 2
-            center_y = height // 2
-            radius = min(center_x, center_y) - 30
-            
-            # ✅ Dessiner les points avec effet de traînée
-            for i, (angle, distance, alpha) in enumerate(self.radar_points):
-                if 0 < distance < self.max_distance:
-                    rad = math.radians(angle - 90)
-                    scale = radius / self.max_distance
-                    x = center_x + distance * scale * math.cos(rad)
-                    y = center_y + distance * scale * math.sin(rad)
-                    
-                    # Couleur avec fade-out
-                    intensity = int(255 * alpha)
+        start = time.perf_counter()
+        queue_depth = len(self.sample_queue)
+
+        # Appliquer les données reçues depuis la frame précédente
+        drained = self.drain_samples()
+        self.flush_log()
+
+        # ✅ Frame dessinée seulement s'il y a du nouveau ou un fondu en cours
+        drew = self.scheduler.should_draw(drained > 0 or len(self.radar_points) > 0)
+        if drew:
+            if self._radar_geom is not None:
+                self.update_radar()
+
+            # Mettre à jour la cartographie
+            self.update_map()
+
+            elapsed = time.perf_counter() - start
+            self.metrics.observe_frame(elapsed, queue_depth)
+            level = self.scheduler.frame_done(elapsed)
+            if level is not None:
+                self.log_event(f"⚠️  Rendu allégé: niveau {level}" if level
+                               else "✅ Rendu complet rétabli")
+        elif self._map_geom is not None and any(robot.pose.moving_since is not None
+                                                for robot in self.robots):
+            self.update_robots()  # Robots en mouvement entre deux scans : rythme réduit
+
+        if self.metrics.due():
+            self.publish_metrics()
+
+        # ~60 FPS en activité, simple scrutation de la file au repos
+        delay = self.scheduler.next_delay(time.perf_counter() - start, drew)
+        self.root.after(delay, self.animate_radar)
+
+    def publish_metrics(self):
+        """Instantané des compteurs : surimpression, fichier d'export, alerte parsing"""
+        row = self.metrics_snapshot(
+            {"frames": self.scheduler.frames, "skipped_frames": self.scheduler.skipped},
+            canvas_items=len(self.radar_canvas.find_all()) + len(self.map_canvas.find_all()),
+            render_level=self.scheduler.level,
+        )
+
+        self.report_parse_errors(row)
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.write(row)
+        if self.show_overlay:
+            self.radar_canvas.itemconfig(self._overlay_item, text=format_overlay(row))
+
+    def toggle_overlay(self, event=None):
+        """Afficher / masquer les statistiques sur le radar"""
+        self.show_overlay = not self.show_overlay
+        self.radar_canvas.itemconfig(self._overlay_item, text="...",
+                                     state='normal' if self.show_overlay else 'hidden')
+
+    def update_radar(self):
+        """Repositionner les items du radar (aucune création/suppression par frame)"""
+        center_x, center_y, radius = self._radar_geom
+        robot = self.robots[self.radar_robot]
+        scale = radius / self.max_distance
+
+        # ✅ Traînée : les points du pool suivent radar_points
+        for item, (angle, distance, alpha) in zip(self._trail_items, self.radar_points):
+            rad = math.radians(angle - 90)
+            x = center_x + distance * scale * math.cos(rad)
+            y = center_y + distance * scale * math.sin(rad)
+
+            # Couleur avec fade-out
+            intensity = int(255 * alpha)
+            color = f"#{0:02x}{intensity:02x}{0:02x}"
+
+            size = 4 if distance < 50 else 3
+            self.radar_canvas.coords(item, x - size, y - size, x + size, y + size)
+            self.radar_canvas.itemconfig(item, fill=color, outline=color, state='normal')
+
+        visible = len(self.radar_points)
+        for item in self._trail_items[visible:self._trail_visible]:
+            self.radar_canvas.itemconfig(item, state='hidden')
+        self._trail_visible = visible
+
+        # Décrémenter alpha (fade-out) et retirer points trop faibles
+        self.radar_points = deque(((a, d, alpha * 0.90) for a, d, alpha in self.radar_points
+                                   if alpha * 0.90 > 0.05), maxlen=self.scheduler.trail_length)
+
+        # ✅ Ajouter le point actuel (une fois par nouvelle mesure : la traînée s'éteint ensuite)
+        new_sample = robot.samples_received != self._trail_samples
+        self._trail_samples = robot.samples_received
+        if new_sample and 0 < robot.current_distance < self.max_distance:
+            self.radar_points.append((robot.current_angle, robot.current_distance, 1.0))
+
+        # ✅ Faisceau de balayage (effet sonar) : couleurs changées seulement avec sa longueur
+        sweep_length = 25 if robot.is_scanning else 18
+        if sweep_length != self._sweep_length_drawn:
+            for i, item in enumerate(self._sweep_items):
+                if i < sweep_length:
+                    alpha = 1.0 - (i / sweep_length)
+                    intensity = int(255 * alpha * 0.7)
                     color = f"#{0:02x}{intensity:02x}{0:02x}"
-                    
-                    size = 4 if distance < 50 else 3
-                    self.radar_canvas.create_oval(x - size, y - size, x + size, y + size,
-                                                 fill=color, outline=color)
-                
-                # Décrémenter alpha (fade-out)
-                self.radar_points[i] = (angle, distance, alpha * 0.90)
-            
-            # Retirer points trop faibles
-            self.radar_points = [(a, d, alpha) for a, d, alpha in self.radar_points if alpha > 0.05]
-            
-            # ✅ Ajouter le point actuel
-            if self.current_distance > 0 and self.current_distance < self.max_distance:
-                self.radar_points.append((self.current_angle, self.current_distance, 1.0))
-            
-            # ✅ Dessiner le faisceau de balayage (effet sonar)
-            sweep_length = 25 if self.is_scanning else 18
-            for i in range(sweep_length):
-                angle_offset = i * 2
-                alpha = 1.0 - (i / sweep_length)
-                intensity = int(255 * alpha * 0.7)
-                color = f"#{0:02x}{intensity:02x}{0:02x}"
-                
-                angle = self.current_angle - angle_offset
-                rad = math.radians(angle - 90)
-                x = center_x + radius * math.cos(rad)
-                y = center_y + radius * math.sin(rad)
-                
-                line_width = 4 if i < 3 else (3 if i < 8 else 2)
-                self.radar_canvas.create_line(center_x, center_y, x, y,
-                                             fill=color, width=line_width)
-            
-            # ✅ Ligne principale du radar (brillante)
-            rad = math.radians(self.current_angle - 90)
+                    self.radar_canvas.itemconfig(item, fill=color, state='normal')
+                else:
+                    self.radar_canvas.itemconfig(item, state='hidden')
+            self._sweep_length_drawn = sweep_length
+
+        for i, item in enumerate(self._sweep_items[:sweep_length]):
+            rad = math.radians(robot.current_angle - i * 2 - 90)
             x = center_x + radius * math.cos(rad)
             y = center_y + radius * math.sin(rad)
-            main_color = '#ff00ff' if self.is_scanning else '#00ff00'
-            self.radar_canvas.create_line(center_x, center_y, x, y,
-                                         fill=main_color, width=5)
-            
-            # Cercle lumineux à l'extrémité
-            self.radar_canvas.create_oval(x - 5, y - 5, x + 5, y + 5,
-                                         fill=main_color, outline='#ffffff', width=2)
-            
-            # ✅ Afficher distance détectée sur le radar si proche
-            if self.current_distance > 0 and self.current_distance < self.max_distance:
-                scale = radius / self.max_distance
-                obj_x = center_x + self.current_distance * scale * math.cos(rad)
-                obj_y = center_y + self.current_distance * scale * math.sin(rad)
-                
-                # Point obstacle en rouge
-                self.radar_canvas.create_oval(obj_x - 6, obj_y - 6, obj_x + 6, obj_y + 6,
-                                             fill='#ff0000', outline='#ffffff', width=2)
-            
-            # Mettre à jour les infos
-            dist_text = f"{self.current_distance:.1f}" if self.current_distance > 0 else "---"
-            self.radar_info.config(text=f"Angle: {self.current_angle}° | Distance: {dist_text} cm")
-        
-        # Mettre à jour la cartographie
-        self.update_map()
-        
-        # Répéter l'animation à 60 FPS
-        self.root.after(16, self.animate_radar)  # ✅ 16ms = ~60 FPS
-    
+            self.radar_canvas.coords(item, center_x, center_y, x, y)
+
+        # ✅ Ligne principale du radar (brillante)
+        rad = math.radians(robot.current_angle - 90)
+        x = center_x + radius * math.cos(rad)
+        y = center_y + radius * math.sin(rad)
+        main_color = '#ff00ff' if robot.is_scanning else '#00ff00'
+        if main_color != self._main_color_drawn:
+            self.radar_canvas.itemconfig(self._main_line, fill=main_color, state='normal')
+            self.radar_canvas.itemconfig(self._main_tip, fill=main_color, state='normal')
+            self._main_color_drawn = main_color
+        self.radar_canvas.coords(self._main_line, center_x, center_y, x, y)
+
+        # Cercle lumineux à l'extrémité
+        self.radar_canvas.coords(self._main_tip, x - 5, y - 5, x + 5, y + 5)
+
+        # ✅ Point obstacle en rouge si distance valide
+        if 0 < robot.current_distance < self.max_distance:
+            obj_x = center_x + robot.current_distance * scale * math.cos(rad)
+            obj_y = center_y + robot.current_distance * scale * math.sin(rad)
+            self.radar_canvas.coords(self._obstacle_item,
+                                     obj_x - 6, obj_y - 6, obj_x + 6, obj_y + 6)
+            self.radar_canvas.itemconfig(self._obstacle_item, state='normal')
+        else:
+            self.radar_canvas.itemconfig(self._obstacle_item, state='hidden')
+
+        # Mettre à jour les infos (seulement si le texte change)
+        dist_text = f"{robot.current_distance:.1f}" if robot.current_distance > 0 else "---"
+        info = f"Angle: {robot.current_angle}° | Distance: {dist_text} cm"
+        if info != self._radar_info_text:
+            self.radar_info.config(text=info)
+            self._radar_info_text = info
+
     def update_map(self):
-        """Mettre à jour la vue cartographique"""
-        self.draw_map_grid()
-        
-        width = self.map_canvas.winfo_width()
-        height = self.map_canvas.winfo_height()
-        
-        if width > 1 and height > 1:
-            center_x = width // 2
-            center_y = height // 2
-            scale = min(width, height) / (2 * self.max_distance) * 0.85
-            
-            # ✅ Dessiner tous les points de la carte
-            for angle, distance in self.map_points:
-                # Conversion polaire → cartésienne
-                rad = math.radians(angle - 90)  # -90 = 0° en haut
-                x = center_x + distance * scale * math.cos(rad)
-                y = center_y + distance * scale * math.sin(rad)
-                
-                # Couleur selon distance
-                if distance < 50:
-                    color = '#ff0000'  # Rouge = proche
-                    size = 3
-                elif distance < 100:
-                    color = '#ffff00'  # Jaune = moyen
-                    size = 2
-                else:
-                    color = '#00ff00'  # Vert = loin
-                    size = 2
-                
-                self.map_canvas.create_oval(x - size, y - size, x + size, y + size,
-                                           fill=color, outline=color)
-            
-            # ✅ Point actuel en cyan (plus gros)
-            if 0 < self.current_distance < self.max_distance:
-                rad = math.radians(self.current_angle - 90)
-                x = center_x + self.current_distance * scale * math.cos(rad)
-                y = center_y + self.current_distance * scale * math.sin(rad)
-                
-                self.map_canvas.create_oval(x - 6, y - 6, x + 6, y + 6,
-                                           fill='#00ffff', outline='#ffffff', width=2)
-                
-                # Afficher distance sur la carte
-                self.map_canvas.create_text(x, y - 12, 
-                                           text=f"{self.current_distance:.0f}cm",
-                                           fill='#ffffff', font=('Courier', 8, 'bold'))
-            
-            # Mettre à jour le compteur
-            self.map_info.config(text=f"Points détectés: {len(self.map_points)}")
+        """Mettre à jour la vue cartographique (image refaite seulement si les points changent)"""
+        if self._map_geom is None:
+            return
+
+        center_x, center_y, scale = self._map_geom
+        points = self.map_points
+
+        # ✅ Une seule image pour toute la carte, refaite seulement si elle a changé
+        # (et seulement une frame sur N quand le rendu est allégé)
+        refresh = self.scheduler.refresh_map()
+        if self.map_mode == "grid":
+            wanted = ("grid", self.occupancy.version, self._map_view)
+            if wanted != self._map_drawn and refresh:
+                self._map_photo.configure(data=self.occupancy.to_ppm(*self._map_view),
+                                          format='PPM')
+                self._map_drawn = wanted
+        else:
+            # Projection vectorisée des seuls nouveaux points
+            wanted = "points"
+            if self.point_raster.update(points, self._map_view, self.point_index):
+                self._map_drawn = None
+            if self._map_drawn != wanted and refresh:
+                self._map_photo.configure(data=self.point_raster.to_ppm(), format='PPM')
+                self._map_drawn = wanted
+        if self._map_drawn != wanted:
+            self.scheduler.mark_dirty()  # Image en retard : la refaire même sans nouvelle donnée
 
+        self.update_robots()
+
+        # ✅ Point actuel du robot affiché sur le radar en cyan (plus gros)
+        robot = self.robots[self.radar_robot]
+        if 0 < robot.current_distance < self.max_distance:
+            x = center_x + robot.current_point[0] * scale
+            y = center_y - robot.current_point[1] * scale
+
+            self.map_canvas.coords(self._map_cursor, x - 6, y - 6, x + 6, y + 6)
+            self.map_canvas.coords(self._map_cursor_text, x, y - 12)
+            self.map_canvas.itemconfig(self._map_cursor_text,
+                                       text=f"{robot.current_distance:.0f}cm")
+            self.map_canvas.itemconfig("cursor", state='normal')
+        else:
+            self.map_canvas.itemconfig("cursor", state='hidden')
+
+        # Compteur et obstacle le plus proche devant le robot (requête sur l'index spatial)
+        x, y, heading = robot.pose.pose_at(robot.clock())
+        state = (points.total, points.generation, round(x), round(y), round(heading))
+        if state != self._map_info_state:
+            self._map_info_state = state
+            ahead = self.nearest_obstacle(robot)
+            ahead_text = f"{ahead:.0f} cm" if ahead is not None else "---"
+            self.map_info.config(text=f"Points détectés: {len(points)} | Devant: {ahead_text}")
+
+    def update_robots(self):
+        """Placer chaque robot et sa trajectoire sur la carte (origine = centre du canvas)"""
+        while len(self._robot_items) < len(self.robots):
+            self._robot_items.append(self.create_robot_items(len(self._robot_items)))
+
+        center_x, center_y, scale = self._map_geom
+        several = len(self.robots) > 1
+        for robot, items in zip(self.robots, self._robot_items):
+            trajectory, body, heading_item, text, drawn = items
+            x, y, heading = robot.pose.pose_at(robot.clock())
+            state = (x, y, heading, robot.pose.version, self._map_view, several)
+            if state == drawn:
+                continue
+            items[4] = state
+
+            robot_x = center_x + x * scale
+            robot_y = center_y - y * scale
+
+            coords = []
+            for point_x, point_y in robot.pose.trajectory:
+                coords += (center_x + point_x * scale, center_y - point_y * scale)
+            coords += (robot_x, robot_y)
+            self.map_canvas.coords(trajectory, *coords)
+
+            self.map_canvas.coords(body, robot_x - 6, robot_y - 6, robot_x + 6, robot_y + 6)
+            rad = math.radians(heading)
+            self.map_canvas.coords(heading_item, robot_x, robot_y,
+                                   robot_x + 18 * math.sin(rad), robot_y - 18 * math.cos(rad))
+            self.map_canvas.coords(text, robot_x, robot_y - 15)
+            self.map_canvas.itemconfig(text, text=robot.label if several else "ROBOT")
 
 if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Interface radar mBot")
+    parser.add_argument("--metrics", help="exporter les statistiques chaque seconde (.csv ou .jsonl)")
+    parser.add_argument("--log", metavar="FICHIER", help="journal des événements (rotation à 1 Mo)")
+    args = parser.parse_args()
+
     root = tk.Tk()
-    app = RadarInterface(root)
+    app = RadarInterface(root, metrics_path=args.metrics)
+    if args.log:
+        app.event_log.open_file(args.log)
     root.mainloop()
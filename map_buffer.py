@@ -0,0 +1,208 @@
+"""Points de cartographie : buffer circulaire NumPy et rendu en image"""
+import numpy as np
+
+
+# Un point sonar : angle (°), distance (cm), position monde (cm, voir pose.py),
+# instant de réception, numéro de scan
+POINT_DTYPE = np.dtype([
+    ("angle", np.float32),
+    ("distance", np.float32),
+    ("x", np.float32),
+    ("y", np.float32),
+    ("timestamp", np.float64),
+    ("scan", np.uint32),
+])
+
+# Niveaux de couleur (priorité croissante : un point proche masque un point loin)
+LEVEL_FAR, LEVEL_MID, LEVEL_NEAR = 1, 2, 3
+LEVEL_LIMITS = (100, 50)  # < 100 cm = moyen, < 50 cm = proche
+PALETTE = np.array([
+    (0x00, 0x0a, 0x00),  # fond du canvas
+    (0x00, 0xff, 0x00),  # vert = loin
+    (0xff, 0xff, 0x00),  # jaune = moyen
+    (0xff, 0x00, 0x00),  # rouge = proche
+], dtype=np.uint8)
+POINT_RADIUS = 2  # en pixels
+
+
+class PointBuffer:
+    """Buffer circulaire préalloué : ajout et éviction en O(1)"""
+
+    def __init__(self, capacity):
+        self.data = np.zeros(capacity, dtype=POINT_DTYPE)
+        self.capacity = capacity
+        self.count = 0
+        self.total = 0  # Nombre de points ajoutés depuis le dernier clear()
+        self.generation = 0  # Incrémenté à chaque clear() ou modification de points existants
+
+    def __len__(self):
+        return self.count
+
+    def append(self, angle, distance, x, y, timestamp=0.0, scan=0):
+        """Ajouter un point (écrase le plus ancien si le buffer est plein)"""
+        self.data[self.total % self.capacity] = (angle, distance, x, y, timestamp, scan)
+        self.total += 1
+        if self.count < self.capacity:
+            self.count += 1
+
+    def extend(self, points):
+        """Ajouter un tableau de points POINT_DTYPE d'un coup"""
+        points = points[-self.capacity:]
+        slots = (self.total + np.arange(len(points))) % self.capacity
+        self.data[slots] = points
+        self.total += len(points)
+        self.count = min(self.count + len(points), self.capacity)
+
+    def clear(self):
+        """Vider le buffer (sans réallouer)"""
+        self.count = 0
+        self.total = 0
+        self.generation += 1
+
+    def transform_scan(self, scan, angle, tx, ty):
+        """Appliquer une transformation rigide (rad, cm) aux points d'un scan"""
+        slots = self.slots()
+        slots = slots[self.data["scan"][slots] == scan]
+        x = self.data["x"][slots]
+        y = self.data["y"][slots]
+        c, s = np.cos(angle), np.sin(angle)
+        self.data["x"][slots] = c * x - s * y + tx
+        self.data["y"][slots] = s * x + c * y + ty
+        self.generation += 1
+
+    def slots(self, start=None):
+        """Indices des points ajoutés depuis `start` (par défaut tous), du plus ancien au plus récent"""
+        first = self.total - self.count
+        if start is None or start < first:
+            start = first
+        return np.arange(start, self.total) % self.capacity
+
+    def points(self):
+        """Copie ordonnée (plus ancien → plus récent) des points présents"""
+        return self.data[self.slots()]
+
+
+def world_to_screen(x, y, center_x, center_y, scale):
+    """Conversion monde (cm, y vers le haut) → écran vectorisée"""
+    return center_x + x * scale, center_y - y * scale
+
+
+def view_bounds(view):
+    """Emprise monde (x0, y0, x1, y1) en cm d'une vue (largeur, hauteur, centre x, centre y, échelle)"""
+    width, height, center_x, center_y, scale = view
+    return (-center_x / scale, (center_y - height) / scale,
+            (width - center_x) / scale, center_y / scale)
+
+
+def distance_levels(distance):
+    """Niveau de couleur de chaque distance"""
+    levels = np.full(distance.shape, LEVEL_FAR, dtype=np.uint8)
+    levels[distance < LEVEL_LIMITS[0]] = LEVEL_MID
+    levels[distance < LEVEL_LIMITS[1]] = LEVEL_NEAR
+    return levels
+
+
+class PointRaster:
+    """Rendu des points d'un PointBuffer dans une image (une seule image Tk par frame)
+
+    Les coordonnées écran et niveaux de couleur sont mis en cache par case du
+    buffer : ils ne sont recalculés que pour les nouveaux points, ou pour tous
+    quand la vue change.
+    """
+
+    def __init__(self, capacity):
+        self.screen_x = np.full(capacity, -1, dtype=np.int32)
+        self.screen_y = np.full(capacity, -1, dtype=np.int32)
+        self.levels = np.zeros(capacity, dtype=np.uint8)
+        self.image = np.zeros((1, 1), dtype=np.uint8)  # niveau max par pixel
+        self.view = None  # (largeur, hauteur, centre x, centre y, échelle)
+        self._generation = None
+        self._synced_total = 0
+        self._evicted = 0
+
+    def update(self, buffer, view, index=None):
+        """Synchroniser avec le buffer ; renvoie True si l'image a changé
+
+        index (spatial_index.PointIndex du buffer) : au changement de vue, seuls
+        les points visibles sont reprojetés.
+        """
+        if view != self.view or buffer.generation != self._generation:
+            self.view = view
+            self._generation = buffer.generation
+            self.image = np.zeros((view[1], view[0]), dtype=np.uint8)
+            if index is not None:
+                self.screen_x.fill(-1)
+                self._project(buffer, index.query_rect(*view_bounds(view)))
+            else:
+                self._project(buffer, buffer.slots())
+            self._rebuild(buffer)
+            return True
+
+        new = buffer.total - self._synced_total
+        if new <= 0:
+            return False
+
+        # Points écrasés dans le buffer mais encore présents dans l'image
+        free = buffer.capacity - min(self._synced_total, buffer.capacity)
+        self._evicted += max(0, new - free)
+
+        slots = buffer.slots(self._synced_total)
+        self._project(buffer, slots)
+
+        # Trop de points évincés encore affichés : reconstruction complète
+        if self._evicted > buffer.capacity // 64:
+            self._rebuild(buffer)
+        else:
+            self._splat(slots)
+        return True
+
+    def _project(self, buffer, slots):
+        """Calculer coordonnées écran et niveaux des cases `slots`"""
+        width, height, center_x, center_y, scale = self.view
+        points = buffer.data[slots]
+        x, y = world_to_screen(points["x"], points["y"], center_x, center_y, scale)
+        x = np.round(x).astype(np.int32)
+        y = np.round(y).astype(np.int32)
+        outside = (x < 0) | (x >= width) | (y < 0) | (y >= height)
+        x[outside] = -1  # hors de la vue : ignoré au rendu
+        self.screen_x[slots] = x
+        self.screen_y[slots] = y
+        self.levels[slots] = distance_levels(points["distance"])
+        self._synced_total = buffer.total
+
+    def _splat(self, slots):
+        """Ajouter des points à l'image de niveaux"""
+        x = self.screen_x[slots]
+        visible = x >= 0
+        np.maximum.at(self.image, (self.screen_y[slots][visible], x[visible]),
+                      self.levels[slots][visible])
+
+    def _rebuild(self, buffer):
+        """Refaire l'image de niveaux à partir de tous les points présents"""
+        self.image.fill(0)
+        slots = buffer.slots()
+        x = self.screen_x[slots]
+        y = self.screen_y[slots]
+        levels = self.levels[slots]
+        for level in (LEVEL_FAR, LEVEL_MID, LEVEL_NEAR):
+            mask = (levels == level) & (x >= 0)
+            self.image[y[mask], x[mask]] = level
+        self._evicted = 0
+
+    def to_ppm(self):
+        """Image couleur (points élargis à POINT_RADIUS) au format PPM binaire"""
+        levels = self.image
+        # Dilatation séparable : horizontale puis verticale
+        for axis in (1, 0):
+            grown = levels.copy()
+            for d in range(1, POINT_RADIUS + 1):
+                if axis == 1:
+                    np.maximum(grown[:, d:], levels[:, :-d], out=grown[:, d:])
+                    np.maximum(grown[:, :-d], levels[:, d:], out=grown[:, :-d])
+                else:
+                    np.maximum(grown[d:], levels[:-d], out=grown[d:])
+                    np.maximum(grown[:-d], levels[d:], out=grown[:-d])
+            levels = grown
+        rgb = PALETTE[levels]
+        height, width = levels.shape
+        return b"P6 %d %d 255\n" % (width, height) + rgb.tobytes()
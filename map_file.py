@@ -0,0 +1,214 @@
+"""Sauvegarde de la carte (points, grille d'occupation, trajectoires) et export en image
+
+Format : archive .npz non compressée (np.savez). Chaque membre est un fichier
+.npy stocké tel quel dans le zip, on peut donc le projeter en mémoire
+(np.memmap) directement dans l'archive : ouvrir une carte de plusieurs heures
+ne lit que l'en-tête, les données sont chargées par le système à la demande.
+
+Membres :
+    meta        JSON (version, taille de cellule, nombre de scans, date…)
+    points      POINT_DTYPE (map_buffer.py), du plus ancien au plus récent
+    tile_keys   int32 (n, 2) : (tuile x, tuile y) de chaque tuile
+    tiles       float32 (n, tile_size, tile_size) : log-odds, ligne = y
+    poses       POSE_DTYPE : pose finale de chaque robot
+    trajectory  TRAJECTORY_DTYPE : points de trajectoire, robot par robot
+
+Exports image : PNG (couleurs de l'interface) et PGM + YAML au format
+map_server de ROS (noir = occupé, blanc = libre, gris = inconnu).
+
+Exemple :
+    python map_file.py carte.npz --png carte.png --pgm carte.pgm
+"""
+import argparse
+import json
+import os
+import struct
+import time
+import zipfile
+import zlib
+
+import numpy as np
+
+from map_buffer import POINT_DTYPE
+from occupancy import OccupancyGrid
+
+
+FORMAT_VERSION = 1
+POSE_DTYPE = np.dtype([("robot", np.uint16), ("x", np.float64), ("y", np.float64),
+                       ("heading", np.float64)])
+TRAJECTORY_DTYPE = np.dtype([("robot", np.uint16), ("x", np.float32), ("y", np.float32)])
+
+# Seuils de map_server (probabilité d'occupation)
+PGM_OCCUPIED_THRESHOLD = 0.65
+PGM_FREE_THRESHOLD = 0.196
+
+
+def save(path, points, grid, poses=(), trajectories=(), **meta):
+    """Écrire une carte ; poses : (robot, x, y, cap), trajectories : (robot, [(x, y), …])"""
+    keys = sorted(grid.tiles)
+    tiles = (np.stack([grid.tiles[key] for key in keys]) if keys else
+             np.zeros((0, grid.tile_size, grid.tile_size), dtype=np.float32))
+    trajectory = [(robot, x, y) for robot, path_ in trajectories for x, y in path_]
+    meta = dict(meta, version=FORMAT_VERSION, cell_size=grid.cell_size,
+                tile_size=grid.tile_size, saved=time.strftime("%Y-%m-%d %H:%M:%S"))
+    # Fichier temporaire puis renommage : une carte existante n'est jamais à moitié écrite
+    temp = f"{path}.tmp"
+    with open(temp, "wb") as f:
+        np.savez(f,
+                 meta=np.array(json.dumps(meta)),
+                 points=np.asarray(points, dtype=POINT_DTYPE),
+                 tile_keys=np.array(keys, dtype=np.int32).reshape(-1, 2),
+                 tiles=tiles,
+                 poses=np.array(list(poses), dtype=POSE_DTYPE),
+                 trajectory=np.array(trajectory, dtype=TRAJECTORY_DTYPE))
+    os.replace(temp, path)
+
+
+class MapFile:
+    """Carte ouverte par projection en mémoire (lecture seule, tuiles en copie à l'écriture)"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        with zipfile.ZipFile(self.path) as archive, open(self.path, "rb") as f:
+            self.meta = json.loads(str(self._array(archive, f, "meta", load=True)))
+            if self.meta.get("version", 0) > FORMAT_VERSION:
+                raise ValueError(f"{self.path}: version {self.meta['version']} non supportée")
+            self.points = self._array(archive, f, "points")
+            self.tile_keys = self._array(archive, f, "tile_keys", load=True)
+            # Copie à l'écriture : la grille chargée peut continuer à être mise à jour
+            self.tiles = self._array(archive, f, "tiles", mode="c")
+            self.poses = self._array(archive, f, "poses", load=True)
+            self.trajectory = self._array(archive, f, "trajectory")
+
+    def _array(self, archive, f, name, mode="r", load=False):
+        """Membre `name` de l'archive : projeté en mémoire s'il est stocké sans compression"""
+        info = archive.getinfo(name + ".npy")
+        if load or info.compress_type != zipfile.ZIP_STORED:
+            with archive.open(info) as member:
+                return np.lib.format.read_array(member, allow_pickle=False)
+
+        # En-tête local du zip (30 octets + nom + extra), puis en-tête .npy
+        f.seek(info.header_offset)
+        name_length, extra_length = struct.unpack("<HH", f.read(30)[26:30])
+        f.seek(info.header_offset + 30 + name_length + extra_length)
+        version = np.lib.format.read_magic(f)
+        if version == (1, 0):
+            shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+        else:
+            shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+        if 0 in shape:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode=mode, offset=f.tell(), shape=shape,
+                         order="F" if fortran else "C")
+
+    def grid(self):
+        """Grille d'occupation dont les tuiles sont des vues sur le fichier"""
+        grid = OccupancyGrid(self.meta["cell_size"], self.meta["tile_size"])
+        for (tile_x, tile_y), tile in zip(self.tile_keys.tolist(), self.tiles):
+            grid.tiles[(tile_x, tile_y)] = tile
+        return grid
+
+    def trajectories(self):
+        """Trajectoire de chaque robot : {robot: [(x, y), …]}"""
+        result = {}
+        trajectory = np.asarray(self.trajectory)
+        for robot in np.unique(trajectory["robot"]).tolist():
+            path = trajectory[trajectory["robot"] == robot]
+            result[robot] = list(zip(path["x"].tolist(), path["y"].tolist()))
+        return result
+
+
+def load(path):
+    """Ouvrir une carte (instantané : seuls les en-têtes sont lus) ; lève OSError / ValueError"""
+    try:
+        return MapFile(path)
+    except (KeyError, zipfile.BadZipFile) as e:
+        raise ValueError(f"{path}: fichier de carte invalide ({e})") from None
+
+
+# --- Export en image ---
+
+def grid_rgb(grid, pixels_per_cell=1):
+    """Image RVB de toute l'emprise de la grille (couleurs de l'interface) ; None si vide"""
+    bounds = grid.bounds()
+    if bounds is None:
+        return None
+    x0, y0, x1, y1 = bounds
+    width, height = (x1 - x0) * pixels_per_cell, (y1 - y0) * pixels_per_cell
+    # Origine du rendu au centre de l'emprise
+    origin = ((x0 + x1) / 2 * grid.cell_size, (y0 + y1) / 2 * grid.cell_size)
+    return grid.to_rgb(width, height, width / 2, height / 2, pixels_per_cell / grid.cell_size,
+                       origin)
+
+
+def write_png(path, image):
+    """Écrire une image (hauteur, largeur) en niveaux de gris ou (hauteur, largeur, 3) RVB"""
+    image = np.ascontiguousarray(image, dtype=np.uint8)
+    height, width = image.shape[:2]
+    color_type = 2 if image.ndim == 3 else 0
+    # Chaque ligne est précédée de son filtre (0 : aucun)
+    raw = np.hstack((np.zeros((height, 1), dtype=np.uint8), image.reshape(height, -1)))
+
+    def chunk(tag, data):
+        return (struct.pack(">I", len(data)) + tag + data
+                + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF))
+
+    with open(path, "wb") as f:
+        f.write(b"\x89PNG\r\n\x1a\n")
+        f.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, color_type, 0, 0, 0)))
+        f.write(chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)))
+        f.write(chunk(b"IEND", b""))
+
+
+def write_pgm(path, grid):
+    """Grille en PGM + YAML map_server (une cellule par pixel) ; False si la carte est vide"""
+    bounds = grid.bounds()
+    if bounds is None:
+        return False
+    # Ligne 0 de l'image en haut (y max)
+    logodds = np.flipud(grid.region(*bounds))
+    occupied = 1.0 / (1.0 + np.exp(-logodds))
+    pixels = np.round((1.0 - occupied) * 255).astype(np.uint8)
+    height, width = pixels.shape
+    with open(path, "wb") as f:
+        f.write(b"P5 %d %d 255\n" % (width, height))
+        f.write(pixels.tobytes())
+
+    resolution = grid.cell_size / 100.0  # m/pixel
+    x0, y0 = bounds[0] * resolution, bounds[1] * resolution
+    with open(os.path.splitext(path)[0] + ".yaml", "w") as f:
+        f.write(f"image: {os.path.basename(path)}\n"
+                f"resolution: {resolution:g}\n"
+                f"origin: [{x0:g}, {y0:g}, 0.0]\n"
+                f"negate: 0\n"
+                f"occupied_thresh: {PGM_OCCUPIED_THRESHOLD}\n"
+                f"free_thresh: {PGM_FREE_THRESHOLD}\n")
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Informations et export d'une carte .npz")
+    parser.add_argument("path")
+    parser.add_argument("--png", help="image PNG de la grille (couleurs de l'interface)")
+    parser.add_argument("--pgm", help="image PGM + YAML (map_server)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    saved = load(args.path)
+    elapsed = time.perf_counter() - start
+    grid = saved.grid()
+    print(f"{len(saved.points)} points, {len(grid.tiles)} tuiles, "
+          f"{len(saved.poses)} robots, {len(saved.trajectory)} points de trajectoire")
+    print(f"Ouverture: {elapsed * 1000:.1f} ms — {json.dumps(saved.meta)}")
+
+    if args.png:
+        rgb = grid_rgb(grid)
+        if rgb is not None:
+            write_png(args.png, rgb)
+            print(f"PNG: {args.png}")
+    if args.pgm and write_pgm(args.pgm, grid):
+        print(f"PGM: {args.pgm}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Instrumentation : débits, histogrammes de temps de frame, export CSV / JSON
+
+Conçu pour les chemins chauds : observer une valeur coûte une recherche
+dichotomique et une incrémentation, les débits et percentiles ne sont calculés
+qu'à chaque instantané (une fois par seconde environ).
+"""
+import csv
+import json
+import time
+from bisect import bisect_left
+
+
+# Bornes des seaux (ms) : fines autour du budget d'une frame à 60 FPS
+FRAME_BOUNDS_MS = (0.5, 1, 2, 4, 6, 8, 10, 12, 14, 16, 20, 25, 33, 50, 75, 100, 200, 500)
+SNAPSHOT_INTERVAL = 1.0  # s
+
+
+class Histogram:
+    """Histogramme à seaux fixes (aucune allocation par observation)"""
+
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q):
+        """Borne haute du seau contenant le percentile q (0–100), max observé au-delà"""
+        if self.count == 0:
+            return 0.0
+        rank = q / 100.0 * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class Metrics:
+    """Compteurs et histogrammes de l'interface, résumés par instantanés
+
+    Les compteurs cumulés déjà tenus ailleurs (mesures reçues, erreurs du
+    décodeur, frames…) sont passés à snapshot() qui en déduit les débits.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.bytes = 0  # Octets lus sur le port (thread de lecture)
+        self.frame_ms = Histogram(FRAME_BOUNDS_MS)
+        self.queue_peak = 0
+        self._last_time = clock()
+        self._last_totals = {}
+
+    def observe_frame(self, elapsed, queue_depth):
+        """Enregistrer une frame dessinée (elapsed en s) et la profondeur de la file"""
+        self.frame_ms.observe(elapsed * 1000.0)
+        if queue_depth > self.queue_peak:
+            self.queue_peak = queue_depth
+
+    def due(self, interval=SNAPSHOT_INTERVAL):
+        return self.clock() - self._last_time >= interval
+
+    def snapshot(self, totals, **gauges):
+        """Résumé depuis le dernier instantané : débits (/s) des totaux, percentiles, jauges"""
+        now = self.clock()
+        elapsed = max(now - self._last_time, 1e-9)
+        totals = dict(totals, bytes=self.bytes)
+
+        row = {"time": round(time.time(), 3)}
+        for name, total in totals.items():
+            last = self._last_totals.get(name, 0)
+            delta = total - last if total >= last else total  # Compteur remis à zéro
+            row[f"{name}_per_s"] = round(delta / elapsed, 1)
+        row.update(
+            frame_p50_ms=self.frame_ms.percentile(50),
+            frame_p95_ms=self.frame_ms.percentile(95),
+            frame_p99_ms=self.frame_ms.percentile(99),
+            frame_max_ms=round(self.frame_ms.max, 2),
+            queue_peak=self.queue_peak,
+        )
+        row.update(gauges)
+
+        self._last_time = now
+        self._last_totals = totals
+        self.frame_ms.reset()
+        self.queue_peak = 0
+        return row
+
+
+def format_overlay(row):
+    """Texte compact d'un instantané pour l'affichage à l'écran"""
+    return (f"{row['bytes_per_s'] / 1000:.1f} ko/s  {row['samples_per_s']:.0f} mes/s  "
+            f"err {row['parse_errors_per_s']:.0f}/s\n"
+            f"frame p50 {row['frame_p50_ms']:g} p95 {row['frame_p95_ms']:g} "
+            f"max {row['frame_max_ms']:g} ms  {row['frames_per_s']:.0f} FPS\n"
+            f"file {row['queue_depth']} (pic {row['queue_peak']})  "
+            f"items {row['canvas_items']}  niveau {row['render_level']}")
+
+
+class MetricsExporter:
+    """Ajoute les instantanés à un fichier : CSV, ou une ligne JSON par instantané (.json/.jsonl)"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.json = self.path.endswith((".json", ".jsonl"))
+        self._file = open(self.path, "a", newline="")
+        self._writer = None
+
+    def write(self, row):
+        if self.json:
+            self._file.write(json.dumps(row) + "\n")
+        else:
+            if self._writer is None:
+                self._writer = csv.DictWriter(self._file, fieldnames=list(row),
+                                              extrasaction='ignore')
+                if self._file.tell() == 0:
+                    self._writer.writeheader()
+            self._writer.writerow(row)
+        self._file.flush()  # Exploitable même si le programme est tué
+
+    def close(self):
+        self._file.close()
@@ -0,0 +1,157 @@
+"""Grille d'occupation (log-odds) alimentée par les mesures sonar
+
+Repère monde en cm : x vers la droite, y vers l'avant du robot au départ.
+Les directions sont des caps en degrés, 0° = +y, sens horaire (comme l'angle
+du sonar). La grille est découpée en tuiles denses créées à la demande, la
+carte peut donc s'étendre sans réallocation.
+"""
+import numpy as np
+
+
+# Incréments log-odds par observation
+L_OCCUPIED = 0.85
+L_FREE = -0.4
+L_MAX = 5.0  # Saturation : la carte reste capable d'évoluer
+
+TILE_SIZE = 64  # cellules par côté de tuile
+
+# Couleurs : libre (sombre) → inconnu (fond du canvas) → occupé (vert vif)
+PALETTE_SIZE = 64
+_t = np.linspace(-1.0, 1.0, PALETTE_SIZE)[:, None]
+_background = np.array([0x00, 0x0a, 0x00], dtype=np.float32)
+_free = np.array([0x10, 0x30, 0x28], dtype=np.float32)
+_occupied = np.array([0x00, 0xff, 0x00], dtype=np.float32)
+PALETTE = np.where(_t < 0, _background + (_free - _background) * -_t,
+                   _background + (_occupied - _background) * _t).astype(np.uint8)
+del _t, _background, _free, _occupied
+
+
+class OccupancyGrid:
+    """Grille log-odds à tuiles, mise à jour par lancer de rayons vectorisé"""
+
+    def __init__(self, cell_size=5.0, tile_size=TILE_SIZE):
+        self.cell_size = float(cell_size)
+        self.tile_size = tile_size
+        self.tiles = {}  # (tuile x, tuile y) → tableau (tile_size, tile_size) float32
+        self.version = 0  # Incrémenté à chaque mise à jour
+        self.tile_versions = {}  # (tuile x, tuile y) → version de sa dernière modification
+        self.generation = 0  # Incrémenté par clear() : toutes les tuiles sont à relire
+
+    def clear(self):
+        """Effacer la carte"""
+        self.tiles.clear()
+        self.tile_versions.clear()
+        self.version += 1
+        self.generation += 1
+
+    def integrate(self, origin_x, origin_y, bearing, distance, max_range, weight=1.0):
+        """Intégrer des mesures prises depuis un point du monde
+
+        bearing (°) et distance (cm) sont des tableaux de même taille. Une
+        distance >= max_range est une absence d'écho : tout le faisceau est libre.
+        weight = -1 retire des mesures déjà intégrées (au plafond L_MAX près).
+        """
+        bearing = np.radians(np.asarray(bearing, dtype=np.float64))
+        distance = np.asarray(distance, dtype=np.float64)
+        origin_x = np.broadcast_to(np.asarray(origin_x, dtype=np.float64), distance.shape)
+        origin_y = np.broadcast_to(np.asarray(origin_y, dtype=np.float64), distance.shape)
+        valid = distance > 0
+        bearing, distance = bearing[valid], distance[valid]
+        origin_x, origin_y = origin_x[valid], origin_y[valid]
+        if len(distance) == 0:
+            return
+
+        sin_b, cos_b = np.sin(bearing), np.cos(bearing)
+        hit = distance < max_range
+
+        # Espace libre : un échantillon par cellule, jusqu'à une cellule avant l'écho
+        free_length = np.where(hit, distance - self.cell_size, np.minimum(distance, max_range))
+        steps = np.ceil(np.maximum(free_length, 0.0) / self.cell_size).astype(np.int64)
+        total = int(steps.sum())
+        if total:
+            ray = np.repeat(np.arange(len(steps)), steps)
+            k = np.arange(total) - np.repeat(np.cumsum(steps) - steps, steps)
+            r = (k + 0.5) * self.cell_size
+            self._add(origin_x[ray] + r * sin_b[ray], origin_y[ray] + r * cos_b[ray],
+                      L_FREE * weight)
+
+        # Obstacle au bout du faisceau
+        if hit.any():
+            self._add(origin_x[hit] + distance[hit] * sin_b[hit],
+                      origin_y[hit] + distance[hit] * cos_b[hit], L_OCCUPIED * weight)
+
+        self.version += 1
+
+    def _add(self, x, y, delta):
+        """Ajouter delta aux cellules contenant les points (x, y)"""
+        ix = np.floor(x / self.cell_size).astype(np.int64)
+        iy = np.floor(y / self.cell_size).astype(np.int64)
+        tx, ty = ix // self.tile_size, iy // self.tile_size
+
+        # Regroupement par tuile (clé entière unique, puis tri)
+        keys = tx * (1 << 32) + (ty + (1 << 31))
+        order = np.argsort(keys, kind='stable')
+        keys, ix, iy = keys[order], ix[order], iy[order]
+        starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+        ends = np.r_[starts[1:], len(keys)]
+        version = self.version + 1  # Celle de la fin de integrate()
+        for start, end in zip(starts, ends):
+            key = int(keys[start])
+            tile_x, tile_y = key >> 32, (key & 0xFFFFFFFF) - (1 << 31)
+            tile = self.tile(tile_x, tile_y)
+            np.add.at(tile, (iy[start:end] - tile_y * self.tile_size,
+                             ix[start:end] - tile_x * self.tile_size), delta)
+            np.clip(tile, -L_MAX, L_MAX, out=tile)
+            self.tile_versions[(tile_x, tile_y)] = version
+
+    def tile(self, tile_x, tile_y, create=True):
+        """Tuile (tile_x, tile_y), créée vide si besoin (None si absente et create=False)"""
+        tile = self.tiles.get((tile_x, tile_y))
+        if tile is None and create:
+            tile = np.zeros((self.tile_size, self.tile_size), dtype=np.float32)
+            self.tiles[(tile_x, tile_y)] = tile
+        return tile
+
+    def region(self, cell_x0, cell_y0, cell_x1, cell_y1):
+        """Log-odds des cellules [x0, x1) × [y0, y1) (ligne = y) ; 0 hors carte"""
+        out = np.zeros((cell_y1 - cell_y0, cell_x1 - cell_x0), dtype=np.float32)
+        size = self.tile_size
+        for tile_y in range(cell_y0 // size, (cell_y1 - 1) // size + 1):
+            for tile_x in range(cell_x0 // size, (cell_x1 - 1) // size + 1):
+                tile = self.tiles.get((tile_x, tile_y))
+                if tile is None:
+                    continue
+                x0 = max(cell_x0, tile_x * size)
+                x1 = min(cell_x1, (tile_x + 1) * size)
+                y0 = max(cell_y0, tile_y * size)
+                y1 = min(cell_y1, (tile_y + 1) * size)
+                out[y0 - cell_y0:y1 - cell_y0, x0 - cell_x0:x1 - cell_x0] = \
+                    tile[y0 - tile_y * size:y1 - tile_y * size, x0 - tile_x * size:x1 - tile_x * size]
+        return out
+
+    def bounds(self):
+        """Emprise des tuiles existantes en cellules (x0, y0, x1, y1), None si vide"""
+        if not self.tiles:
+            return None
+        keys = np.array(list(self.tiles))
+        x0, y0 = keys.min(axis=0) * self.tile_size
+        x1, y1 = (keys.max(axis=0) + 1) * self.tile_size
+        return int(x0), int(y0), int(x1), int(y1)
+
+    def to_ppm(self, width, height, center_x, center_y, scale, origin=(0.0, 0.0)):
+        """Rendre la zone visible en image PPM (échelle en pixels/cm, origin au centre)"""
+        rgb = self.to_rgb(width, height, center_x, center_y, scale, origin)
+        return b"P6 %d %d 255\n" % (width, height) + rgb.tobytes()
+
+    def to_rgb(self, width, height, center_x, center_y, scale, origin=(0.0, 0.0)):
+        """Image (hauteur, largeur, 3) de la zone visible, mêmes paramètres que to_ppm"""
+        # Cellule sous chaque colonne / ligne de pixels (plus proche voisin)
+        world_x = origin[0] + (np.arange(width) + 0.5 - center_x) / scale
+        world_y = origin[1] - (np.arange(height) + 0.5 - center_y) / scale
+        cols = np.floor(world_x / self.cell_size).astype(np.int64)
+        rows = np.floor(world_y / self.cell_size).astype(np.int64)
+        x0, y0 = int(cols.min()), int(rows.min())
+        cells = self.region(x0, y0, int(cols.max()) + 1, int(rows.max()) + 1)
+
+        index = ((cells + L_MAX) * ((PALETTE_SIZE - 1) / (2 * L_MAX))).round().astype(np.uint8)
+        return PALETTE[index[rows - y0][:, cols - x0]]
@@ -0,0 +1,224 @@
+"""Planification du cap du robot à partir de la carte cumulée
+
+En fin de scan, le moteur demande un cap au planificateur et l'envoie au robot
+("CMD:HEADING:<°>") pendant son recul : le firmware tourne vers ce cap au lieu
+du milieu du meilleur des 8 secteurs de findBestDirection().
+
+Deux étages :
+
+1. but : la frontière (case libre au bord de l'inconnu) la plus proche en
+   chemin, par propagation de front sur une grille grossière (PLAN_CELL ×
+   PLAN_CELL cellules de la grille d'occupation) autour du robot. Un faisceau
+   sans écho marque libre l'autre côté d'un mur : seules les frontières
+   atteignables par l'espace libre comptent. Le chemin donne un point de visée
+   à LOOKAHEAD_STEPS cases du robot. L'état des cases grossières est gardé par
+   tuile, seules les tuiles modifiées depuis le plan précédent sont relues
+   (OccupancyGrid.tile_versions) ;
+2. cap : histogramme polaire des obstacles autour du robot (VFH), tiré du
+   profil polaire de l'index spatial (spatial_index.py). Les directions dont le
+   couloir de la largeur du robot est dégagé sur SAFE_DISTANCE sont candidates,
+   la plus proche du point de visée l'emporte. Sans frontière atteignable
+   (carte explorée), la direction la plus dégagée, comme le firmware.
+
+Repère monde en cm et caps en degrés comme pose.py (0° = +y, sens horaire).
+"""
+import math
+import time
+from collections import namedtuple
+
+import numpy as np
+
+
+PLAN_CELL = 4  # Cellules de la grille d'occupation par case grossière (côté)
+PLAN_RADIUS = 800.0  # cm, étendue de la recherche de frontière autour du robot
+OCCUPIED_LOGODDS = 0.5  # Case grossière occupée : une cellule au-dessus
+UNKNOWN_LOGODDS = 0.01  # Case grossière inconnue : aucune cellule au-delà (en valeur absolue)
+MIN_GOAL_DISTANCE = 60.0  # cm, frontières plus proches ignorées (déjà sous le sonar)
+GOAL_SLACK = 10  # Cases de propagation après la première frontière atteinte
+TURN_PENALTY = 0.5  # cm de chemin par degré d'écart avec le cap actuel
+LOOKAHEAD_STEPS = 5  # Point de visée sur le chemin (cases grossières)
+SAFE_DISTANCE = 70.0  # cm de couloir dégagé pour une direction candidate
+HALF_WIDTH = 10.0  # Demi-largeur du robot (cm)
+PLAN_SECTORS = 72  # Directions de l'histogramme polaire (5°)
+
+# États des cases grossières
+UNKNOWN, FREE, OCCUPIED = 0, 1, 2
+
+# bearing : cap monde choisi, turn : rotation à demander au robot (0-359°, sens horaire),
+# clearance : couloir dégagé dans ce cap (cm), goal : frontière visée (x, y) ou None,
+# path : longueur du chemin jusqu'à la frontière (cm, 0 sans but)
+Plan = namedtuple("Plan", "bearing turn clearance goal path elapsed")
+
+
+def _grow(mask):
+    """Masque étendu d'une case dans les 8 directions"""
+    rows = mask.copy()
+    rows[1:] |= mask[:-1]
+    rows[:-1] |= mask[1:]
+    grown = rows.copy()
+    grown[:, 1:] |= rows[:, :-1]
+    grown[:, :-1] |= rows[:, 1:]
+    return grown
+
+
+class NavigationPlanner:
+    """Cap vers la frontière atteignable la plus proche, sans obstacle dans le couloir du robot"""
+
+    def __init__(self, grid, index, max_range=400.0, half_width=HALF_WIDTH,
+                 safe_distance=SAFE_DISTANCE, sectors=PLAN_SECTORS, radius=PLAN_RADIUS):
+        self.grid = grid
+        self.index = index
+        self.max_range = float(max_range)
+        self.half_width = half_width
+        self.safe_distance = safe_distance
+        self.sectors = sectors
+        self.radius = radius
+        self.plans = 0
+        self.tiles_updated = 0  # Tuiles relues au dernier plan
+        self._generation = None
+        self._tile_versions = {}  # Tuile → version de la grille à sa dernière lecture
+        self._cells = {}  # Tuile → états des cases grossières (ligne = y)
+
+        # Angle entre chaque direction candidate et chaque secteur du profil
+        centers = (np.arange(sectors) + 0.5) * (360.0 / sectors)
+        delta = np.radians(centers[None, :] - centers[:, None])
+        self._centers = centers
+        self._cos, self._sin = np.cos(delta), np.abs(np.sin(delta))
+
+    def reset(self):
+        """Oublier l'état des tuiles (la carte a été effacée ou remplacée)"""
+        self._tile_versions = {}
+        self._cells = {}
+        self._generation = self.grid.generation
+
+    # --- Grille grossière ---
+
+    def update_cells(self):
+        """Reclasser les tuiles modifiées depuis le dernier appel ; renvoie leur nombre"""
+        grid = self.grid
+        if grid.generation != self._generation:
+            self.reset()
+        changed = [key for key in grid.tiles
+                   if self._tile_versions.get(key, -1) < grid.tile_versions.get(key, 0)]
+        size = grid.tile_size // PLAN_CELL
+        for key in changed:
+            blocks = grid.tiles[key].reshape(size, PLAN_CELL, size, PLAN_CELL)
+            # Vue au moins une fois (faisceau ou écho) : libre, sauf écho
+            cells = np.where((np.abs(blocks) > UNKNOWN_LOGODDS).any(axis=(1, 3)),
+                             FREE, UNKNOWN).astype(np.int8)
+            cells[blocks.max(axis=(1, 3)) > OCCUPIED_LOGODDS] = OCCUPIED
+            self._cells[key] = cells
+            self._tile_versions[key] = grid.tile_versions.get(key, 0)
+        return len(changed)
+
+    def _window(self, x, y):
+        """États des cases grossières à moins de `radius` de (x, y), et l'indice (colonne,
+        ligne) de la première case"""
+        size = self.grid.tile_size // PLAN_CELL
+        tile_cm = self.grid.tile_size * self.grid.cell_size
+        tx0, tx1 = math.floor((x - self.radius) / tile_cm), math.floor((x + self.radius) / tile_cm)
+        ty0, ty1 = math.floor((y - self.radius) / tile_cm), math.floor((y + self.radius) / tile_cm)
+        cells = np.full(((ty1 - ty0 + 1) * size, (tx1 - tx0 + 1) * size), UNKNOWN, dtype=np.int8)
+        for tile_y in range(ty0, ty1 + 1):
+            for tile_x in range(tx0, tx1 + 1):
+                tile = self._cells.get((tile_x, tile_y))
+                if tile is not None:
+                    row, col = (tile_y - ty0) * size, (tile_x - tx0) * size
+                    cells[row:row + size, col:col + size] = tile
+        return cells, (tx0 * size, ty0 * size)
+
+    def route(self, x, y, heading):
+        """Frontière la plus proche en chemin depuis (x, y)
+
+        Renvoie (but, point de visée, longueur du chemin en cm), ou None si aucune
+        frontière n'est atteignable par l'espace libre.
+        """
+        cells, (col0, row0) = self._window(x, y)
+        step_cm = PLAN_CELL * self.grid.cell_size
+        unknown = cells == UNKNOWN
+        frontier = (cells == FREE) & _grow(unknown)
+        # Obstacles élargis d'une case : pas de passage entre deux échos trop proches
+        passable = (cells == FREE) & ~_grow(cells == OCCUPIED)
+        start = (int(y // step_cm) - row0, int(x // step_cm) - col0)
+        passable[start] = True  # Le robot peut être au bord d'un obstacle élargi
+
+        # Coordonnées des centres et frontières assez éloignées
+        xs = (col0 + np.arange(cells.shape[1]) + 0.5) * step_cm
+        ys = (row0 + np.arange(cells.shape[0]) + 0.5) * step_cm
+        far = np.hypot(xs[None, :] - x, ys[:, None] - y) >= MIN_GOAL_DISTANCE
+        targets = frontier & far
+
+        # Propagation de front (8 voisines, une case par pas)
+        distance = np.full(cells.shape, -1, dtype=np.int32)
+        distance[start] = 0
+        reached = np.zeros(cells.shape, dtype=bool)
+        reached[start] = True
+        step, found = 0, None
+        while found is None or step < found + GOAL_SLACK:
+            step += 1
+            new = _grow(reached) & passable & ~reached
+            if not new.any():
+                break
+            distance[new] = step
+            reached |= new
+            if found is None and (new & targets).any():
+                found = step
+        if found is None:
+            return None
+
+        # But : chemin le plus court, pénalisé par la rotation
+        rows, cols = np.nonzero(reached & targets)
+        turn = np.abs((np.degrees(np.arctan2(xs[cols] - x, ys[rows] - y)) - heading + 180.0)
+                      % 360.0 - 180.0)
+        best = int(np.argmin(distance[rows, cols] * step_cm + TURN_PENALTY * turn))
+        row, col = int(rows[best]), int(cols[best])
+        path = int(distance[row, col])
+
+        # Remonter le chemin jusqu'au point de visée
+        while distance[row, col] > LOOKAHEAD_STEPS:
+            target = distance[row, col] - 1
+            for dy in (-1, 0, 1):
+                for dx in (-1, 0, 1):
+                    r, c = row + dy, col + dx
+                    if (0 <= r < cells.shape[0] and 0 <= c < cells.shape[1]
+                            and distance[r, c] == target):
+                        break
+                else:
+                    continue
+                break
+            row, col = r, c
+        goal = (float(xs[cols[best]]), float(ys[rows[best]]))
+        return goal, (float(xs[col]), float(ys[row])), path * step_cm
+
+    # --- Cap ---
+
+    def clearance(self, x, y):
+        """Longueur dégagée (cm) du couloir du robot dans chaque direction candidate"""
+        profile = self.index.polar_profile(x, y, self.max_range, self.sectors)
+        # Point le plus proche de chaque secteur : dans le couloir de la direction i si
+        # son écart latéral est sous la demi-largeur ; sa distance le long du couloir compte
+        inside = (self._cos > 0) & (profile[None, :] * self._sin <= self.half_width)
+        along = np.where(inside, profile[None, :] * self._cos, self.max_range)
+        return along.min(axis=1)
+
+    def plan(self, x, y, heading):
+        """Cap à prendre depuis la pose (x, y, heading) du robot"""
+        start = time.perf_counter()
+        self.tiles_updated = self.update_cells()
+        clearance = self.clearance(x, y)
+        route = self.route(x, y, heading)
+
+        candidates = clearance >= self.safe_distance
+        goal, path = None, 0.0
+        if route is not None and candidates.any():
+            # Direction dégagée la plus proche de celle du point de visée
+            goal, (aim_x, aim_y), path = route
+            target = np.degrees(np.arctan2(aim_x - x, aim_y - y))
+            gap = np.abs((self._centers - target + 180.0) % 360.0 - 180.0)
+            best = int(np.argmin(np.where(candidates, gap, np.inf)))
+        else:
+            best = int(np.argmax(clearance))
+        bearing = float(self._centers[best])
+        self.plans += 1
+        return Plan(bearing, int(round(bearing - heading)) % 360, float(clearance[best]), goal,
+                    path, time.perf_counter() - start)
@@ -0,0 +1,134 @@
+"""Estimation de la pose du robot à l'estime (dead-reckoning)
+
+Repère monde en cm, identique à occupancy.py : x à droite, y vers l'avant au
+départ, cap en degrés (0° = +y, sens horaire). La pose est déduite des
+messages du firmware et des durées codées dans code_radar.ino.
+"""
+import math
+
+
+# Modèle du firmware (code_radar.ino)
+FORWARD_SPEED = 25.0  # cm/s à SPEED_FWD = 160 (recalé par EVENT:METRE)
+BACKWARD_TIME = 0.4  # Recul de sécurité avant la rotation (s)
+TURN_TIME_90 = 0.55  # DUREE_TURN_90 (s)
+TURN_SETTLE_TIME = 0.3  # Arrêt après la rotation (s)
+SCAN_DIRECTION = 1  # +1 : l'angle du scan croît vers la droite, comme TURN_RIGHT
+METRE = 100.0  # cm entre deux EVENT:METRE
+
+
+def to_world(x, y, bearing, distance):
+    """Point situé à `distance` cm de (x, y) dans la direction `bearing` (°)"""
+    rad = math.radians(bearing)
+    return x + distance * math.sin(rad), y + distance * math.cos(rad)
+
+
+class PoseEstimator:
+    """Pose (x, y, cap) intégrée à partir des messages du robot"""
+
+    def __init__(self, forward_speed=FORWARD_SPEED):
+        self.forward_speed = forward_speed
+        self.moving_since = None  # Début du mouvement avant en cours (peut être à venir)
+        self.version = 0  # Incrémenté à chaque changement de pose connue
+        self.reset()
+
+    def reset(self, timestamp=None):
+        """Replacer le robot à l'origine (le mouvement en cours continue depuis `timestamp`)"""
+        self.x = 0.0
+        self.y = 0.0
+        self.heading = 0.0
+        self.odometer = 0.0  # cm parcourus depuis le dernier EVENT:METRE
+        self.trajectory = [(0.0, 0.0)]
+        if self.moving_since is not None and timestamp is not None:
+            self.moving_since = max(self.moving_since, timestamp)
+        self.version += 1
+
+    def restore(self, x, y, heading, trajectory):
+        """Reprendre une pose sauvegardée (carte rechargée), robot à l'arrêt"""
+        self.x, self.y, self.heading = float(x), float(y), float(heading)
+        self.odometer = 0.0
+        self.trajectory = list(trajectory) or [(self.x, self.y)]
+        self.moving_since = None
+        self.version += 1
+
+    def pose_at(self, timestamp):
+        """Pose (x, y, cap) à l'instant `timestamp`, mouvement en cours compris"""
+        if self.moving_since is None:
+            return self.x, self.y, self.heading
+        distance = self.forward_speed * max(0.0, timestamp - self.moving_since)
+        x, y = to_world(self.x, self.y, self.heading, distance)
+        return x, y, self.heading
+
+    def sample_pose(self, angle, timestamp):
+        """Position du capteur et direction visée pour une mesure à `angle` (°)"""
+        x, y, heading = self.pose_at(timestamp)
+        return x, y, (heading + SCAN_DIRECTION * angle) % 360
+
+    def start_forward(self, timestamp, exact=False):
+        """Le robot avance à partir de `timestamp` (exact : remplace une date prévue)"""
+        if self.moving_since is None or exact:
+            self.moving_since = timestamp
+            self.version += 1
+
+    def stop(self, timestamp):
+        """Le robot s'arrête : intégrer le trajet en cours"""
+        if self.moving_since is not None:
+            distance = self.forward_speed * max(0.0, timestamp - self.moving_since)
+            self.moving_since = None
+            self.advance(distance)
+
+    def advance(self, distance):
+        """Déplacer le robot de `distance` cm selon son cap (négatif = recul)"""
+        self.x, self.y = to_world(self.x, self.y, self.heading, distance)
+        self.odometer += distance
+        self.trajectory.append((self.x, self.y))
+        self.version += 1
+
+    def turn(self, delta):
+        """Tourner de `delta` degrés (positif = droite)"""
+        self.heading = (self.heading + delta) % 360
+        self.version += 1
+
+    def apply_correction(self, angle, tx, ty):
+        """Appliquer une correction rigide du recalage (angle en radians, sens trigo)"""
+        c, s = math.cos(angle), math.sin(angle)
+        self.x, self.y = c * self.x - s * self.y + tx, s * self.x + c * self.y + ty
+        self.heading = (self.heading - math.degrees(angle)) % 360
+        self.trajectory.append((self.x, self.y))
+        self.version += 1
+
+    def handle_message(self, kind, value, timestamp):
+        """Mettre à jour la pose selon un message EVENT / STATUS / MSG"""
+        if kind == "EVENT":
+            if value.startswith("OBSTACLE") or value == "AUTO_SCAN":
+                self.stop(timestamp)  # Le robot s'arrête pour scanner
+            elif value == "METRE":
+                self._metre(timestamp)
+
+        elif kind == "STATUS":
+            if value == "MOVING":
+                self.start_forward(timestamp, exact=True)
+            elif value == "LINK_UP":
+                # L'ouverture du port redémarre l'Arduino, qui repart en avant
+                self.start_forward(timestamp)
+            elif value in ("SCAN_START", "STOPPED", "LINK_DOWN"):
+                self.stop(timestamp)
+
+        elif kind == "MSG" and value.startswith(("TURN_LEFT:", "TURN_RIGHT:")):
+            # performAvoidance : recul, rotation proportionnelle, pause, puis avance
+            try:
+                angle = float(value.split(':')[1].rstrip('°'))
+            except (IndexError, ValueError):
+                return
+            self.stop(timestamp)
+            self.advance(-self.forward_speed * BACKWARD_TIME)
+            self.turn(-angle if value.startswith("TURN_LEFT") else angle)
+            self.start_forward(timestamp + TURN_TIME_90 * angle / 90.0 + TURN_SETTLE_TIME)
+
+    def _metre(self, timestamp):
+        """Recaler la distance parcourue sur exactement 1 m"""
+        moving = self.moving_since is not None
+        self.stop(timestamp)
+        self.advance(METRE - self.odometer)
+        self.odometer = 0.0
+        if moving:
+            self.start_forward(timestamp)
@@ -0,0 +1,217 @@
+"""Décodage du flux série envoyé par le robot (voir code_radar/code_radar.ino)
+
+Deux formats cohabitent sur le même port :
+
+- texte (firmware d'origine), une ligne par message : "A:54:D:12.76",
+  "EVENT:...", "STATUS:...", "INFO:...", "MSG:..." ;
+- binaire (après la commande "CMD:BINARY" acquittée par "STATUS:BINARY"),
+  uniquement pour les mesures, en trames de FRAME_SIZE octets little-endian :
+
+      AA 55 | angle u16 (°) | distance u16 (mm) | temps u32 (ms) | CRC-8
+
+  Le CRC-8 (polynôme 0x07, init 0) couvre les 8 octets entre la synchro et
+  le CRC. Les messages texte restent des lignes et s'intercalent entre les trames.
+
+Commandes vers le robot (lignes, 23 caractères au plus) : CMD:BINARY, CMD:TEXT,
+CMD:HEADING:<°> (virage du prochain évitement, voir planner.py) et CMD:AUTO
+(retour au choix du firmware, acquitté par "STATUS:AUTO").
+"""
+import struct
+from collections import namedtuple
+from itertools import repeat
+
+import numpy as np
+
+
+# Mesure sonar : angle (°), distance (cm), instant de réception (time.monotonic),
+# numéro du robot émetteur (plusieurs robots connectés à la même interface)
+Sample = namedtuple("Sample", "angle distance timestamp robot", defaults=(0,))
+
+# Message texte : kind = EVENT / STATUS / INFO / MSG / ERROR, value = reste de la ligne
+Message = namedtuple("Message", "kind value timestamp robot", defaults=(0,))
+
+MESSAGE_KINDS = ("EVENT", "STATUS", "INFO", "MSG")
+
+# Trame binaire
+SYNC = b"\xaa\x55"
+FRAME = struct.Struct("<2sHHIB")
+FRAME_SIZE = FRAME.size  # 11 octets
+FRAME_DTYPE = np.dtype([("sync", "V2"), ("angle", "<u2"), ("distance", "<u2"),
+                        ("millis", "<u4"), ("crc", "u1")])  # Même disposition, sans alignement
+CMD_BINARY = b"CMD:BINARY\n"
+CMD_TEXT = b"CMD:TEXT\n"
+CMD_AUTO = b"CMD:AUTO\n"
+
+MAX_PENDING_BYTES = 4096  # Ligne sans fin au-delà : on jette le buffer
+
+
+def heading_command(turn):
+    """Commande CMD:HEADING : virage (°, sens horaire) du prochain évitement"""
+    return b"CMD:HEADING:%d\n" % (int(turn) % 360)
+
+
+def _crc8_table():
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x07) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table.append(crc)
+    return bytes(table)
+
+
+CRC8_TABLE = _crc8_table()
+_CRC8_LOOKUP = np.frombuffer(CRC8_TABLE, dtype=np.uint8)
+
+
+def crc8(data):
+    """CRC-8 (polynôme 0x07) d'un bloc d'octets"""
+    crc = 0
+    for byte in data:
+        crc = CRC8_TABLE[crc ^ byte]
+    return crc
+
+
+def encode_frame(angle, distance, millis):
+    """Construire une trame binaire (utile pour les tests et la simulation)"""
+    payload = struct.pack("<HHI", int(angle) % 65536, min(int(round(distance * 10)), 65535),
+                          int(millis) & 0xFFFFFFFF)
+    return SYNC + payload + bytes((crc8(payload),))
+
+
+def parse_line(line, timestamp, robot=0):
+    """Convertir une ligne en Sample ou Message (None si la ligne est ignorée)
+
+    Lève ValueError si une ligne de mesure est malformée.
+    """
+    if not line or len(line) < 3:
+        return None
+
+    # ✅ FORMAT: "A:54:D:12.76"
+    if line.startswith("A:") and ":D:" in line:
+        parts = line.split(':')
+        if len(parts) < 4:
+            return None
+        angle = int(float(parts[1]))  # Après A:
+        distance = float(parts[3])     # Après D:
+        return Sample(angle, distance, timestamp, robot)
+
+    kind, sep, value = line.partition(':')
+    if sep and kind in MESSAGE_KINDS:
+        return Message(kind, value, timestamp, robot)
+    return None
+
+
+class StreamDecoder:
+    """Découper un flux d'octets (trames binaires et lignes texte) en Sample / Message
+
+    Les éléments produits portent le numéro `robot` du port décodé.
+    """
+
+    def __init__(self, robot=0):
+        self.robot = robot
+        self.buffer = bytearray()
+        self.parse_errors = 0
+        self.crc_errors = 0
+        self.last_error_line = ""
+        self._clock_offset = None  # temps hôte - temps robot (s)
+        self._last_millis = None
+
+    def feed(self, data, timestamp):
+        """Ajouter des octets reçus à `timestamp` et renvoyer les éléments complets"""
+        buf = self.buffer
+        buf += data
+        items = []
+        pos = 0
+        end = len(buf)
+
+        while pos < end:
+            if buf.startswith(SYNC, pos):
+                if pos + FRAME_SIZE > end:
+                    break  # Trame incomplète : attendre la suite
+
+                pos = self._decode_frames(buf, pos, end, timestamp, items)
+                continue
+
+            newline = buf.find(b"\n", pos)
+            # Synchro cherchée dans la ligne courante seulement (linéaire en gros blocs)
+            sync = buf.find(SYNC, pos, end if newline == -1 else newline)
+            if sync != -1:
+                pos = sync  # Débris avant une trame
+                continue
+            if newline == -1:
+                break  # Ligne incomplète
+
+            line = bytes(buf[pos:newline]).decode('utf-8', errors='ignore').strip()
+            pos = newline + 1
+            try:
+                item = parse_line(line, timestamp, self.robot)
+            except ValueError:
+                self.parse_errors += 1
+                self.last_error_line = line
+                continue
+            if item is not None:
+                items.append(item)
+
+        del buf[:pos]
+        if len(buf) > MAX_PENDING_BYTES:
+            buf.clear()
+        return items
+
+    def _decode_frames(self, buf, pos, end, timestamp, items):
+        """Décoder d'un coup la suite de trames contiguës qui commence à `pos`
+
+        CRC de toutes les trames en une passe vectorisée ; les trames valides sont
+        émises jusqu'à la première erreur, où l'on se resynchronise sur l'octet
+        suivant. Renvoie la position après la suite (ou l'erreur).
+        """
+        count = (end - pos) // FRAME_SIZE
+        # Copie : le bytearray ne peut pas être raccourci tant qu'une vue l'exporte
+        data = bytes(buf[pos:pos + count * FRAME_SIZE])
+        frames = np.frombuffer(data, dtype=FRAME_DTYPE)
+        raw = np.frombuffer(data, dtype=np.uint8).reshape(count, FRAME_SIZE)
+        broken = np.flatnonzero((raw[:, 0] != SYNC[0]) | (raw[:, 1] != SYNC[1]))
+        run = int(broken[0]) if len(broken) else count  # Trame 0 : synchro déjà vérifiée
+
+        crc = np.zeros(run, dtype=np.uint8)
+        for column in range(2, FRAME_SIZE - 1):
+            crc = _CRC8_LOOKUP[crc ^ raw[:run, column]]
+        bad = np.flatnonzero(crc != raw[:run, FRAME_SIZE - 1])
+        good = int(bad[0]) if len(bad) else run
+
+        if good:
+            frames = frames[:good]
+            items.extend(map(Sample, frames["angle"].tolist(), (frames["distance"] / 10.0).tolist(),
+                             self._robot_times(frames["millis"], timestamp).tolist(),
+                             repeat(self.robot)))
+        if len(bad):
+            self.crc_errors += 1
+            return pos + good * FRAME_SIZE + 1  # Resynchronisation sur l'octet suivant
+        return pos + run * FRAME_SIZE
+
+    def _robot_times(self, millis, timestamp):
+        """_robot_time() sur un tableau de temps robot (ms), dans l'ordre"""
+        if len(millis) == 1 or (np.diff(millis.astype(np.int64)) < 0).any():
+            # Une seule trame, ou robot redémarré au milieu : trame par trame
+            return np.array([self._robot_time(int(value), timestamp) for value in millis])
+        seconds = millis / 1000.0
+        if self._last_millis is not None and int(millis[0]) < self._last_millis:
+            self._clock_offset = None  # Robot redémarré
+        self._last_millis = int(millis[-1])
+        # Latence minimale observée jusqu'à chaque trame (minimum courant)
+        offsets = np.minimum.accumulate(timestamp - seconds)
+        if self._clock_offset is not None:
+            offsets = np.minimum(offsets, self._clock_offset)
+        self._clock_offset = float(offsets[-1])
+        return offsets + seconds
+
+    def _robot_time(self, millis, timestamp):
+        """Convertir l'horloge du robot en temps hôte (latence minimale observée)"""
+        if self._last_millis is not None and millis < self._last_millis:
+            self._clock_offset = None  # Robot redémarré
+        self._last_millis = millis
+
+        delta = timestamp - millis / 1000.0
+        if self._clock_offset is None or delta < self._clock_offset:
+            self._clock_offset = delta
+        return self._clock_offset + millis / 1000.0
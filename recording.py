@@ -0,0 +1,169 @@
+"""Enregistrement et rejeu des flux série bruts
+
+Format du journal (append-only, compressé en gzip si le nom finit par .gz) :
+l'en-tête MAGIC puis, pour chaque bloc lu sur le port, un enregistrement
+
+    temps f64 (time.monotonic, s) | longueur u32 | octets bruts
+
+Les octets sont ceux reçus du port (lignes texte et trames binaires mêlées),
+le rejeu repasse donc exactement par le même décodeur.
+
+Utilisation en ligne de commande (débit du décodage, rejeu au plus vite) :
+    python recording.py session.rlog.gz
+"""
+import gzip
+import struct
+import sys
+import threading
+import time
+
+from protocol import Sample, StreamDecoder
+
+
+MAGIC = b"RADARLOG1\n"
+RECORD = struct.Struct("<dI")
+
+
+def open_log(path, mode):
+    """Ouvrir un journal, compressé si le nom finit par .gz"""
+    if str(path).endswith(".gz"):
+        return gzip.open(path, mode, compresslevel=3)
+    return open(path, mode)
+
+
+def read_records(path):
+    """Parcourir les (temps, octets) d'un journal"""
+    with open_log(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: pas un journal radar")
+        while True:
+            try:
+                header = f.read(RECORD.size)
+                if len(header) < RECORD.size:
+                    return  # Fin (ou dernier enregistrement tronqué)
+                timestamp, length = RECORD.unpack(header)
+                data = f.read(length)
+            except EOFError:
+                return  # gzip non refermé (fenêtre fermée pendant l'enregistrement)
+            if len(data) < length:
+                return
+            yield timestamp, data
+
+
+class Recorder:
+    """Écrit les blocs reçus dans un journal (appelé depuis le thread de lecture)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.bytes_written = 0
+        self._lock = threading.Lock()
+        self._file = open_log(path, 'wb')
+        self._file.write(MAGIC)
+
+    def write(self, timestamp, data):
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.write(RECORD.pack(timestamp, len(data)))
+            self._file.write(data)
+            self.bytes_written += len(data)
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class ReplaySource:
+    """Rejoue un journal avec l'interface d'un port série utilisée par read_serial
+
+    speed = 1 : temps réel, N : N fois plus vite, None : au plus vite.
+    read() renvoie un bloc enregistré entier, quelle que soit la taille demandée.
+    close() peut venir d'un autre thread pendant un read() : le journal est alors
+    refermé par le thread de lecture, à la fin de ce read().
+    """
+
+    def __init__(self, path, speed=1.0):
+        self.path = path
+        self.speed = speed
+        self.finished = False
+        self.in_waiting = 0
+        self._records = read_records(path)
+        self._next = next(self._records, None)
+        self._start_ts = self._next[0] if self._next else 0.0
+        self._last_ts = self._start_ts
+        self._start_wall = None
+        self._closing = False
+        self._lock = threading.Lock()  # Tenu pendant read() : le générateur n'est pas réentrant
+
+    def clock(self):
+        """Temps du flux rejoué (même échelle que les temps enregistrés)"""
+        if self.speed is None or self._start_wall is None or self.finished:
+            return self._last_ts
+        return self._start_ts + (time.monotonic() - self._start_wall) * self.speed
+
+    def read(self, size=1):
+        with self._lock:
+            data = self._read()
+            if self._closing:
+                self._release()
+            return data
+
+    def _read(self):
+        if self._next is None:
+            self.finished = True
+            time.sleep(0.1)
+            return b""
+        if self._start_wall is None:
+            self._start_wall = time.monotonic()
+
+        timestamp, data = self._next
+        if self.speed is not None:
+            delay = self._start_wall + (timestamp - self._start_ts) / self.speed - time.monotonic()
+            if delay > 0:
+                time.sleep(min(delay, 0.5))
+                if delay > 0.5:
+                    return b""  # Rend la main au lecteur (arrêt possible)
+
+        self._last_ts = timestamp
+        self._next = next(self._records, None)
+        return data
+
+    def write(self, data):
+        pass  # Les commandes vers le robot sont ignorées au rejeu
+
+    def reset_input_buffer(self):
+        pass
+
+    def close(self):
+        """Refermer le journal, tout de suite si aucun read() n'est en cours"""
+        self._closing = True
+        if self._lock.acquire(blocking=False):
+            try:
+                self._release()
+            finally:
+                self._lock.release()
+
+    def _release(self):
+        self._records.close()
+        self._next = None
+        self.finished = True
+
+
+if __name__ == "__main__":
+    path = sys.argv[1]
+    decoder = StreamDecoder()
+    samples = messages = size = 0
+    start = time.perf_counter()
+    for timestamp, data in read_records(path):
+        size += len(data)
+        for item in decoder.feed(data, timestamp):
+            if isinstance(item, Sample):
+                samples += 1
+            else:
+                messages += 1
+    elapsed = time.perf_counter() - start
+    print(f"{size} octets, {samples} mesures, {messages} messages, "
+          f"{decoder.parse_errors} erreurs, {decoder.crc_errors} CRC")
+    print(f"Décodage: {elapsed:.3f} s ({samples / max(elapsed, 1e-9):.0f} mesures/s)")
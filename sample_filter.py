@@ -0,0 +1,132 @@
+"""Filtrage des mesures sonar entre le décodage et la carte
+
+Chaîne par robot, en flux et à mémoire bornée (la fenêtre de la médiane et
+la case en cours, quelle que soit la durée de la session) :
+
+1. médiane glissante sur les FILTER_WINDOW dernières mesures du balayage :
+   un écho parasite isolé, ou une absence d'écho isolée (le firmware envoie
+   DIST_MAX pour 0), prend la valeur de ses voisines. Le balayage étant
+   monotone, ces mesures consécutives sont les voisines en angle : c'est une
+   médiane sur les cases angulaires adjacentes, pas un historique par case.
+   Un historique par case demanderait plusieurs lectures de la même case depuis
+   la même position, ce qui n'arrive pas au rythme du firmware (≈ 4° entre deux
+   mesures, un seul balayage par arrêt) : la médiane n'y verrait qu'une mesure ;
+2. rejet des échos au-delà de la portée fiable du capteur : la mesure
+   devient une absence d'écho (faisceau libre pour la grille, pas de point) ;
+3. fusion des mesures d'une même case angulaire (BIN_WIDTH) en un seul
+   point de carte, prêt quand le balayage passe à la case suivante.
+
+Les mesures des étages 1 et 2 alimentent toujours la grille, le radar et le
+recalage (chaque mesure y est une observation) ; seuls les points de carte
+sont fusionnés. La médiane retarde d'une mesure (≈ 30 ms au rythme du firmware).
+Le moteur vide le filtre (flush) à chaque message du robot (début et fin de
+scan, mouvement…) : une case ne mélange jamais deux positions du robot.
+"""
+from collections import deque
+
+from protocol import Sample
+
+
+FILTER_WINDOW = 3  # Mesures consécutives de la médiane (impair)
+BIN_WIDTH = 2.0  # ° par case de fusion (0 : pas de fusion)
+RELIABLE_RANGE = 350.0  # cm, échos plus lointains traités comme absence d'écho
+
+
+class SampleFilter:
+    """Filtre en flux des mesures d'un robot : feed() puis flush() en fin de balayage
+
+    feed() et flush() renvoient les mesures filtrées ; les points fusionnés
+    s'accumulent dans `points`, à reprendre avec take_points().
+    """
+
+    def __init__(self, no_echo=400.0, reliable_range=RELIABLE_RANGE, window=FILTER_WINDOW,
+                 bin_width=BIN_WIDTH):
+        self.no_echo = no_echo  # Distance d'une absence d'écho (DIST_MAX du firmware)
+        self.reliable_range = min(reliable_range, no_echo)
+        self.window = window
+        self.bin_width = bin_width
+        self._middle = window // 2
+        self._recent = deque(maxlen=window)
+        self._pending = 0  # Mesures de fin de fenêtre pas encore émises
+        self._bin = None  # Case en cours de fusion
+        self._bin_angle = 0.0  # Somme des angles des échos de la case
+        self._echo_count = 0
+        self._echo_sum = 0.0
+        self._bin_sample = None  # Dernier écho de la case (instant, robot)
+        self.points = []  # Points fusionnés prêts
+        self.received = 0
+        self.emitted = 0  # Points fusionnés
+        self.rejected = 0  # Échos au-delà de la portée fiable
+
+    def feed(self, sample):
+        """Filtrer une mesure ; renvoie les mesures filtrées prêtes (0 ou 1)"""
+        self.received += 1
+        out = []
+        recent = self._recent
+        recent.append(sample)
+        self._pending += 1
+        if len(recent) == self.window:
+            # La mesure du milieu a ses voisines des deux côtés
+            middle = recent[self._middle]
+            distance = sorted([item.distance for item in recent])[self._middle]
+            self._fuse(middle, distance, out)
+            self._pending = self.window - self._middle - 1
+        elif len(recent) <= self._middle:
+            # Début de balayage : pas de voisine avant, mesure transmise telle quelle
+            self._fuse(sample, sample.distance, out)
+            self._pending = 0
+        return out
+
+    def flush(self):
+        """Fin de balayage : émettre les mesures et la case en attente, repartir à vide"""
+        out = []
+        recent = self._recent
+        for sample in list(recent)[len(recent) - self._pending:]:
+            self._fuse(sample, sample.distance, out)
+        recent.clear()
+        self._pending = 0
+        self._emit_bin()
+        self._bin = None
+        return out
+
+    def take_points(self):
+        """Points fusionnés depuis le dernier appel"""
+        points, self.points = self.points, []
+        return points
+
+    def _fuse(self, sample, distance, out):
+        """Étages 2 et 3 : portée, puis regroupement par case angulaire"""
+        if distance <= 0 or distance >= self.reliable_range:
+            if 0 < distance < self.no_echo:
+                self.rejected += 1
+            distance = self.no_echo
+        if distance != sample.distance:
+            sample = sample._replace(distance=distance)
+        out.append(sample)
+
+        if self.bin_width <= 0:
+            if distance < self.no_echo:
+                self.emitted += 1
+                self.points.append(sample)
+            return
+
+        index = int(sample.angle // self.bin_width)
+        if index != self._bin:
+            self._emit_bin()
+            self._bin = index
+        if distance < self.no_echo:
+            self._echo_count += 1
+            self._echo_sum += distance
+            self._bin_angle += sample.angle
+            self._bin_sample = sample
+
+    def _emit_bin(self):
+        if self._echo_count:
+            # Moyenne des échos de la case (les médianes ont déjà écarté les pics)
+            last = self._bin_sample
+            self.points.append(Sample(round(self._bin_angle / self._echo_count),
+                                      self._echo_sum / self._echo_count,
+                                      last.timestamp, last.robot))
+            self.emitted += 1
+        self._echo_count = 0
+        self._bin_angle = self._echo_sum = 0.0
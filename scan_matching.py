@@ -0,0 +1,179 @@
+"""Recalage scan → carte par ICP point à point (cœur vectorisé NumPy)
+
+Les points sont en coordonnées monde (cm, x à droite, y vers le haut). Une
+correction est une transformation rigide : rotation `angle` (radians, sens
+trigonométrique) autour de l'origine, puis translation (tx, ty).
+"""
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+MAX_CORRESPONDENCE = 30.0  # Distance max d'appariement (cm)
+TRIM_RATIO = 0.8  # On garde les 80 % meilleurs appariements
+MAX_ITERATIONS = 50
+MIN_MATCHES = 10
+REFERENCE_CELL = 3.0  # Sous-échantillonnage de la carte de référence (cm)
+
+MatchResult = namedtuple("MatchResult", "scan angle tx ty rms matches converged")
+# Alignement interrompu par une exception (entrée dégénérée, erreur NumPy…)
+MatchFailure = namedtuple("MatchFailure", "scan error")
+
+
+class GridIndex:
+    """Index en grille uniforme pour la recherche du plus proche voisin"""
+
+    def __init__(self, points, cell_size=MAX_CORRESPONDENCE):
+        self.cell_size = float(cell_size)
+        keys = self._keys(np.floor(points / self.cell_size).astype(np.int64))
+        order = np.argsort(keys, kind='stable')
+        self.points = points[order]
+        self.keys = keys[order]
+
+    @staticmethod
+    def _keys(cells):
+        return cells[:, 0] * (1 << 32) + (cells[:, 1] + (1 << 31))
+
+    def nearest(self, queries, max_distance):
+        """Plus proche point de chaque requête à moins de max_distance
+
+        Renvoie (indices, distances) ; indice -1 si aucun voisin. max_distance
+        doit être <= cell_size (on ne cherche que dans les 3 × 3 cellules voisines).
+        """
+        count = len(queries)
+        best = np.full(count, -1, dtype=np.int64)
+        best_d2 = np.full(count, np.inf)
+        if count == 0 or len(self.points) == 0:
+            return best, np.sqrt(best_d2)
+
+        cells = np.floor(queries / self.cell_size).astype(np.int64)
+        offsets = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)])
+        neighbour_keys = self._keys((cells[None, :, :] + offsets[:, None, :]).reshape(-1, 2))
+        lo = np.searchsorted(self.keys, neighbour_keys, side='left')
+        hi = np.searchsorted(self.keys, neighbour_keys, side='right')
+        sizes = hi - lo
+        total = int(sizes.sum())
+        if total == 0:
+            return best, np.sqrt(best_d2)
+
+        # Toutes les paires (requête, candidat) à plat
+        query = np.repeat(np.tile(np.arange(count), len(offsets)), sizes)
+        candidate = np.repeat(lo, sizes) + (np.arange(total) - np.repeat(np.cumsum(sizes) - sizes, sizes))
+        d2 = ((self.points[candidate] - queries[query]) ** 2).sum(axis=1)
+
+        # Meilleur candidat par requête (sans tri : minimum puis égalité)
+        np.minimum.at(best_d2, query, d2)
+        winner = (d2 == best_d2[query]) & (d2 <= max_distance ** 2)
+        best[query[winner]] = candidate[winner]
+        best_d2[best < 0] = np.inf
+        return best, np.sqrt(best_d2)
+
+
+def downsample(points, cell_size):
+    """Garder un point par cellule de cell_size (allège l'index de référence)"""
+    if len(points) == 0:
+        return points
+    cells = np.floor(points / cell_size).astype(np.int64)
+    _, first = np.unique(GridIndex._keys(cells), return_index=True)
+    return points[first]
+
+
+def rigid_transform(source, target):
+    """Rotation + translation minimisant l'écart source → target (moindres carrés)"""
+    mean_s = source.mean(axis=0)
+    mean_t = target.mean(axis=0)
+    s = source - mean_s
+    t = target - mean_t
+    angle = np.arctan2((s[:, 0] * t[:, 1] - s[:, 1] * t[:, 0]).sum(),
+                       (s[:, 0] * t[:, 0] + s[:, 1] * t[:, 1]).sum())
+    c, si = np.cos(angle), np.sin(angle)
+    tx = mean_t[0] - (c * mean_s[0] - si * mean_s[1])
+    ty = mean_t[1] - (si * mean_s[0] + c * mean_s[1])
+    return angle, tx, ty
+
+
+def apply_transform(points, angle, tx, ty):
+    """Appliquer une transformation rigide à un tableau (N, 2)"""
+    c, s = np.cos(angle), np.sin(angle)
+    out = np.empty_like(points)
+    out[:, 0] = c * points[:, 0] - s * points[:, 1] + tx
+    out[:, 1] = s * points[:, 0] + c * points[:, 1] + ty
+    return out
+
+
+def icp(source, reference, scan=0, max_distance=MAX_CORRESPONDENCE,
+        iterations=MAX_ITERATIONS, tolerance=1e-4):
+    """Aligner `source` (N, 2) sur `reference` (M, 2) ; renvoie un MatchResult"""
+    if not isinstance(reference, GridIndex):
+        reference = GridIndex(downsample(reference, REFERENCE_CELL), max_distance)
+    index = reference
+    angle, tx, ty = 0.0, 0.0, 0.0
+    rms, matches, converged = np.inf, 0, False
+
+    for _ in range(iterations):
+        moved = apply_transform(source, angle, tx, ty)
+        nearest, distance = index.nearest(moved, max_distance)
+        found = nearest >= 0
+        matches = int(found.sum())
+        if matches < MIN_MATCHES:
+            break
+
+        # Rejet des pires appariements
+        keep = np.flatnonzero(found)
+        if TRIM_RATIO < 1.0:
+            limit = np.quantile(distance[keep], TRIM_RATIO)
+            keep = keep[distance[keep] <= limit]
+        rms = float(np.sqrt((distance[keep] ** 2).mean()))
+
+        step_angle, step_tx, step_ty = rigid_transform(moved[keep], index.points[nearest[keep]])
+        # Composition : nouvelle = pas ∘ courante
+        c, s = np.cos(step_angle), np.sin(step_angle)
+        angle += step_angle
+        tx, ty = c * tx - s * ty + step_tx, s * tx + c * ty + step_ty
+
+        if abs(step_angle) < tolerance and np.hypot(step_tx, step_ty) < tolerance * 100:
+            converged = True
+            break
+
+    return MatchResult(scan, float(angle), float(tx), float(ty), rms, matches, converged)
+
+
+class ScanMatcher:
+    """Exécute l'ICP dans un thread de travail, hors du thread Tk"""
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="icp")
+        self._pending = []  # (scan, future)
+        self.failures = []  # MatchFailure pas encore reprises (take_failures)
+
+    def submit(self, scan, source, reference):
+        """Lancer l'alignement d'un scan terminé (tableaux copiés par l'appelant)"""
+        self._pending.append((scan, self._executor.submit(icp, source, reference, scan)))
+
+    def results(self):
+        """Résultats terminés depuis le dernier appel (à appeler depuis le thread Tk)
+
+        Les alignements en erreur vont dans `failures`, à reprendre avec take_failures().
+        """
+        # Une seule passe : un calcul qui se termine pendant le tri reste en attente
+        done, pending = [], []
+        for entry in self._pending:
+            (done if entry[1].done() else pending).append(entry)
+        self._pending = pending
+        results = []
+        for scan, future in done:
+            error = future.exception()
+            if error is None:
+                results.append(future.result())
+            else:
+                self.failures.append(MatchFailure(scan, error))
+        return results
+
+    def take_failures(self):
+        """Alignements en erreur depuis le dernier appel"""
+        failures, self.failures = self.failures, []
+        return failures
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
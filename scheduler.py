@@ -0,0 +1,84 @@
+"""Cadence d'affichage : frames sautées sans nouveauté, rendu allégé sous charge
+
+Le planificateur ne connaît pas Tk : l'interface lui dit si la frame a du
+travail (nouvelles données, fondu en cours) et combien de temps elle a pris ;
+il répond quand relancer la suivante et quel niveau de détail utiliser.
+"""
+
+
+TARGET_FPS = 60
+IDLE_INTERVAL = 50  # ms entre deux vérifications de la file quand rien ne bouge
+SMOOTHING = 0.1  # Moyenne glissante du temps de frame
+
+# Niveaux de dégradation : longueur de traînée et image de carte refaite 1 frame sur N
+TRAIL_LENGTHS = (32, 16, 8)
+MAP_REFRESH_EVERY = (1, 2, 4)
+DEGRADE_RATIO = 1.25  # Frame moyenne > 125 % du budget → niveau suivant
+RECOVER_RATIO = 0.6  # < 60 % du budget → niveau précédent
+HYSTERESIS_FRAMES = 30  # Frames consécutives avant de changer de niveau
+
+
+class FrameScheduler:
+    """Décide quand dessiner et à quel niveau de détail"""
+
+    def __init__(self, target_fps=TARGET_FPS, idle_interval=IDLE_INTERVAL):
+        self.budget = 1.0 / target_fps  # s
+        self.idle_interval = idle_interval
+        self.level = 0
+        self.frame_time = 0.0  # Moyenne glissante (s) des frames dessinées
+        self.frames = 0  # Frames dessinées
+        self.skipped = 0  # Frames sautées faute de nouveauté
+        self._dirty = True
+        self._slow = 0
+        self._fast = 0
+
+    @property
+    def trail_length(self):
+        return TRAIL_LENGTHS[self.level]
+
+    def mark_dirty(self):
+        """Forcer le dessin de la prochaine frame (redimensionnement, reset, recalage…)"""
+        self._dirty = True
+
+    def should_draw(self, active):
+        """True si la frame doit être dessinée (active = nouvelles données ou animation)"""
+        if active or self._dirty:
+            self._dirty = False
+            return True
+        self.skipped += 1
+        return False
+
+    def refresh_map(self):
+        """True si l'image de la carte peut être refaite à cette frame"""
+        return self.frames % MAP_REFRESH_EVERY[self.level] == 0
+
+    def frame_done(self, elapsed):
+        """Enregistrer la durée (s) d'une frame dessinée ; renvoie le nouveau niveau s'il change"""
+        self.frames += 1
+        self.frame_time += SMOOTHING * (elapsed - self.frame_time)
+
+        if self.frame_time > self.budget * DEGRADE_RATIO:
+            self._slow += 1
+            self._fast = 0
+        elif self.frame_time < self.budget * RECOVER_RATIO:
+            self._fast += 1
+            self._slow = 0
+        else:
+            self._slow = self._fast = 0
+
+        level = self.level
+        if self._slow >= HYSTERESIS_FRAMES and level < len(TRAIL_LENGTHS) - 1:
+            level += 1
+        elif self._fast >= HYSTERESIS_FRAMES and level > 0:
+            level -= 1
+        if level == self.level:
+            return None
+        self.level = level
+        self._slow = self._fast = 0
+        return level
+
+    def next_delay(self, elapsed, drew):
+        """Délai (ms) avant la prochaine frame"""
+        if not drew:
+            return self.idle_interval
+        return max(1, int((self.budget - elapsed) * 1000))
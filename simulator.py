@@ -0,0 +1,502 @@
+"""Robot simulé parlant le protocole de code_radar.ino, sans matériel
+
+Le robot reproduit la machine à états du firmware (avance, scan 360°, analyse
+des 8 secteurs, évitement) dans un monde 2D de segments (murs, obstacles) et
+envoie exactement les mêmes lignes (A:, EVENT:, STATUS:, MSG:, SECTEUR:), ou
+les trames binaires après CMD:BINARY.
+
+Exemples :
+    python simulator.py --tcp 7777 --rate 2000
+        → dans l'interface, port "socket://localhost:7777"
+    python simulator.py --pty --rate 500 --noise 2 --dropout 0.05
+        → dans l'interface, le port /dev/pts/N affiché
+    python simulator.py --serial /dev/ttyUSB1 --baud 115200
+        → adaptateur USB-série relié (null-modem) au port ouvert par l'interface
+"""
+import argparse
+import math
+import os
+import select
+import socket
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from protocol import encode_frame
+
+
+# Constantes du firmware (code_radar.ino)
+SCAN_DURATION = 2.6  # DUREE_SCAN_360 (s)
+TURN_TIME_90 = 0.55  # DUREE_TURN_90 (s)
+AUTO_SCAN_DELAY = 10.0  # DELAI_SCAN_AUTO (s)
+HOST_HEADING_DELAY = 1.0  # DELAI_CAP_HOTE (s), attente max du cap de l'interface
+OBSTACLE_THRESHOLD = 45.0  # SEUIL_OBSTACLE (cm)
+DIST_MAX = 400.0
+NB_SECTEURS = 8
+SAMPLE_RATE = 33.0  # Mesures/s pendant un scan (delay(30) + lecture capteur)
+FORWARD_SPEED = 25.0  # cm/s, comme pose.FORWARD_SPEED
+SCAN_DIRECTION = 1  # Même convention que pose.SCAN_DIRECTION
+
+TICK = 0.01  # Pas de simulation (s, temps réel)
+
+MOVING, SCANNING, AVOIDING = "MOVING", "SCANNING", "AVOIDING"
+
+
+class World:
+    """Monde 2D fait de segments (cm), repère de pose.py"""
+
+    def __init__(self, segments):
+        self.segments = np.asarray(segments, dtype=np.float64).reshape(-1, 4)
+
+    @classmethod
+    def box(cls, x0, y0, x1, y1):
+        return [(x0, y0, x1, y0), (x1, y0, x1, y1), (x1, y1, x0, y1), (x0, y1, x0, y0)]
+
+    @classmethod
+    def default(cls):
+        """Pièce de 6 m × 4 m avec quelques obstacles"""
+        segments = cls.box(-300, -150, 300, 250)
+        segments += cls.box(-200, 100, -140, 160)
+        segments += cls.box(80, -60, 140, 0)
+        segments += [(150, 250, 150, 150), (-300, 20, -220, 20)]
+        return cls(segments)
+
+    def raycast(self, x, y, bearing):
+        """Distance au premier segment touché pour chaque cap (°) ; inf si aucun"""
+        rad = np.radians(np.asarray(bearing, dtype=np.float64))[:, None]
+        dx, dy = np.sin(rad), np.cos(rad)
+        ax, ay, bx, by = self.segments.T
+        ex, ey = bx - ax, by - ay
+        wx, wy = ax - x, ay - y
+        with np.errstate(divide='ignore', invalid='ignore'):
+            denom = dx * ey - dy * ex
+            t = (wx * ey - wy * ex) / denom
+            u = (wx * dy - wy * dx) / denom
+            hit = (np.abs(denom) > 1e-12) & (t >= 0) & (u >= 0) & (u <= 1)
+        return np.where(hit, t, np.inf).min(axis=1)
+
+
+class TcpEndpoint:
+    """Serveur TCP pour pyserial : socket://localhost:<port>"""
+
+    def __init__(self, port, host="localhost"):
+        self.server = socket.create_server((host, port))
+        self.server.setblocking(False)
+        self.client = None
+        self.name = f"socket://{host}:{port}"
+
+    def connected(self):
+        if self.client is None:
+            try:
+                self.client, _ = self.server.accept()
+                self.client.setblocking(False)
+            except BlockingIOError:
+                return False
+        return True
+
+    def write(self, data):
+        """Envoyer tout `data` ; attendre que le client lise si son tampon est plein
+
+        Un client lent freine le simulateur (comme un port série saturé) au lieu
+        d'être déconnecté : seule une vraie erreur (ECONNRESET, EPIPE…) le fait partir.
+        """
+        if self.client is None:
+            return  # Client parti entre la lecture des commandes et l'envoi
+        view = memoryview(data)
+        try:
+            while view:
+                try:
+                    view = view[self.client.send(view):]
+                except BlockingIOError:
+                    select.select([], [self.client], [])
+        except OSError:
+            self._drop()
+
+    def read_available(self):
+        try:
+            data = self.client.recv(4096)
+        except BlockingIOError:
+            return b""
+        except OSError:
+            data = b""
+        if not data:
+            self._drop()
+        return data
+
+    def _drop(self):
+        if self.client is not None:
+            self.client.close()
+            self.client = None
+
+    def close(self):
+        self._drop()
+        self.server.close()
+
+
+class PtyEndpoint:
+    """Pseudo-terminal (Linux / macOS) : l'interface ouvre le côté esclave"""
+
+    def __init__(self):
+        import tty
+        self.master, slave = os.openpty()
+        tty.setraw(slave)
+        self.name = os.ttyname(slave)
+        self._slave = slave  # Gardé ouvert : le pty reste valide sans client
+        os.set_blocking(self.master, False)
+
+    def connected(self):
+        return True
+
+    def write(self, data):
+        """Envoyer tout `data`, en attendant que le côté esclave soit lu si le tampon est plein
+
+        Une écriture partielle ne coupe ni ligne ni trame ; sans lecteur, le
+        simulateur attend (comme TcpEndpoint avec un client lent).
+        """
+        view = memoryview(data)
+        try:
+            while view:
+                try:
+                    view = view[os.write(self.master, view):]
+                except BlockingIOError:
+                    select.select([], [self.master], [])
+        except OSError:
+            pass  # Pty refermé (fin du simulateur)
+
+    def read_available(self):
+        if not select.select([self.master], [], [], 0)[0]:
+            return b""
+        try:
+            return os.read(self.master, 4096)
+        except (BlockingIOError, OSError):
+            return b""
+
+    def close(self):
+        os.close(self.master)
+        os.close(self._slave)
+
+
+class SerialEndpoint:
+    """N'importe quel port pyserial déjà ouvert (adaptateur USB-série, null-modem…)"""
+
+    def __init__(self, port):
+        self.port = port
+        self.name = port.name
+
+    def connected(self):
+        return True
+
+    def write(self, data):
+        self.port.write(data)
+
+    def read_available(self):
+        if self.port.in_waiting:
+            return self.port.read(self.port.in_waiting)
+        return b""
+
+    def close(self):
+        self.port.close()
+
+
+class BufferEndpoint:
+    """Sortie en mémoire, pour générer un flux sans temps réel (tests de charge)"""
+
+    name = "mémoire"
+
+    def __init__(self):
+        self.output = bytearray()
+        self.commands = bytearray()  # Octets à faire lire au robot
+
+    def connected(self):
+        return True
+
+    def write(self, data):
+        self.output += data
+
+    def read_available(self):
+        data = bytes(self.commands)
+        self.commands.clear()
+        return data
+
+    def take(self):
+        """Récupérer (et vider) les octets produits"""
+        data = bytes(self.output)
+        self.output.clear()
+        return data
+
+    def close(self):
+        pass
+
+
+class SimulatedRobot:
+    """Machine à états de code_radar.ino dans un monde simulé"""
+
+    def __init__(self, endpoint, world=None, sample_rate=SAMPLE_RATE, noise=1.0, dropout=0.0,
+                 speed=FORWARD_SPEED, time_scale=1.0, seed=None):
+        self.endpoint = endpoint
+        self.world = world or World.default()
+        self.sample_rate = sample_rate
+        self.noise = noise
+        self.dropout = dropout
+        self.speed = speed
+        self.time_scale = time_scale
+        self.rng = np.random.default_rng(seed)
+
+        self.x = self.y = self.heading = 0.0
+        self.time = 0.0  # Temps simulé (s), équivalent de millis() / 1000
+        self.binary = False
+        self.host_planner = False  # planHote : CMD:HEADING reçu, attendre le cap en fin de scan
+        self.host_heading = None  # capHote
+        self.lines_sent = 0
+        self.samples_sent = 0
+        self._out = bytearray()
+        self._commands = bytearray()
+        self._phases = deque()
+        self._enter_moving()
+
+    # --- Sortie série ---
+
+    def _println(self, text):
+        self._out += text.encode() + b"\r\n"
+        self.lines_sent += 1
+
+    def flush(self):
+        """Envoyer tout ce qui a été produit depuis le dernier appel"""
+        if self._out:
+            self.endpoint.write(bytes(self._out))
+            self._out.clear()
+
+    def _read_commands(self):
+        self._commands += self.endpoint.read_available()
+        while b"\n" in self._commands:
+            line, _, rest = bytes(self._commands).partition(b"\n")
+            self._commands = bytearray(rest)
+            command = line.strip().decode(errors='ignore')
+            if command == "CMD:BINARY":
+                self.binary = True
+                self._println("STATUS:BINARY")
+            elif command == "CMD:TEXT":
+                self.binary = False
+                self._println("STATUS:TEXT")
+            elif command.startswith("CMD:HEADING:"):
+                try:
+                    self.host_heading = int(command[12:]) % 360
+                except ValueError:
+                    self.host_heading = 0  # atoi()
+                self.host_planner = True
+            elif command == "CMD:AUTO":
+                self.host_planner = False
+                self.host_heading = None
+                self._println("STATUS:AUTO")
+
+    # --- États ---
+
+    def _enter_moving(self):
+        self.state = MOVING
+        self.auto_scan_at = self.time + AUTO_SCAN_DELAY
+        self._println("STATUS:MOVING")
+
+    def _enter_scanning(self, event):
+        self._println(f"EVENT:{event}")
+        self.state = SCANNING
+        self._println("STATUS:SCAN_START")
+        self.scan_start = self.time
+        self.scan_heading = self.heading
+        self.host_heading = None
+        self.scan_samples = 0
+        self.sector_max = [0.0] * NB_SECTEURS
+        self.sector_count = [0] * NB_SECTEURS
+
+    def _move(self, distance):
+        rad = math.radians(self.heading)
+        self.x += distance * math.sin(rad)
+        self.y += distance * math.cos(rad)
+
+    def step(self, dt):
+        """Avancer la simulation de dt secondes (temps simulé)"""
+        end = self.time + dt
+        while self.time < end:
+            if self.state == MOVING:
+                self._step_moving(end)
+            elif self.state == SCANNING:
+                self._step_scanning(end)
+            else:
+                self._step_avoiding(end)
+
+    def _step_moving(self, end):
+        front = float(self.world.raycast(self.x, self.y, [self.heading])[0])
+        stop_at = self.time + max(0.0, front - OBSTACLE_THRESHOLD) / self.speed
+        until = min(end, self.auto_scan_at, stop_at)
+        self._move(self.speed * (until - self.time))
+        self.time = until
+        if until >= stop_at:
+            self._enter_scanning("OBSTACLE_DETECTED")
+        elif until >= self.auto_scan_at:
+            self._enter_scanning("AUTO_SCAN")
+
+    def _step_scanning(self, end):
+        scan_end = self.scan_start + SCAN_DURATION
+        until = min(end, scan_end)
+
+        # Mesures dues dans l'intervalle (au rythme sample_rate)
+        due = min(int((until - self.scan_start) * self.sample_rate) + 1,
+                  int(math.ceil(SCAN_DURATION * self.sample_rate)))
+        if due > self.scan_samples:
+            times = (np.arange(self.scan_samples, due) / self.sample_rate)
+            self.scan_samples = due
+            self._emit_samples(times)
+
+        self.heading = (self.scan_heading
+                        + SCAN_DIRECTION * 360.0 * (until - self.scan_start) / SCAN_DURATION) % 360
+        self.time = until
+        if until >= scan_end:
+            self.heading = self.scan_heading
+            self._finish_scan()
+
+    def _emit_samples(self, times):
+        angles = (times / SCAN_DURATION * 360).astype(np.int64)
+        distances = self.world.raycast(self.x, self.y,
+                                       self.scan_heading + SCAN_DIRECTION * angles)
+        distances = distances + self.rng.normal(0.0, self.noise, len(distances))
+        distances[self.rng.random(len(distances)) < self.dropout] = 0.0  # Pas d'écho
+        # Comme le firmware : 0 ou hors portée → DIST_MAX
+        distances[(distances <= 0) | (distances > DIST_MAX) | ~np.isfinite(distances)] = DIST_MAX
+        distances = np.round(distances, 2)
+
+        for t, angle, distance in zip(times, angles.tolist(), distances.tolist()):
+            if self.binary:
+                self._out += encode_frame(angle, distance, (self.scan_start + t) * 1000)
+            else:
+                self._println(f"A:{angle}:D:{distance:.2f}")
+            sector = min(angle // 45, NB_SECTEURS - 1)
+            self.sector_max[sector] = max(self.sector_max[sector], distance)
+            self.sector_count[sector] += 1
+        self.samples_sent += len(times)
+
+    def _finish_scan(self):
+        self._println("EVENT:SCAN_COMPLETE")
+        self._println(f"STATUS:SCAN_END:{sum(self.sector_count)}")
+
+        # findBestDirection()
+        self._println("MSG:ANALYSE_SECTEURS")
+        best, best_distance = 0, 0.0
+        for i in range(NB_SECTEURS):
+            self._println(f"SECTEUR:{i}({i * 45}-{(i + 1) * 45}°):DIST_MAX:"
+                          f"{self.sector_max[i]:.2f}:MESURES:{self.sector_count[i]}")
+            if self.sector_max[i] > best_distance:
+                best, best_distance = i, self.sector_max[i]
+        self._println(f"MSG:MEILLEURE_DIRECTION:{best * 45}-{(best + 1) * 45}° "
+                      f"(DIST:{best_distance:.2f}cm)")
+        self._println(f"MSG:BEST_SECTOR:{best}:DISTANCE:{best_distance:.2f}")
+
+        # performAvoidance() : recul, puis attendreCapHote() jusqu'à HOST_HEADING_DELAY
+        # après la fin du scan, puis virage
+        self.best_sector = best
+        self.state = AVOIDING
+        self._phases = deque([
+            ["backward", 0.4, None],
+            ["pause", 0.2, None],
+            ["wait", HOST_HEADING_DELAY - 0.6 if self.host_planner else 0.0, None],
+        ])
+
+    def _turn_phases(self):
+        """Fin de performAvoidance() : virage vers le cap de l'interface ou le meilleur secteur"""
+        target = self.best_sector * 45 + 22
+        if self.host_heading is not None:
+            target = self.host_heading
+            self._println(f"MSG:HOST_HEADING:{target}")
+        if target > 180:
+            angle, direction, delta = 360 - target, "LEFT", -(360 - target)
+        else:
+            angle, direction, delta = target, "RIGHT", target
+        turn_time = TURN_TIME_90 * angle / 90.0
+        return [
+            ["say", 0.0, f"MSG:TURN_{direction}:{angle}°"],
+            ["turn", turn_time, delta / turn_time if turn_time else 0.0],
+            ["pause", 0.3, None],
+        ]
+
+    def _step_avoiding(self, end):
+        phase = self._phases[0]
+        kind, remaining, arg = phase
+        dt = min(end - self.time, remaining)
+        if kind == "wait" and self.host_heading is not None:
+            dt = remaining = 0.0  # Cap reçu : fin de l'attente
+        if kind == "backward":
+            self._move(-self.speed * dt)
+        elif kind == "turn":
+            self.heading = (self.heading + arg * dt) % 360
+        elif kind == "say":
+            self._println(arg)
+        self.time += dt
+        phase[1] = remaining - dt
+        if phase[1] <= 1e-9:
+            self._phases.popleft()
+            if kind == "wait":
+                self._phases.extend(self._turn_phases())
+            elif not self._phases:
+                self._enter_moving()
+
+    # --- Boucle temps réel ---
+
+    def run(self, stop=None):
+        """Simuler en temps réel (× time_scale) jusqu'à stop.set()"""
+        stop = stop or threading.Event()
+        last = time.monotonic()
+        while not stop.is_set():
+            time.sleep(TICK)
+            now = time.monotonic()
+            if not self.endpoint.connected():
+                last = now  # En attente d'un client : le temps simulé est figé
+                continue
+            self._read_commands()
+            self.step((now - last) * self.time_scale)
+            last = now
+            self.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Robot radar simulé")
+    endpoint = parser.add_mutually_exclusive_group()
+    endpoint.add_argument("--tcp", type=int, default=7777, help="port TCP (socket://)")
+    endpoint.add_argument("--pty", action="store_true", help="pseudo-terminal (Linux/macOS)")
+    endpoint.add_argument("--serial", metavar="URL",
+                          help="port série réel ou URL pyserial (adaptateur USB-série, null-modem)")
+    parser.add_argument("--baud", type=int, default=9600, help="débit du port --serial")
+    parser.add_argument("--rate", type=float, default=SAMPLE_RATE, help="mesures/s pendant un scan")
+    parser.add_argument("--noise", type=float, default=1.0, help="bruit gaussien (cm)")
+    parser.add_argument("--dropout", type=float, default=0.0, help="proportion de mesures sans écho")
+    parser.add_argument("--speed", type=float, default=FORWARD_SPEED, help="vitesse (cm/s)")
+    parser.add_argument("--time-scale", type=float, default=1.0, help="accélération du temps")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    if args.serial:
+        import serial
+        endpoint = SerialEndpoint(serial.serial_for_url(args.serial, baudrate=args.baud, timeout=0))
+    else:
+        endpoint = PtyEndpoint() if args.pty else TcpEndpoint(args.tcp)
+    robot = SimulatedRobot(endpoint, sample_rate=args.rate, noise=args.noise,
+                           dropout=args.dropout, speed=args.speed,
+                           time_scale=args.time_scale, seed=args.seed)
+    print(f"Robot simulé sur {endpoint.name} ({args.rate:g} mesures/s)")
+
+    stop = threading.Event()
+    thread = threading.Thread(target=robot.run, args=(stop,), daemon=True)
+    thread.start()
+    try:
+        while thread.is_alive():
+            time.sleep(5)
+            print(f"t={robot.time:.0f}s  lignes={robot.lines_sent}  mesures={robot.samples_sent}  "
+                  f"pose=({robot.x:.0f}, {robot.y:.0f}, {robot.heading:.0f}°)")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        endpoint.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Index spatial des points de la carte : requêtes par zone et obstacle le plus proche
+
+Grille uniforme sur les cases d'un PointBuffer (map_buffer.py), sans copie des
+points : un tableau de clés de cellule trié plus une « queue » des points
+ajoutés depuis, parcourue directement puis fusionnée dans la partie triée
+quand elle s'allonge. Une case du buffer réécrite depuis la fusion est
+reconnue à son numéro d'ajout, l'entrée triée périmée est alors ignorée.
+Seuls clear() et les recalages (generation) imposent une reconstruction.
+
+Repère monde en cm et caps en degrés comme pose.py (0° = +y, sens horaire).
+"""
+import numpy as np
+
+
+INDEX_CELL_SIZE = 50.0  # cm par cellule de l'index
+MIN_MERGE_TAIL = 4096  # Points en queue avant fusion (au moins)
+PROFILE_SECTORS = 72  # Secteurs de 5° du profil polaire
+
+
+class PointIndex:
+    """Index à grille uniforme d'un PointBuffer, synchronisé à chaque requête"""
+
+    def __init__(self, buffer, cell_size=INDEX_CELL_SIZE):
+        self.buffer = buffer
+        self.cell_size = float(cell_size)
+        self.max_tail = max(MIN_MERGE_TAIL, buffer.capacity // 16)
+        self.rebuilds = 0
+        self._generation = None
+        self._indexed_total = 0  # buffer.total à la dernière reconstruction ou fusion
+        self._keys = np.empty(0, dtype=np.int64)  # Clés de cellule triées
+        self._slots = np.empty(0, dtype=np.int64)  # Case du buffer de chaque clé
+
+    def _cells(self, x, y):
+        cx = np.floor(np.asarray(x) / self.cell_size).astype(np.int64)
+        cy = np.floor(np.asarray(y) / self.cell_size).astype(np.int64)
+        return cx, cy
+
+    @staticmethod
+    def _key(cx, cy):
+        # Colonne (x) d'abord : les cellules d'une colonne sont contiguës dans l'ordre trié
+        return cx * (1 << 32) + (cy + (1 << 31))
+
+    def sync(self):
+        """Reconstruire si le buffer a été vidé ou modifié, fusionner la queue si trop longue"""
+        buffer = self.buffer
+        if buffer.generation != self._generation:
+            self._keys, self._slots = self._sorted(buffer.slots())
+            self._generation = buffer.generation
+            self._indexed_total = buffer.total
+            self.rebuilds += 1
+        elif buffer.total - self._indexed_total > self.max_tail:
+            self._merge_tail()
+
+    def _sorted(self, slots):
+        """Clés de cellule triées des cases `slots`, et les cases dans le même ordre"""
+        data = self.buffer.data
+        keys = self._key(*self._cells(data["x"][slots], data["y"][slots]))
+        order = np.argsort(keys)
+        return keys[order], slots[order]
+
+    def _merge_tail(self):
+        """Trier la queue seule et l'insérer dans la partie triée (sans les entrées périmées)"""
+        buffer = self.buffer
+        keep = self._added(self._slots) < self._indexed_total
+        keys, slots = self._keys[keep], self._slots[keep]
+        tail_keys, tail_slots = self._sorted(buffer.slots(self._indexed_total))
+        positions = np.searchsorted(keys, tail_keys)
+        self._keys = np.insert(keys, positions, tail_keys)
+        self._slots = np.insert(slots, positions, tail_slots)
+        self._indexed_total = buffer.total
+
+    def _added(self, slots):
+        """Numéro d'ajout du point actuellement dans chaque case"""
+        capacity = self.buffer.capacity
+        return slots + capacity * ((self.buffer.total - 1 - slots) // capacity)
+
+    def query_rect(self, x0, y0, x1, y1):
+        """Cases du buffer des points dans [x0, x1) × [y0, y1) (ordre quelconque)"""
+        self.sync()
+        buffer = self.buffer
+
+        # Partie triée : une plage de clés par colonne de cellules
+        (cx0, cx1), (cy0, cy1) = self._cells((x0, x1), (y0, y1))
+        columns = np.arange(cx0, cx1 + 1, dtype=np.int64)
+        starts = np.searchsorted(self._keys, self._key(columns, cy0), 'left')
+        ends = np.searchsorted(self._keys, self._key(columns, cy1), 'right')
+        parts = [self._slots[start:end] for start, end in zip(starts, ends) if end > start]
+        slots = np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+        if len(slots):
+            # Case réécrite depuis la dernière fusion : entrée périmée (le point est en queue)
+            slots = slots[self._added(slots) < self._indexed_total]
+
+        # Queue : points ajoutés depuis la dernière fusion
+        tail = buffer.slots(self._indexed_total)
+        if len(tail):
+            slots = np.concatenate((slots, tail))
+
+        x, y = buffer.data["x"][slots], buffer.data["y"][slots]
+        return slots[(x >= x0) & (x < x1) & (y >= y0) & (y < y1)]
+
+    def query_radius(self, x, y, radius):
+        """Cases du buffer des points à moins de `radius` cm de (x, y)"""
+        slots = self.query_rect(x - radius, y - radius, x + radius, y + radius)
+        dx, dy = self.buffer.data["x"][slots] - x, self.buffer.data["y"][slots] - y
+        return slots[dx * dx + dy * dy < radius * radius]
+
+    def nearest(self, x, y, bearing, max_range, half_width):
+        """Distance (cm) du premier point dans le couloir de largeur 2 × half_width
+        partant de (x, y) au cap `bearing` ; None si rien avant max_range"""
+        rad = np.radians(bearing)
+        sin_b, cos_b = np.sin(rad), np.cos(rad)
+        end_x, end_y = x + max_range * sin_b, y + max_range * cos_b
+        slots = self.query_rect(min(x, end_x) - half_width, min(y, end_y) - half_width,
+                                max(x, end_x) + half_width, max(y, end_y) + half_width)
+        dx, dy = self.buffer.data["x"][slots] - x, self.buffer.data["y"][slots] - y
+        along = dx * sin_b + dy * cos_b
+        across = dx * cos_b - dy * sin_b
+        hit = (along > 0) & (along <= max_range) & (np.abs(across) <= half_width)
+        if not hit.any():
+            return None
+        return float(along[hit].min())
+
+    def polar_profile(self, x, y, max_range, sectors=PROFILE_SECTORS):
+        """Distance du point le plus proche dans chaque secteur de cap autour de (x, y)
+
+        Secteur i = caps [i, i + 1) × 360 / sectors ; max_range si le secteur est vide.
+        """
+        slots = self.query_radius(x, y, max_range)
+        dx, dy = self.buffer.data["x"][slots] - x, self.buffer.data["y"][slots] - y
+        distance = np.hypot(dx, dy)
+        bearing = np.degrees(np.arctan2(dx, dy)) % 360.0
+        sector = np.minimum((bearing * (sectors / 360.0)).astype(np.int64), sectors - 1)
+        # Tri sur une clé unique (secteur, puis distance < max_range) : le premier point
+        # de chaque secteur est le plus proche
+        order = np.argsort(sector * (2.0 * max_range) + distance)
+        sector, distance = sector[order], distance[order]
+        first = np.flatnonzero(np.r_[True, sector[1:] != sector[:-1]]) if len(sector) else []
+        profile = np.full(sectors, float(max_range))
+        profile[sector[first]] = distance[first]
+        return profile
@@ -0,0 +1,5 @@
+"""Modules du projet importables depuis tests/ (arborescence à plat)"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,55 @@
+"""Moteur sans Tk (engine.py) : niveaux du journal, instantanés de statistiques"""
+from engine import RadarEngine
+from event_log import ERROR, INFO, WARNING
+from protocol import Message
+
+
+def test_metrics_report_parse_errors_per_robot():
+    engine = RadarEngine()
+    engine.log_level = ERROR + 1  # Pas de sortie console
+    try:
+        engine.robot_for("socket://localhost:7777")
+        second = engine.robot_for("socket://localhost:7778")
+        engine.push_items(second.decoder.feed(b"A:10:D:12.5\nA:1x:D:??\n", 0.0))
+        engine.drain_samples()
+
+        engine.metrics.clock = lambda: engine.metrics._last_time + 1.0
+        row = engine.metrics_snapshot()
+        assert row["parse_errors_per_s"] > 0
+        engine.report_parse_errors(row)
+
+        _, records = engine.event_log.since(0, WARNING)
+        messages = [record.message for record in records if "parsing" in record.message]
+        assert messages and "R2: A:1x:D:??" in messages[-1]
+        assert "R1:" not in messages[-1]
+    finally:
+        engine.close()
+
+
+def test_message_levels():
+    engine = RadarEngine()
+    engine.log_level = ERROR + 1
+    try:
+        engine.push_items([Message("EVENT", "OBSTACLE:25", 0.0),
+                           Message("ERROR", "read failed", 0.0)])
+        engine.drain_samples()
+        _, records = engine.event_log.since(0)
+        levels = {record.message: record.level for record in records}
+        assert levels["⚠️  Obstacle détecté"] == INFO
+        assert levels["⚠️  read failed"] == ERROR
+    finally:
+        engine.close()
+
+
+def test_sample_filter_uses_engine_max_distance():
+    engine = RadarEngine()
+    try:
+        assert engine.robots[0].sample_filter.no_echo == engine.max_distance
+        engine.robot_for("socket://localhost:7777")
+        robot = engine.robot_for("socket://localhost:7778")  # Nouveau robot
+        assert robot.sample_filter.no_echo == engine.max_distance
+        engine.log_level = ERROR + 1
+        engine.reset_map()
+        assert all(robot.sample_filter.no_echo == engine.max_distance for robot in engine.robots)
+    finally:
+        engine.close()
@@ -0,0 +1,84 @@
+"""Sauvegarde et rechargement de la carte (map_file.py, RadarEngine.export_map / import_map)"""
+import numpy as np
+import pytest
+
+import map_file
+from engine import RadarEngine
+from event_log import ERROR
+
+
+def quiet_engine():
+    engine = RadarEngine()
+    engine.log_level = ERROR + 1
+    return engine
+
+
+def build_map(engine):
+    rng = np.random.default_rng(3)
+    for i in range(500):
+        engine.add_map_point(i % 180, 100.0 + i % 50, rng.uniform(-300, 300),
+                             rng.uniform(-150, 250), timestamp=i * 0.03, scan=i // 180)
+    bearing = np.arange(0.0, 360.0, 2.0)
+    engine.occupancy.integrate(np.zeros_like(bearing), np.zeros_like(bearing), bearing,
+                               np.full_like(bearing, 150.0), engine.max_distance)
+    engine.robot_for("socket://localhost:7777")
+    engine.robot_for("socket://localhost:7778")  # Deuxième robot
+    engine.robots[0].pose.restore(12.0, 34.0, 90.0, [(0.0, 0.0), (0.0, 34.0), (12.0, 34.0)])
+    engine.robots[1].pose.restore(-50.0, 5.0, 270.0, [(-20.0, 5.0), (-50.0, 5.0)])
+    engine.scan_count = 3
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "carte.npz")
+    source = quiet_engine()
+    target = quiet_engine()
+    try:
+        build_map(source)
+        source.export_map(path)
+        target.import_map(path)
+
+        assert np.array_equal(target.map_points.points(), source.map_points.points())
+        assert sorted(target.occupancy.tiles) == sorted(source.occupancy.tiles)
+        for key, tile in source.occupancy.tiles.items():
+            assert np.array_equal(target.occupancy.tiles[key], tile)
+        assert target.scan_count == 3
+        assert len(target.robots) == 2
+        for before, after in zip(source.robots, target.robots):
+            assert after.pose.pose_at(0.0) == pytest.approx(before.pose.pose_at(0.0))
+            # Trajectoire sauvegardée en float32, pose finale comprise
+            assert np.allclose(after.pose.trajectory,
+                               before.pose.trajectory + [before.pose.pose_at(0.0)[:2]])
+    finally:
+        source.close()
+        target.close()
+
+
+def test_memmap_read_only_points_and_copy_on_write_tiles(tmp_path):
+    path = str(tmp_path / "carte.npz")
+    source = quiet_engine()
+    target = quiet_engine()
+    try:
+        build_map(source)
+        source.export_map(path)
+
+        saved = map_file.load(path)
+        assert isinstance(saved.points, np.memmap) and not saved.points.flags.writeable
+        with pytest.raises(ValueError):
+            saved.points["x"][0] = 0.0
+        assert isinstance(saved.tiles, np.memmap) and saved.tiles.flags.writeable
+
+        # La grille rechargée continue d'être mise à jour sans toucher au fichier
+        target.import_map(path)
+        assert all(isinstance(tile, np.memmap) for tile in target.occupancy.tiles.values())
+        before = {key: np.array(tile) for key, tile in target.occupancy.tiles.items()}
+        bearing = np.arange(0.0, 360.0, 2.0)
+        target.occupancy.integrate(np.zeros_like(bearing), np.zeros_like(bearing), bearing,
+                                   np.full_like(bearing, 80.0), target.max_distance)
+        assert any(not np.array_equal(target.occupancy.tiles[key], tile)
+                   for key, tile in before.items())
+        reloaded = map_file.load(path).grid()
+        for key, tile in before.items():
+            assert np.array_equal(reloaded.tiles[key], tile)
+    finally:
+        source.close()
+        target.close()
@@ -0,0 +1,45 @@
+"""Décodage du flux série (protocol.py)"""
+import time
+
+from protocol import FRAME_SIZE, Message, Sample, StreamDecoder, encode_frame
+
+
+def test_text_and_binary_interleaved():
+    decoder = StreamDecoder(robot=1)
+    data = b"A:10:D:12.5\n" + encode_frame(20, 150.0, 1000) + b"EVENT:SCAN_START\n"
+    items = decoder.feed(data, 5.0)
+    assert [type(item) for item in items] == [Sample, Sample, Message]
+    assert items[0].angle == 10 and items[0].distance == 12.5 and items[0].robot == 1
+    assert items[1].angle == 20 and items[1].distance == 150.0
+    assert items[2].kind == "EVENT"
+    assert decoder.parse_errors == decoder.crc_errors == 0
+
+
+def test_large_text_chunk_is_linear():
+    lines = b"".join(b"A:%d:D:%d.5\n" % (i % 180, i % 300) for i in range(50_000))
+    decoder = StreamDecoder()
+    start = time.perf_counter()
+    items = decoder.feed(lines, 0.0)
+    elapsed = time.perf_counter() - start
+    assert len(items) == 50_000
+    assert elapsed < 2.0  # Quadratique : plusieurs dizaines de secondes
+
+
+def test_bad_crc_resyncs_on_next_frame():
+    frames = [encode_frame(angle, 100.0 + angle, 1000 + 30 * angle) for angle in range(10)]
+    corrupted = bytearray(frames[4])
+    corrupted[FRAME_SIZE - 1] ^= 0xFF
+    frames[4] = bytes(corrupted)
+    decoder = StreamDecoder()
+    items = decoder.feed(b"".join(frames), 10.0)
+    assert [item.angle for item in items] == [0, 1, 2, 3, 5, 6, 7, 8, 9]
+    assert items[5].distance == 106.0
+    assert decoder.crc_errors == 1
+
+
+def test_binary_robot_time_is_monotonic_min_latency():
+    decoder = StreamDecoder()
+    items = decoder.feed(b"".join(encode_frame(0, 50.0, 1000 + 30 * i) for i in range(5)), 3.0)
+    times = [item.timestamp for item in items]
+    assert times == sorted(times)
+    assert abs(times[-1] - 3.0) < 1e-9  # Dernière trame : latence minimale
@@ -0,0 +1,48 @@
+"""Enregistrement et rejeu des flux bruts (recording.py)"""
+import time
+
+from engine import RadarEngine
+from event_log import ERROR
+from protocol import encode_frame
+from recording import Recorder, ReplaySource
+
+
+def write_log(path, records=20000):
+    recorder = Recorder(str(path))
+    for i in range(records):
+        recorder.write(i * 0.01, b"A:%d:D:%d.0\n" % (i % 180, 50 + i % 300)
+                       + encode_frame(i % 180, 120.0, i * 10))
+    recorder.close()
+    return str(path)
+
+
+def test_replay_returns_recorded_blocks(tmp_path):
+    path = write_log(tmp_path / "session.rlog.gz", records=3)
+    source = ReplaySource(path, speed=None)
+    blocks = [source.read() for _ in range(3)]
+    assert blocks[0].startswith(b"A:0:D:50.0\n")
+    assert source.read() == b"" and source.finished
+    source.close()
+
+
+def test_stop_running_replay(tmp_path):
+    path = write_log(tmp_path / "session.rlog.gz")
+    engine = RadarEngine()
+    engine.log_level = ERROR + 1
+    try:
+        robot = engine.start_replay(path, None)
+        source = robot.serial_port
+        deadline = time.monotonic() + 5.0
+        while robot.bytes_received == 0:
+            assert time.monotonic() < deadline
+            time.sleep(0.005)
+        time.sleep(0.05)
+        engine.disconnect()  # Pendant un read() du thread de lecture
+        robot.read_thread.join(5.0)
+        assert not robot.read_thread.is_alive()
+        assert source.finished and source.read() == b""
+        assert not robot.is_running
+        while engine.drain_samples():
+            pass
+    finally:
+        engine.close()
@@ -0,0 +1,50 @@
+"""Recalage ICP (scan_matching.py) et sa reprise par le moteur"""
+import time
+
+import numpy as np
+
+from engine import RadarEngine
+from event_log import ERROR
+from scan_matching import ScanMatcher, apply_transform, icp
+
+
+def wait_done(matcher):
+    deadline = time.monotonic() + 5.0
+    while any(not future.done() for _, future in matcher._pending):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_icp_recovers_small_shift():
+    angles = np.radians(np.arange(0, 360, 2))
+    reference = np.column_stack((300 * np.sin(angles), 200 * np.cos(angles)))
+    source = apply_transform(reference, 0.0, 5.0, -3.0)
+    result = icp(source, reference)
+    assert result.converged
+    assert abs(result.tx + 5.0) < 1.0 and abs(result.ty - 3.0) < 1.0
+
+
+def test_failed_match_is_reported():
+    matcher = ScanMatcher()
+    try:
+        matcher.submit(7, None, np.zeros((50, 2)))
+        wait_done(matcher)
+        assert matcher.results() == []
+        failures = matcher.take_failures()
+        assert [failure.scan for failure in failures] == [7]
+        assert matcher.take_failures() == []
+    finally:
+        matcher.shutdown()
+
+
+def test_engine_logs_failed_match():
+    engine = RadarEngine()
+    engine.log_level = ERROR + 1  # Pas de sortie console
+    try:
+        engine.scan_matcher.submit(3, None, np.zeros((50, 2)))
+        wait_done(engine.scan_matcher)
+        engine.drain_samples()
+        _, records = engine.event_log.since(0, ERROR)
+        assert any(record.message.startswith("❌ ICP scan 3") for record in records)
+    finally:
+        engine.close()
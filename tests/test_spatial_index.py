@@ -0,0 +1,81 @@
+"""Index spatial (spatial_index.py) comparé à une recherche exhaustive"""
+import numpy as np
+import pytest
+
+from map_buffer import POINT_DTYPE, PointBuffer
+from spatial_index import PointIndex
+
+
+def add_points(buffer, rng, count, scan=0):
+    points = np.zeros(count, dtype=POINT_DTYPE)
+    points["x"] = rng.uniform(-500, 500, count)
+    points["y"] = rng.uniform(-400, 400, count)
+    points["scan"] = scan
+    buffer.extend(points)
+
+
+def brute_rect(buffer, x0, y0, x1, y1):
+    slots = buffer.slots()
+    x, y = buffer.data["x"][slots], buffer.data["y"][slots]
+    return set(slots[(x >= x0) & (x < x1) & (y >= y0) & (y < y1)].tolist())
+
+
+def brute_nearest(buffer, x, y, bearing, max_range, half_width):
+    slots = buffer.slots()
+    rad = np.radians(bearing)
+    dx, dy = buffer.data["x"][slots] - x, buffer.data["y"][slots] - y
+    along = dx * np.sin(rad) + dy * np.cos(rad)
+    across = dx * np.cos(rad) - dy * np.sin(rad)
+    hit = (along > 0) & (along <= max_range) & (np.abs(across) <= half_width)
+    return float(along[hit].min()) if hit.any() else None
+
+
+def check_queries(buffer, index, rng):
+    for _ in range(20):
+        x0, y0 = rng.uniform(-550, 450), rng.uniform(-450, 350)
+        x1, y1 = x0 + rng.uniform(1, 300), y0 + rng.uniform(1, 300)
+        slots = index.query_rect(x0, y0, x1, y1)
+        assert len(slots) == len(set(slots.tolist()))  # Aucun doublon (entrée périmée)
+        assert set(slots.tolist()) == brute_rect(buffer, x0, y0, x1, y1)
+
+        x, y, radius = rng.uniform(-400, 400), rng.uniform(-300, 300), rng.uniform(10, 200)
+        slots = buffer.slots()
+        dx, dy = buffer.data["x"][slots] - x, buffer.data["y"][slots] - y
+        expected = set(slots[dx * dx + dy * dy < radius * radius].tolist())
+        assert set(index.query_radius(x, y, radius).tolist()) == expected
+
+        bearing = rng.uniform(0, 360)
+        expected = brute_nearest(buffer, x, y, bearing, 400.0, 10.0)
+        found = index.nearest(x, y, bearing, 400.0, 10.0)
+        assert found == (None if expected is None else pytest.approx(expected))
+
+
+@pytest.mark.parametrize("max_tail", [None, 50])
+def test_queries_after_ring_buffer_wraps(max_tail):
+    rng = np.random.default_rng(7)
+    buffer = PointBuffer(3000)
+    index = PointIndex(buffer)
+    if max_tail is not None:
+        index.max_tail = max_tail  # Fusions fréquentes de la queue
+    for _ in range(12):
+        add_points(buffer, rng, 700)  # 8400 points : le buffer a fait le tour plusieurs fois
+        check_queries(buffer, index, rng)
+    assert buffer.total > 2 * buffer.capacity
+    assert index.rebuilds == 1  # Fusions et cases réécrites, jamais de reconstruction
+
+
+def test_queries_after_scan_transform():
+    rng = np.random.default_rng(11)
+    buffer = PointBuffer(5000)
+    index = PointIndex(buffer)
+    index.max_tail = 100
+    for scan in range(4):
+        add_points(buffer, rng, 1000, scan=scan)
+    check_queries(buffer, index, rng)
+
+    # Recalage ICP d'un scan : les points bougent, l'index doit suivre
+    buffer.transform_scan(2, np.radians(15.0), 40.0, -25.0)
+    check_queries(buffer, index, rng)
+    assert index.rebuilds == 2
+    add_points(buffer, rng, 1500, scan=4)  # Puis la carte continue de s'étendre (et tourne)
+    check_queries(buffer, index, rng)